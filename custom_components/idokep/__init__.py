@@ -6,7 +6,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 import logging
 
-from homeassistant.config_entries import ConfigEntry
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.const import (
     CONF_API_KEY,
     CONF_LANGUAGE,
@@ -18,11 +18,19 @@ from homeassistant.const import (
 )
 from homeassistant.core import HomeAssistant
 
-from .const import CONFIG_FLOW_VERSION, PLATFORMS, DEFAULT_LANGUAGE, ATTR_API_LOCATION
-from .coordinator import WeatherUpdateCoordinator
-
-from typing import Any
-OPTION_DEFAULTS = {CONF_LANGUAGE: DEFAULT_LANGUAGE}
+from .const import (
+    CONFIG_FLOW_VERSION,
+    CONF_HOURLY_HORIZON,
+    DOMAIN,
+    PLATFORMS,
+    ATTR_API_LOCATION,
+    HOURLY_FORECAST_HORIZON,
+)
+from .coordinator import WeatherUpdateCoordinator, snapshot_store
+from .helpers import build_data_and_options
+from .history import history_store
+from .scheduler import async_get_fetch_scheduler
+from .transfer import async_release_transfer_session
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -36,25 +44,24 @@ class IdokepData:
 
 type IdokepConfigEntry = ConfigEntry[IdokepData]
 
-def build_data_and_options(combined_data: dict[str, Any],) -> tuple[dict[str, Any], dict[str, Any]]:
-    """Split combined data and options."""
-    data = {k: v for k, v in combined_data.items() if k not in OPTION_DEFAULTS}
-    options = {
-        option: combined_data.get(option, default)
-        for option, default in OPTION_DEFAULTS.items()
-    }
-    return (data, options)
-
-
 async def async_setup_entry(hass: HomeAssistant, entry: IdokepConfigEntry) -> bool:
     """Set up IdokepWeather as config entry."""
     _LOGGER.debug("ENTRY: %s", str(entry))
     name = entry.data[CONF_NAME]
     location = entry.data.get(ATTR_API_LOCATION)
 
-    weather_coordinator = WeatherUpdateCoordinator(location, hass)
+    scheduler = async_get_fetch_scheduler(hass)
+    entry.async_on_unload(scheduler.async_register(location))
+
+    weather_coordinator = WeatherUpdateCoordinator(
+        location, hass, scheduler, entry.options.get(CONF_HOURLY_HORIZON, HOURLY_FORECAST_HORIZON)
+    )
 
-    await weather_coordinator.async_config_entry_first_refresh()
+    # Entities are served from the persisted snapshot immediately (if there is any), live data is fetched in the background
+    if await weather_coordinator.async_load_snapshot():
+        entry.async_create_background_task(hass, weather_coordinator.async_refresh(), f"{DOMAIN} refresh {location}")
+    else:
+        await weather_coordinator.async_config_entry_first_refresh()
 
     entry.async_on_unload(entry.add_update_listener(async_update_options))
 
@@ -98,5 +105,17 @@ async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     await hass.config_entries.async_reload(entry.entry_id)
 
 async def async_unload_entry(hass: HomeAssistant, entry: IdokepData) -> bool:
-    """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
\ No newline at end of file
+    """Unload a config entry, the client session is released with the last loaded entry."""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok and not any(
+        other.state is ConfigEntryState.LOADED
+        for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id
+    ):
+        async_release_transfer_session(hass)
+    return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted data snapshot and forecast history of a deleted config entry."""
+    await snapshot_store(hass, entry.data.get(ATTR_API_LOCATION)).async_remove()
+    await history_store(hass, entry.data.get(ATTR_API_LOCATION)).async_remove()
@@ -0,0 +1,167 @@
+"""Location catalog of the Idokep Weather service."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Iterable
+from datetime import timedelta
+from http import HTTPStatus
+import logging
+import unicodedata
+
+from aiohttp import ClientTimeout
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import ATTR_API_LOCATION, BASE_IDOKEP_URL, DATA_CATALOG, DOMAIN, REQUEST_TIMEOUT
+from .scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, async_get_fetch_scheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+CATALOG_STORAGE_VERSION = 1
+CATALOG_SAVE_DELAY = 10
+# Known locations are validated again in the background this rarely
+CATALOG_REFRESH_INTERVAL = timedelta(days=30)
+# Max number of suggested locations
+CATALOG_SUGGESTIONS = 5
+# Shipped slugs (cities of county rank and larger towns) => a fresh catalog autocompletes and suggests too,
+# they are not validated again by the catalog refresh
+SEED_LOCATIONS = (
+    "Ajka", "Baja", "Balatonfüred", "Békéscsaba", "Budaörs", "Budapest", "Cegléd", "Debrecen", "Dunakeszi",
+    "Dunaújváros", "Eger", "Esztergom", "Érd", "Gödöllő", "Gyöngyös", "Győr", "Gyula", "Hajdúböszörmény",
+    "Hódmezővásárhely", "Jászberény", "Kaposvár", "Kazincbarcika", "Kecskemét", "Keszthely", "Kiskunfélegyháza",
+    "Miskolc", "Mosonmagyaróvár", "Nagykanizsa", "Nyíregyháza", "Orosháza", "Ózd", "Pápa", "Pécs", "Salgótarján",
+    "Siófok", "Sopron", "Szeged", "Székesfehérvár", "Szekszárd", "Szentendre", "Szentes", "Szigetszentmiklós",
+    "Szolnok", "Szombathely", "Tatabánya", "Vác", "Várpalota", "Veszprém", "Zalaegerszeg",
+)
+
+
+def normalize_location(text: str) -> str:
+    """Return the accent and case insensitive key of a location name (e.g. 'Székesfehérvár' => 'szekesfehervar')."""
+    decomposed = unicodedata.normalize("NFKD", text.strip())
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+class LocationCatalog:
+    """Locally cached catalog of the valid idokep location slugs.
+
+    Slugs get into the catalog by a successful validation (or as a configured location), so a known location
+    is resolved without any network round trip. The shipped seed slugs are known from the start.
+    Lookups use an accent insensitive, sorted prefix index.
+    """
+
+    def __init__(self, hass: HomeAssistant, seed_locations: Iterable[str] = SEED_LOCATIONS) -> None:
+        """Initialize the catalog."""
+        self._hass = hass
+        self._store = Store(hass, CATALOG_STORAGE_VERSION, f"{DOMAIN}.location_catalog")
+        self._seed_locations = frozenset(seed_locations)
+        # Validated locations (persisted)
+        self._locations: set[str] = set()
+        self._index: list[tuple[str, str]] = []
+        self.updated: str | None = None
+        self._build_index()
+
+    @property
+    def locations(self) -> list[str]:
+        """Return the known location slugs."""
+        return sorted(self._locations | self._seed_locations)
+
+    async def async_load(self) -> None:
+        """Load the catalog from disk."""
+        stored = await self._store.async_load()
+        if stored:
+            self._locations = set(stored["locations"])
+            self.updated = stored["updated"]
+            self._build_index()
+
+    @property
+    def needs_refresh(self) -> bool:
+        """Return True if the known locations shall be validated again."""
+        updated = dt_util.parse_datetime(self.updated) if self.updated else None
+        return bool(self._locations) and (updated is None or dt_util.utcnow() - updated > CATALOG_REFRESH_INTERVAL)
+
+    def _build_index(self) -> None:
+        self._index = sorted((normalize_location(location), location) for location in self._locations | self._seed_locations)
+
+    def lookup(self, text: str) -> str | None:
+        """Return the known slug matching the text (accent and case insensitive)."""
+        key = normalize_location(text)
+        position = bisect_left(self._index, (key, ""))
+        if position < len(self._index) and self._index[position][0] == key:
+            return self._index[position][1]
+        return None
+
+    def suggest(self, text: str, limit: int = CATALOG_SUGGESTIONS) -> list[str]:
+        """Return the known slugs starting with the text (accent and case insensitive)."""
+        key = normalize_location(text)
+        suggestions = []
+        for normalized, location in self._index[bisect_left(self._index, (key, "")):]:
+            if not normalized.startswith(key) or len(suggestions) == limit:
+                break
+            suggestions.append(location)
+        return suggestions
+
+    @callback
+    def async_add(self, location: str) -> None:
+        """Add a valid location slug to the catalog."""
+        if location not in self._locations:
+            self._locations.add(location)
+            self._build_index()
+            self._store.async_delay_save(self._data_to_save, CATALOG_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        return {"updated": self.updated, "locations": sorted(self._locations)}
+
+    async def _async_is_valid(self, location: str, priority: int = PRIORITY_INTERACTIVE) -> bool:
+        """Return True if idokep serves the current weather of the location."""
+        session = async_get_clientsession(self._hass)
+        async with async_get_fetch_scheduler(self._hass).request_limiter.limit(priority):
+            async with session.get(BASE_IDOKEP_URL + '/idojaras/' + location, timeout=ClientTimeout(total=REQUEST_TIMEOUT)) as response:
+                return response.status == HTTPStatus.OK and 'current-weather' in await response.text()
+
+    async def async_resolve(self, text: str) -> str | None:
+        """Return the slug of the location, an unknown location is validated online (once)."""
+        location = self.lookup(text)
+        if location is not None:
+            return location
+        location = text.strip()
+        if await self._async_is_valid(location):
+            self.async_add(location)
+            return location
+        return None
+
+    async def async_refresh(self) -> None:
+        """Validate the known locations again, the invalid ones are removed."""
+        _LOGGER.debug('Refreshing location catalog of ' + str(len(self._locations)) + ' locations')
+        for location in list(self._locations):
+            try:
+                if not await self._async_is_valid(location, PRIORITY_BACKGROUND):
+                    self._locations.discard(location)
+            except Exception:  # noqa: BLE001
+                # Network errors don't invalidate a location
+                _LOGGER.debug('Location catalog refresh failed for: ' + location)
+        self._build_index()
+        self.updated = dt_util.utcnow().isoformat()
+        self._store.async_delay_save(self._data_to_save, CATALOG_SAVE_DELAY)
+
+
+async def async_get_location_catalog(hass: HomeAssistant) -> LocationCatalog:
+    """Return the loaded location catalog of the integration."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_CATALOG not in domain_data:
+        catalog = LocationCatalog(hass)
+        domain_data[DATA_CATALOG] = catalog
+        await catalog.async_load()
+        # Configured locations are known to be valid
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            if entry.data.get(ATTR_API_LOCATION):
+                catalog.async_add(entry.data[ATTR_API_LOCATION])
+        if catalog.updated is None:
+            catalog.updated = dt_util.utcnow().isoformat()
+        if catalog.needs_refresh:
+            hass.async_create_background_task(catalog.async_refresh(), f"{DOMAIN} location catalog refresh")
+    return domain_data[DATA_CATALOG]
@@ -2,14 +2,14 @@
 
 from __future__ import annotations
 
+from aiohttp import ClientError
 import voluptuous as vol
 
-import requests
-
 import logging
 
 from homeassistant.config_entries import (
     ConfigEntry,
+    ConfigEntryState,
     ConfigFlow,
     ConfigFlowResult,
     OptionsFlow,
@@ -17,34 +17,82 @@ from homeassistant.config_entries import (
 from homeassistant.const import (
     CONF_NAME,
 )
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.selector import SelectSelector, SelectSelectorConfig
 
-from .__init__ import build_data_and_options
+from .catalog import LocationCatalog, async_get_location_catalog
 
 from .const import (
     CONFIG_FLOW_VERSION,
+    CONF_HOURLY_HORIZON,
     DEFAULT_NAME,
     DEFAULT_LOCATION,
     DOMAIN,
     ATTR_API_LOCATION,
-    ATTR_UID,
+    HOURLY_FORECAST_HORIZON,
 )
+from .coordinator import snapshot_store
+from .helpers import build_data_and_options
+from .history import history_store
 
 _LOGGER = logging.getLogger(__name__)
 
+
+async def _async_resolve_location(catalog: LocationCatalog, text: str, errors: dict, description_placeholders: dict) -> str | None:
+    """Return the slug of the location (known locations are resolved from the catalog, unknown ones are validated online)."""
+    try:
+        location = await catalog.async_resolve(text)
+    except (ClientError, TimeoutError):
+        errors["base"] = "cannot_connect"
+        return None
+    if location is None:
+        errors[ATTR_API_LOCATION] = "invalid_location"
+        description_placeholders["suggestions"] = ", ".join(catalog.suggest(text)) or "-"
+    return location
+
+@callback
+def _async_migrate_unique_id(hass: HomeAssistant, entry: ConfigEntry, unique_id: str) -> None:
+    """Move the entities and the device of the entry to the new unique id (their entity ids and history are kept)."""
+    old_unique_id = entry.unique_id
+    if old_unique_id is None or old_unique_id == unique_id:
+        return
+    entity_registry = er.async_get(hass)
+    for entity in er.async_entries_for_config_entry(entity_registry, entry.entry_id):
+        # Weather entity uses the unique id of the entry, sensors use it as prefix
+        if entity.unique_id == old_unique_id or entity.unique_id.startswith(old_unique_id + "_"):
+            entity_registry.async_update_entity(entity.entity_id, new_unique_id=unique_id + entity.unique_id[len(old_unique_id):])
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_device(identifiers={(DOMAIN, old_unique_id)})
+    if device is not None:
+        device_registry.async_update_device(device.id, new_identifiers={(DOMAIN, unique_id)})
+
+async def _async_remove_location_data(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted snapshot and forecast history of the entry's location (unless an other entry tracks it too)."""
+    location = entry.data.get(ATTR_API_LOCATION)
+    if any(
+        other.entry_id != entry.entry_id and other.data.get(ATTR_API_LOCATION) == location
+        for other in hass.config_entries.async_entries(DOMAIN)
+    ):
+        return
+    # Coordinator of a loaded entry removes its own stores => its pending saves don't write them again
+    if entry.state is ConfigEntryState.LOADED:
+        await entry.runtime_data.coordinator.async_remove_persisted_data()
+    else:
+        await snapshot_store(hass, location).async_remove()
+        await history_store(hass, location).async_remove()
+
 class IdokepConfigFlow(ConfigFlow, domain=DOMAIN):
     """Config flow for Idokep."""
 
     VERSION = CONFIG_FLOW_VERSION
 
-    #--------------------- This is required only if options used ---------------
-    # @staticmethod
-    # @callback 
-    # def async_get_options_flow(config_entry: ConfigEntry,) -> IdokepOptionsFlow:
-    #     """Create the options flow."""
-    #     return IdokepOptionsFlow()
-    #---------------------------------------------------------------------------
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry,) -> IdokepOptionsFlow:
+        """Create the options flow."""
+        return IdokepOptionsFlow()
 
     async def async_step_user(self, user_input=None) -> ConfigFlowResult:
         """Handle a flow initialized by the user."""
@@ -53,15 +101,16 @@ class IdokepConfigFlow(ConfigFlow, domain=DOMAIN):
 
         _LOGGER.debug("SetUp Flow initiated:")
 
-        if user_input is not None:
-            location = user_input[ATTR_API_LOCATION]
+        catalog = await async_get_location_catalog(self.hass)
 
-            await self.async_set_unique_id(f"{ATTR_UID}")
-            self._abort_if_unique_id_configured()
-
-            #--------------------- Location validation disbaled ------------------------
-            #errors = _validate_location(location)
-            #---------------------------------------------------------------------------
+        if user_input is not None:
+            location = await _async_resolve_location(catalog, user_input[ATTR_API_LOCATION], errors, description_placeholders)
+            if not errors:
+                # One config entry per location
+                await self.async_set_unique_id(location)
+                self._abort_if_unique_id_configured()
+                # Entries created before multi-location support have a fixed unique id => check their location too
+                self._async_abort_entries_match({ATTR_API_LOCATION: location})
 
             #--------------------- This is required only if options used ---------------
             # if not errors:
@@ -72,14 +121,17 @@ class IdokepConfigFlow(ConfigFlow, domain=DOMAIN):
             #---------------------------------------------------------------------------
 
             if not errors:
-                _LOGGER.debug("Step before entry creation " + str(user_input[CONF_NAME]) + "    " +str(user_input[ATTR_API_LOCATION]))
+                _LOGGER.debug("Step before entry creation " + str(user_input[CONF_NAME]) + "    " +str(location))
                 return self.async_create_entry(
-                    title=user_input[CONF_NAME], data={CONF_NAME: user_input[CONF_NAME], ATTR_API_LOCATION:user_input[ATTR_API_LOCATION]},)
+                    title=user_input[CONF_NAME], data={CONF_NAME: user_input[CONF_NAME], ATTR_API_LOCATION:location},)
 
         schema = vol.Schema(
             {
                 vol.Required(CONF_NAME, default=DEFAULT_NAME): str,
-                vol.Required(ATTR_API_LOCATION): str,
+                # Known locations are offered for autocompletion, any other location can be typed in
+                vol.Required(ATTR_API_LOCATION): SelectSelector(
+                    SelectSelectorConfig(options=catalog.locations, custom_value=True, sort=True)
+                ),
             }
         )
 
@@ -92,16 +144,35 @@ class IdokepConfigFlow(ConfigFlow, domain=DOMAIN):
     
     async def async_step_reconfigure(self, user_input: dict[str, Any] | None = None):
         _LOGGER.debug("Reconfiguration called")
+        errors = {}
+        description_placeholders = {}
         if user_input is not None:
-            # TODO: process user input
-            await self.async_set_unique_id(f"{ATTR_UID}")
-            self._abort_if_unique_id_mismatch()
-            data, options = build_data_and_options(user_input)
-            _LOGGER.debug("Reconfiguration DATA:" + str(data))
-            return self.async_update_reload_and_abort(
-                self._get_reconfigure_entry(),
-                data_updates=data,
-            )
+            catalog = await async_get_location_catalog(self.hass)
+            location = await _async_resolve_location(catalog, user_input[ATTR_API_LOCATION], errors, description_placeholders)
+            if not errors:
+                reconfigure_entry = self._get_reconfigure_entry()
+                # New location must not be tracked by an other entry (the reconfigured entry itself may keep its location)
+                if location != reconfigure_entry.unique_id:
+                    await self.async_set_unique_id(location)
+                    self._abort_if_unique_id_configured()
+                # Entries created before multi-location support have a fixed unique id => check their location too
+                if any(
+                    entry.entry_id != reconfigure_entry.entry_id and entry.data.get(ATTR_API_LOCATION) == location
+                    for entry in self._async_current_entries(include_ignore=False)
+                ):
+                    return self.async_abort(reason="already_configured")
+                data, options = build_data_and_options({**user_input, ATTR_API_LOCATION: location})
+                _LOGGER.debug("Reconfiguration DATA:" + str(data))
+                # Data of the old location doesn't belong to the new one
+                if location != reconfigure_entry.data.get(ATTR_API_LOCATION):
+                    await _async_remove_location_data(self.hass, reconfigure_entry)
+                # Unique id follows the location (the old location can be added again), entity ids remain stable
+                _async_migrate_unique_id(self.hass, reconfigure_entry, location)
+                return self.async_update_reload_and_abort(
+                    reconfigure_entry,
+                    unique_id=location,
+                    data_updates=data,
+                )
         
         self.reconfig_entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
 
@@ -109,7 +180,9 @@ class IdokepConfigFlow(ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(
             step_id="reconfigure",
-            data_schema=vol.Schema({vol.Required(ATTR_API_LOCATION,default=self.reconfig_entry.data.get(ATTR_API_LOCATION),): vol.Coerce(str),})
+            data_schema=vol.Schema({vol.Required(ATTR_API_LOCATION,default=self.reconfig_entry.data.get(ATTR_API_LOCATION),): vol.Coerce(str),}),
+            errors=errors,
+            description_placeholders=description_placeholders,
         )
 
 class IdokepOptionsFlow(OptionsFlow):
@@ -122,7 +195,8 @@ class IdokepOptionsFlow(OptionsFlow):
     async def async_step_init(self, user_input: dict | None = None) -> ConfigFlowResult:
         """Manage the options."""
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            # Options not shown in the form (e.g. language) are kept
+            return self.async_create_entry(title="", data={**self.config_entry.options, **user_input})
 
         return self.async_show_form(
             step_id="init",
@@ -138,13 +212,11 @@ class IdokepOptionsFlow(OptionsFlow):
     def _get_options_schema(self):
         return vol.Schema(
             {
+                # Number of hourly forecast cards fetched (0 => every card)
                 vol.Required(
-                    ATTR_API_LOCATION,
-                    default=self.config_entry.options.get(
-                        ATTR_API_LOCATION,
-                        self.config_entry.data.get(ATTR_API_LOCATION, DEFAULT_LOCATION),
-                    ),
-                ): vol.Coerce(str),
+                    CONF_HOURLY_HORIZON,
+                    default=self.config_entry.options.get(CONF_HOURLY_HORIZON, HOURLY_FORECAST_HORIZON),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
             }
         )
     
\ No newline at end of file
@@ -18,7 +18,7 @@ from homeassistant.components.weather import (
     ATTR_CONDITION_WINDY,
     ATTR_CONDITION_WINDY_VARIANT,
 )
-from homeassistant.const import Platform
+from homeassistant.const import CONF_LANGUAGE, Platform
 
 DOMAIN = "idokep"
 DEFAULT_NAME = "IdokepWeather"
@@ -53,9 +53,33 @@ ATTR_API_FORECAST = "forecast"
 ATTR_API_CURRENT = "current"
 ATTR_API_HOURLY_FORECAST = "hourly_forecast"
 ATTR_API_DAILY_FORECAST = "daily_forecast"
+ATTR_API_FORECAST_SUMMARY = "forecast_summary"
 ATTR_UID = "IdokepWeatherUID"
 ATTR_FORECAST_NAME = "Forecast"
+ATTR_STALE = "stale"
+ATTR_DATA_TIMESTAMP = "data_timestamp"
 UPDATE_LISTENER = "update_listener"
 PLATFORMS = [Platform.SENSOR, Platform.WEATHER]
 BASE_IDOKEP_URL = "https://www.idokep.hu"
 
+# BeautifulSoup tree builders in order of preference, the first installed one is used.
+# lxml (a manifest requirement) builds the trees faster, html.parser is the fallback if it can't be installed.
+# Both give identical forecasts on the fixture pages (tests/test_parser.py).
+HTML_PARSER_BACKENDS = ("lxml", "html.parser")
+
+# Upper limit of the concurrent requests sent to idokep.hu by all config entries together
+MAX_CONCURRENT_REQUESTS = 4
+# Token bucket of the upstream requests: sustained rate (requests / second) and burst size
+REQUEST_RATE = 0.5
+REQUEST_BURST = 6
+# Total timeout (seconds) of an upstream request including its body, a hung request fails fast as a refresh failure
+REQUEST_TIMEOUT = 25
+DATA_SCHEDULER = "scheduler"
+DATA_CATALOG = "location_catalog"
+DATA_SESSION = "session"
+# Config entry option: number of hourly forecast cards fetched, the rest of the hourly page is not downloaded (0 => every card)
+CONF_HOURLY_HORIZON = "hourly_horizon"
+HOURLY_FORECAST_HORIZON = 0
+
+# Config entry options and their defaults, the rest of the flow input is config entry data
+OPTION_DEFAULTS = {CONF_LANGUAGE: DEFAULT_LANGUAGE, CONF_HOURLY_HORIZON: HOURLY_FORECAST_HORIZON}
@@ -1,325 +1,355 @@
 """Weather data coordinator for the Idokep Weather service."""
 
-from datetime import timedelta, time
+import asyncio
+import codecs
+from collections import deque
+from collections.abc import Awaitable, Callable
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+import hashlib
+from http import HTTPStatus
+from importlib import import_module
 import logging
-import pytz
+from time import perf_counter
+from typing import Any
 
-from homeassistant.components.weather import (
-    ATTR_CONDITION_CLEAR_NIGHT,
-    ATTR_CONDITION_SUNNY,
-    WeatherEntityFeature,
-    Forecast,
-)
+from aiohttp import ClientTimeout, hdrs
+
+from homeassistant.components.weather import WeatherEntityFeature
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers import sun
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.util import dt as dt_util
-
-from homeassistant.const import (
-    UnitOfLength,
-    UnitOfPrecipitationDepth,
-    UnitOfPressure,
-    UnitOfSpeed,
-    UnitOfTemperature,
-)
+from homeassistant.util import dt as dt_util, slugify
 
 from .const import (
-    ATTR_API_CLOUDS,
-    ATTR_API_CONDITION,
     ATTR_API_CURRENT,
     ATTR_API_DAILY_FORECAST,
-    ATTR_API_DEW_POINT,
-    ATTR_API_NATIVE_TEMPERATURE,
-    ATTR_API_NATIVE_TEMPERATURE_UNIT,
+    ATTR_API_FORECAST_SUMMARY,
     ATTR_API_HOURLY_FORECAST,
-    ATTR_API_HUMIDITY,
-    ATTR_API_PRECIPITATION_KIND,
-    ATTR_API_PRESSURE,
-    ATTR_API_RAIN,
-    ATTR_API_SNOW,
-    ATTR_API_TEMPERATURE,
-    ATTR_API_UV_INDEX,
-    ATTR_API_VISIBILITY_DISTANCE,
-    ATTR_API_WEATHER,
-    ATTR_API_WEATHER_CODE,
-    ATTR_API_WIND_BEARING,
-    ATTR_API_WIND_GUST,
-    ATTR_API_WIND_SPEED,
+    ATTR_API_NATIVE_TEMPERATURE,
     DOMAIN,
     DEFAULT_LOCATION,
     BASE_IDOKEP_URL,
+    HOURLY_FORECAST_HORIZON,
+    REQUEST_TIMEOUT,
 )
+from .forecast import DAILY_FORECAST_COLUMNS, HOURLY_FORECAST_COLUMNS, ForecastSeries, summarize_forecast
+from .history import ForecastHistoryTracker
+from .scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, IdokepFetchScheduler, PageRefresher
+from .stats import RefreshStats, measure
+from .transfer import ACCEPT_ENCODING, TransferStats, async_get_transfer_session, iter_decoded
 
 _LOGGER = logging.getLogger(__name__)
 
-WEATHER_UPDATE_INTERVAL = timedelta(minutes=20)
-
-#=========================== SAJAT KÓD ========================================
-
-import aiohttp
-from datetime import datetime
-
-weather_conditions = {
- 'napos': 'sunny',
- 'derült':  'sunny',
- 'borult': 'cloudy',
- 'erősen felhős': 'cloudy',
- 'közepesen felhős': 'partlycloudy',
- 'gyengén felhős': 'partlycloudy',
- 'zivatar': 'lightning-rainy',
- 'zápor': 'rainy',
- 'szitálás': 'rainy',
- 'gyenge eső': 'rainy',
- 'eső': 'rainy',
- 'eső viharos széllel': 'rainy',
- # The following conditions shall be tested/confirmed
- 'köd': 'fog',
- 'párás': 'fog',
- 'pára': 'fog',
- 'villámlás': 'lightning',
- 'erős eső': 'pouring',
- 'jégeső': 'hail',
- 'havazás': 'snowy',
- 'intenzív havazás': 'snowy',
- 'hószállingózás': 'snowy',
- 'hófúvás': 'snowy',
- 'hófúvás havazással': 'snowy',
- 'hózápor': 'snowy',
- 'havas eső': 'snowy-rainy',
- 'fagyott eső': 'snowy-rainy',
- 'ónos eső': 'snowy-rainy',
- 'szeles': 'windy',
- 'száraz zivatar': 'lightning',
-#Not mapped 
-#clear-night	Clear night
-#exceptional	Exceptional
-#windy-variant	Wind and clouds
+# Upstream pages, each of them is refreshed at its own cadence: current weather & daily forecast (/idojaras), hourly forecast (/elorejelzes)
+PAGE_ACTUAL = "actual"
+PAGE_HOURLY = "hourly"
+PAGE_UPDATE_INTERVALS = {
+    PAGE_ACTUAL: timedelta(minutes=10),
+    PAGE_HOURLY: timedelta(minutes=30),
 }
-
-wind_mapping = {
-    'szélcsend': 0,   # 0-1 km/h
-    'gyenge szellő': 4, #fuvallat (2-6 km/h)
-    'enyhe': 9, # (7-11 km/h)
-    'gyenge': 15, # (12-19 km/h)
-    'mersekelt': 25, # (20-29 km/h)
-    'elenk': 35, # (30-39 km/h)
-    'eros': 45, # (40-49 km/h)
-    'viharos': 55, # (50-60 km/h)
-    'élénk viharos szél': 66, #(61-72 km/h)
-    'heves vihar': 79, #(73-85 km/h)
-    'dühöngő vihar': 93, # (86-100 km/h)
-    'heves szélvész': 108, # (101-115 km/h)
-    'orkán': 118, #(115-120 km/h)
+# Coordinator wakes up when the next page is due, but not more often than this
+MIN_WAKEUP_INTERVAL = timedelta(seconds=30)
+
+# Last good data is persisted, so entities can be served from it at startup
+# (snapshots of an other version are not migrated, they are ignored => the setup fetches the pages)
+SNAPSHOT_STORAGE_VERSION = 2
+SNAPSHOT_SAVE_DELAY = 10
+
+# Refresh requests (e.g. homeassistant.update_entity) are served without fetching if the data is fresher than this
+MIN_REFRESH_FRESHNESS = timedelta(minutes=1)
+
+# Number of refresh statistics kept in memory
+REFRESH_HISTORY_SIZE = 50
+
+# Sun times of the day parsed from the current weather page (used by the night conditions of the hourly forecast)
+SUN_TIMES = "sun_times"
+# Parsed (Budapest time, Forecast) cards of the hourly forecast page, the night conditions are applied by the coordinator
+HOURLY_CARDS = "hourly_cards"
+
+# Independently changing sections of the coordinator data, listeners may subscribe to one of them (listener context)
+DATA_SECTIONS = (ATTR_API_CURRENT, ATTR_API_HOURLY_FORECAST, ATTR_API_DAILY_FORECAST, ATTR_API_FORECAST_SUMMARY)
+# Pages the sections come from
+SECTION_PAGES = {
+    ATTR_API_CURRENT: (PAGE_ACTUAL,),
+    ATTR_API_DAILY_FORECAST: (PAGE_ACTUAL,),
+    ATTR_API_HOURLY_FORECAST: (PAGE_HOURLY,),
+    ATTR_API_FORECAST_SUMMARY: (PAGE_ACTUAL, PAGE_HOURLY),
 }
+# Listener context of the entities showing refresh statistics (notified after every refresh)
+DIAGNOSTICS_SECTION = "diagnostics"
 
-from bs4 import BeautifulSoup, Comment
-import re
-
-#============== Generate forecast date from a day of month ================
-def generate_date(forecast_day):
-    # Get today's date
-    today = datetime.today()
-    day = today.day
-    month = today.month
-    year = today.year
-
-    # Check if the input day is less than today's day
-    if forecast_day < day:
-        # Move to the next month
-        if month == 12:  # December, next month is January of next year
-            month = 1
-            year += 1
-        else:
-            month += 1
+# The parser module (bs4 & co.) is imported at the first refresh only, in the executor
+PARSER_MODULE = f"{__package__}.parser"
 
-    # Create the new date
-    try:
-        generated_date = datetime(year, month, forecast_day)
-    except ValueError:
-        _LOGGER.error(f"Invalid day_of_month: {forecast_day} for the month {month}")
-        return f"Invalid day_of_month: {forecast_day} for the month {month}"
+#=========================== SAJAT KÓD ========================================
 
-    return generated_date
+_parser_module = None
+
+async def _load_parser(run_job):
+    """Return the parser module, it is imported by the job runner at the first call.
+
+    sys.modules is not checked: while an other job is importing the module it holds the partially initialized module,
+    import_module of the concurrent first refreshes waits until the import is complete.
+    """
+    global _parser_module
+    if _parser_module is None:
+        _parser_module = await run_job(import_module, PARSER_MODULE)
+    return _parser_module
+
+async def _run_inline(parser, *args):
+    """Job runner executing the parser directly."""
+    return parser(*args)
+
+#======================= Cache of downloaded pages ============================
+@dataclass
+class CachedPage:
+    """Validators, body hash and parsed result of the last download of a page."""
+
+    etag: str | None
+    last_modified: str | None
+    body_hash: str
+    parsed: Any
+
+
+class PageCache:
+    """Per URL page cache used for conditional requests and for skipping the parse of unchanged pages."""
+
+    def __init__(self) -> None:
+        """Initialize the cache."""
+        self._pages: dict[str, CachedPage] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url: str) -> CachedPage | None:
+        """Return the cached page of the url."""
+        return self._pages.get(url)
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        """Return the If-None-Match / If-Modified-Since headers for the url."""
+        headers = {}
+        cached = self._pages.get(url)
+        if cached is not None:
+            if cached.etag:
+                headers[hdrs.IF_NONE_MATCH] = cached.etag
+            if cached.last_modified:
+                headers[hdrs.IF_MODIFIED_SINCE] = cached.last_modified
+        return headers
+
+    def store(self, url: str, page: CachedPage) -> None:
+        """Store the latest download of the url."""
+        self._pages[url] = page
+
+
+#======================= Incremental parse until the forecast horizon ============================
+async def feed_until_horizon(chunks, charset, feed, run_parser):
+    """Feed the decoded hourly forecast page to the incremental card parser (HourlyCardFeed) while it is streamed.
+
+    Reading stops as soon as the cards within the horizon are extracted, the rest of the body is not downloaded.
+    Returns the body read.
+    """
+    body = bytearray()
+    decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    async for chunk in chunks:
+        body += chunk
+        # Tokenizing is CPU bound => it runs in the job runner (executor), chunk by chunk
+        await run_parser(feed.feed, decoder.decode(chunk))
+        if feed.horizon_reached:
+            _LOGGER.debug('Forecast horizon reached after ' + str(len(body)) + ' bytes')
+            break
+    else:
+        await run_parser(feed.feed, decoder.decode(b'', final=True))
+    return bytes(body)
+
+#======================= Fetch & parse one page ============================
+async def fetch_and_parse(session, url, run_parser, parser, *args, page_cache=None, request_limiter=None, page='page', stats=None, read_body=None, transfer_stats=None):
+    """Download a page and run its parser as soon as its body arrived.
+
+    run_parser is an awaitable job runner (e.g. hass.async_add_executor_job), so the synchronous
+    BeautifulSoup parsing doesn't block the event loop.
+    request_limiter is an optional async context manager (e.g. semaphore) the request is sent in,
+    if it returns the queue wait time (ms) that is recorded too.
+    With a page cache the request is conditional and an unchanged page (304, or same body hash) is not parsed again,
+    the previously parsed result is returned instead.
+    With refresh stats the download / parse stages of the page are timed and the response size is recorded.
+    read_body is an optional coroutine reading (a part of) the decoded body chunks (given with the charset) instead of the whole body.
+    The session shall not decompress the responses: the body is requested compressed and decoded while it is streamed,
+    the wire / decoded bytes are accounted to the url in the optional transfer stats.
+    """
+    cached = page_cache.get(url) if page_cache is not None else None
+    headers = {hdrs.ACCEPT_ENCODING: ACCEPT_ENCODING}
+    if page_cache is not None:
+        headers.update(page_cache.conditional_headers(url))
+    timings = stats.timings if stats is not None else None
+
+    # Request limiter rate limits the upstream requests of the whole integration
+    async with request_limiter or nullcontext() as queue_wait:
+        if timings is not None and queue_wait is not None:
+            timings[page + '_queue'] = queue_wait
+        with measure(timings, page + '_download'):
+            async with session.get(url, headers=headers, timeout=ClientTimeout(total=REQUEST_TIMEOUT)) as response:
+                if response.status == HTTPStatus.NOT_MODIFIED and cached is not None:
+                    page_cache.hits += 1
+                    _LOGGER.debug('Page not modified (304): ' + url)
+                    return cached.parsed
+                # Error pages are not parsed (nor cached)
+                response.raise_for_status()
+                chunks = iter_decoded(response, transfer_stats)
+                if read_body is None:
+                    body = b''.join([chunk async for chunk in chunks])
+                else:
+                    body = await read_body(chunks, response.charset or 'utf-8')
+                html_string = body.decode(response.charset or 'utf-8', errors='replace')
+                etag = response.headers.get(hdrs.ETAG)
+                last_modified = response.headers.get(hdrs.LAST_MODIFIED)
+
+    if stats is not None:
+        stats.response_bytes[page] = len(body)
+
+    if page_cache is not None:
+        # Server may not send validators => fall back to the hash of the body
+        body_hash = hashlib.sha256(body).hexdigest()
+        if cached is not None and cached.body_hash == body_hash:
+            page_cache.hits += 1
+            _LOGGER.debug('Page content unchanged: ' + url)
+            page_cache.store(url, CachedPage(etag, last_modified, body_hash, cached.parsed))
+            return cached.parsed
+        page_cache.misses += 1
+
+    with measure(timings, page + '_parse'):
+        parsed = await run_parser(partial(parser, timings=timings), html_string, *args)
+
+    if page_cache is not None:
+        page_cache.store(url, CachedPage(etag, last_modified, body_hash, parsed))
+    return parsed
 
 #======================= Fetch Forecast data ============================
-async def FetchWeatherData(location, local_tz=None, budapest_tz=None):
-
+async def FetchCurrentWeather(session, location, budapest_tz=None, run_parser=None, page_cache=None, request_limiter=None, stats=None, transfer_stats=None):
+    """Fetch the /idojaras page: current weather, daily forecast and the sun times of the day."""
     if location == None:
         location = DEFAULT_LOCATION
 
-    hourly_forecast_url = BASE_IDOKEP_URL + '/elorejelzes/' + location
     actual_weather_url = BASE_IDOKEP_URL+ '/idojaras/' + location
+    _LOGGER.debug(actual_weather_url)
+
+    #Get current Hungary time:
+    hungary_time = datetime.now(budapest_tz)
+
+    # Without a job runner the parsers are executed directly (in the caller's thread)
+    if run_parser is None:
+        run_parser = _run_inline
+    parser = await _load_parser(run_parser)
+
+    current_weather, daily_forecast_list, sunrise, sunset = await fetch_and_parse(
+        session, actual_weather_url, run_parser, parser.parse_actual_weather, hungary_time,
+        page_cache=page_cache, request_limiter=request_limiter, page=PAGE_ACTUAL, stats=stats, transfer_stats=transfer_stats,
+    )
+    # The parsed page may come from the page cache => the time dependent night correction is applied after it
+    current_weather = parser.apply_current_night_condition(current_weather, hungary_time, sunrise, sunset)
+    if stats is not None:
+        stats.daily_cards = len(daily_forecast_list)
+
+    # Forecasts are kept in compact columnar stores, Forecast dicts are built only when requested
+    return {
+        ATTR_API_CURRENT: current_weather,
+        ATTR_API_DAILY_FORECAST: ForecastSeries.from_forecasts(daily_forecast_list, DAILY_FORECAST_COLUMNS),
+        SUN_TIMES: (sunrise, sunset),
+    }
+
+async def FetchHourlyForecast(session, location, local_tz=None, budapest_tz=None, run_parser=None, page_cache=None, request_limiter=None, stats=None, hourly_horizon=None, transfer_stats=None):
+    """Fetch the /elorejelzes page: hourly forecast cards (night conditions are set later by the sun times of the current weather page)."""
+    if location == None:
+        location = DEFAULT_LOCATION
 
-    _LOGGER.debug("Fetching data for location: " + location)
+    hourly_forecast_url = BASE_IDOKEP_URL + '/elorejelzes/' + location
     _LOGGER.debug(hourly_forecast_url)
 
     #Get current Hungary time:
     hungary_time = datetime.now(budapest_tz)
-    _LOGGER.debug('Hungary Current Time: ' + str(hungary_time))
-
-    # ====================== GETTING ACTUAL WEATHER ==================================
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(actual_weather_url) as response:
-            html_string = await response.text()
-            soup = BeautifulSoup(html_string, "html.parser")
-
-            # Get Sunrise & Sunset times
-            sunrise_txt = re.search(r'\d{1,2}:\d{2}', soup.find('img', attrs={'src': '/assets/icons/sunrise.svg'}).parent.text).group()
-            sunset_txt = re.search(r'\d{1,2}:\d{2}', soup.find('img', attrs={'src': '/assets/icons/sunset.svg'}).parent.text).group()
-            sunrise = datetime.strptime(hungary_time.strftime('%Y-%m-%d')+' ' + sunrise_txt, '%Y-%m-%d %H:%M')
-            sunset = datetime.strptime(hungary_time.strftime('%Y-%m-%d')+' ' + sunset_txt, '%Y-%m-%d %H:%M')
-
-            #Get Weather data
-            actual_weather = soup.find('div', attrs={'class': 'current-weather'}).text.lower()
-            actual_weather_icon = soup.find('div', attrs={'class': 'current-weather-lockup'}).find('img', attrs={'class': 'ik forecast-bigicon'}).get('src')
-            actual_temperature = soup.find('div', attrs={'class': 'ik current-temperature'}).text.strip()
-            #Extract numeric temperature value (handles both '°C' and '℃' unit formats)
-            actual_temperature_value = re.search(r'-?\d+', actual_temperature).group()
-            #Getting mapped weather condition from tuple... if key doesn't exists return 'None'
-            actual_weather_condition = weather_conditions.get(actual_weather, actual_weather)
-
-            # IF current time is later than sunset time or earlier than sunrise time and weather condition is sunny => change condition to clear night
-            if (hungary_time.time() > sunset.time()) or (hungary_time.time()< sunrise.time()):
-                if actual_weather_condition == 'sunny':
-                    actual_weather_condition = 'clear-night'
-
-            _LOGGER.debug('Current Weather: ' + actual_temperature + '  ' + actual_weather + '   (' + actual_weather_icon +')    ' + actual_weather_condition)
-        
-        # ====================== GETTING DAILY FORECAST DATA ==================================
-            daily_forecast_cols = soup.find('div', attrs={'id': 'dailyForecastContainer'}).find_all('div', attrs={'class': 'dailyForecastCol'})
-
-            daily_forecast_list = []
-
-            for daily_data in daily_forecast_cols:
-                day = int(daily_data.find('span', attrs={'class':re.compile("ik dfDayNum")}).text)
-                daily_forecast_date = generate_date(day)
-                weather_desc_pattern = r"<div[^>]*>\s*<img[^>]*>\s*([^<]+)"
-                weather_desc_match = re.search(weather_desc_pattern, daily_data.find('div', attrs={'class': 'ik dfIconAlert'}).find('a').attrs['data-bs-content'])
-                if weather_desc_match:
-                    daily_weather = weather_desc_match.group(1).strip()
-                daily_weather_condition = weather_conditions.get(daily_weather, daily_weather)
-                daily_temperature_obj = daily_data.find('div', attrs={'class': 'ik min-max-container'}).find('a')
-                daily_temperature_max = daily_temperature_obj.text
-                daily_temperature_min = daily_temperature_obj.find_next('a').text
-                daily_rain_level_obj = daily_data.find('div', attrs={'class': 'ik rainlevel-container'})
-                if daily_rain_level_obj:
-                        search_number_regex_pattern = r"'[\d]+"
-                        rain_level = re.search(search_number_regex_pattern,(daily_rain_level_obj.find('a').find('span')['class'])[1]) or 0
-                else:
-                    rain_level = 0
-                
-                _LOGGER.debug('Date: '+ str(daily_forecast_date) + '  ' + str(daily_weather_condition) + ' max temp: ' + str(daily_temperature_max) + ' min temp: ' + str(daily_temperature_min) + ' rain level: ' + str(rain_level))
-
-                # Add forecast element to forecast list
-                daily_forecast_list.append (Forecast(
-                    datetime=daily_forecast_date.isoformat(),
-                    condition=daily_weather_condition,
-                    temperature=daily_temperature_max,
-                    templow=daily_temperature_min,
-                    precipitation=rain_level,
-                ))
-
-        # ====================== GETTING HOURLY FORECAST DATA ==================================
-        async with session.get(hourly_forecast_url) as response:
-            html_string = await response.text()
-            soup = BeautifulSoup(html_string, "html.parser")
-
-            forecast_card_list = soup.find_all('div', attrs={'class': 'wide-hourly-forecast-card'})
-
-            # Start hour for fetching the forecast data is the current hour in Hungary
-            start_hour = hungary_time.hour
-            
-            hourly_forecast_list = []
-
-            for forecast_card in forecast_card_list:
-                forecast_hour_str = forecast_card.find("div" , attrs={'class': 'ik wide-hourly-forecast-hour'}, recursive=False).text
-                forecast_hour = int(forecast_hour_str[0:-3])
-                
-                #It's a next day forcast if forecast hour is less than hungary_time => need to increase date by 1 day
-                if forecast_hour < start_hour:
-                    hungary_time += timedelta(days=1)
-               
-                start_hour = forecast_hour
-                # Combine start date and forecast hour to a datetime object
-                forecast_datetime = datetime.combine(hungary_time, time(forecast_hour, 0))
-                # Localize the datetime to Budapest timezone
-                forecast_datetime = budapest_tz.localize(forecast_datetime)
-                _LOGGER.debug('Forecast Date Time in Budapest TZ: ' + str(forecast_datetime))
-
-                forecast_weather_obj = forecast_card.find("div" , attrs={'class': 'ik forecast-icon-container'}, recursive=False).find("a", recursive=False)
-                forecast_weather = forecast_weather_obj.get('data-bs-content')
-                _LOGGER.debug('Forecast Weather Condition String: ' + str(forecast_weather))
-                #Getting mapped weather condition from tuple... if key doesn't exists return None
-                forecast_weather_condition = weather_conditions.get(forecast_weather, 'None')
-
-                # IF forecast time is later than sunset time or earlier than sunrise time and weather condition is sunny => change condition to clear night
-                if (forecast_datetime.time() > sunset.time()) or (forecast_datetime.time() < sunrise.time()):
-                    if forecast_weather_condition == 'sunny':
-                        forecast_weather_condition = 'clear-night'
-
-                # Convert forecast time information to local configured timezone if it is different from Budapest timezone
-                if local_tz != budapest_tz:
-                    forecast_datetime = forecast_datetime.astimezone(local_tz)
-                _LOGGER.debug('Forecast Time in local Time Zone: ' + str(forecast_datetime))
-
-                # get temperature value
-                forecast_temperature_value = forecast_card.find("div", attrs={'class': 'ik tempBarGraph'}, recursive=False).find("div" , attrs={'class': 'ik tempValue'}, recursive=False).find("a", recursive=False).get_text().strip()
-
-                #===== WIND ============
-
-                wind_div = forecast_card.find("div", attrs={'class': 'ik hourly-wind'}, recursive=False).find("a", recursive=False).find("div", recursive=False)
-                #Get wind force string (last CSS class, e.g. 'gyenge')
-                forecast_wind_force_str = wind_div['class'][-1]
-                _LOGGER.debug('Wind force string: ' + forecast_wind_force_str)
-                #Get wind direction from style attribute: style="--rotateAngle:158deg"
-                forecast_wind_direction = int(re.search(r'--rotateAngle:\s*(\d+)deg', wind_div.get('style', '--rotateAngle:0deg')).group(1))
-                #Get mapped wind speed from wind force string
-                forecast_wind_speed = wind_mapping.get(forecast_wind_force_str)
-                _LOGGER.debug('Wind direction: ' + str(forecast_wind_direction))
-
-                #===== RAIN =======
-                precipitation_obj = forecast_card.find("div" , attrs={'class': 'ik hourly-rainlevel'}, recursive=True)
-                if (precipitation_obj != None):
-                    #Precipitation value in comment :)
-                    precipitation_obj = precipitation_obj.find_all(string=lambda text: isinstance(text, Comment))
-                    _precipitation = float(precipitation_obj[0][:-2]) or 0.0
-                    _LOGGER.debug(_precipitation)
-                    _precipitation_probability = forecast_card.find("div" , attrs={'class': 'ik hourly-rain-chance'}, recursive=False).find("a", recursive=False).get_text()[:-1]
-                    _LOGGER.debug(_precipitation_probability)
-                else:
-                    _precipitation = 0.0
-                    _precipitation_probability = 0
-                #=================
-
-                # Add forecast element to forecast list
-                hourly_forecast_list.append (Forecast(
-                    datetime=forecast_datetime.isoformat(),
-                    condition=forecast_weather_condition,
-                    temperature=forecast_temperature_value,
-                    wind_speed=forecast_wind_speed,
-                    wind_bearing=forecast_wind_direction,
-                    precipitation_probability=_precipitation_probability,
-                    precipitation=_precipitation,
-                ))
 
-        return {
-            ATTR_API_CURRENT: {
-            ATTR_API_CONDITION: actual_weather_condition, #self._get_condition(current_weather.condition.id),
-            ATTR_API_NATIVE_TEMPERATURE: f"{actual_temperature_value}",
-            ATTR_API_NATIVE_TEMPERATURE_UNIT: UnitOfTemperature.CELSIUS, #actual_temperature_unit,
-            },
-            ATTR_API_HOURLY_FORECAST: hourly_forecast_list,
-            ATTR_API_DAILY_FORECAST: daily_forecast_list,
-        }
+    if run_parser is None:
+        run_parser = _run_inline
+    parser = await _load_parser(run_parser)
+
+    # With a forecast horizon the cards are extracted while the hourly page is streamed (incremental parse),
+    # reading stops once the cards within the horizon are extracted.
+    # NOTE: leaving session.get with an unread body closes the connection instead of returning it to the pool,
+    # so every early stop costs a new TCP + TLS handshake on the next request (keep-alive is lost) => the horizon is off by default.
+    hourly_parser = parser.parse_hourly_forecast
+    read_hourly_body = None
+    feed = None
+    if hourly_horizon:
+        feed = parser.HourlyCardFeed(hourly_horizon)
+        hourly_parser = partial(parser.parse_fed_hourly_forecast, feed)
+        read_hourly_body = partial(feed_until_horizon, feed=feed, run_parser=run_parser)
+
+    start = perf_counter()
+    hourly_forecast_cards = await fetch_and_parse(
+        session, hourly_forecast_url, run_parser, hourly_parser, hungary_time, local_tz, budapest_tz,
+        page_cache=page_cache, request_limiter=request_limiter, page=PAGE_HOURLY, stats=stats, read_body=read_hourly_body, transfer_stats=transfer_stats,
+    )
+    if stats is not None:
+        # Time to first forecast: the first card of the incremental parse, otherwise the whole page is parsed at once
+        first_forecast_at = feed.first_card_at if feed is not None and feed.first_card_at is not None else perf_counter()
+        stats.timings[PAGE_HOURLY + '_first_forecast'] = round((first_forecast_at - start) * 1000, 3)
+    if stats is not None:
+        stats.hourly_cards = len(hourly_forecast_cards)
+
+    return {HOURLY_CARDS: hourly_forecast_cards}
 #======================================================================================================
 
+def serialize_data(data: dict[str, Any]) -> dict[str, Any]:
+    """Return the JSON serializable representation of the coordinator data."""
+    return {
+        ATTR_API_CURRENT: data[ATTR_API_CURRENT],
+        ATTR_API_HOURLY_FORECAST: data[ATTR_API_HOURLY_FORECAST].as_dict(),
+        ATTR_API_DAILY_FORECAST: data[ATTR_API_DAILY_FORECAST].as_dict(),
+    }
+
+def deserialize_data(data: dict[str, Any]) -> dict[str, Any]:
+    """Return the coordinator data from its serialized representation."""
+    forecasts = {
+        section: ForecastSeries.from_dict(data[section], columns)
+        for section, columns in ((ATTR_API_HOURLY_FORECAST, HOURLY_FORECAST_COLUMNS), (ATTR_API_DAILY_FORECAST, DAILY_FORECAST_COLUMNS))
+    }
+    # Summary is not persisted, it is computed from the forecasts
+    return with_forecast_summary({ATTR_API_CURRENT: data[ATTR_API_CURRENT], **forecasts})
+
+def with_forecast_summary(data: dict[str, Any]) -> dict[str, Any]:
+    """Return the data completed with the aggregates of its forecasts (computed once, sensors only read them)."""
+    return {
+        **data,
+        ATTR_API_FORECAST_SUMMARY: summarize_forecast(data[ATTR_API_HOURLY_FORECAST], data[ATTR_API_DAILY_FORECAST], dt_util.utcnow()),
+    }
+
+def snapshot_store(hass: HomeAssistant, location: str) -> Store:
+    """Return the store of the location's data snapshot."""
+    return Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.snapshot_{slugify(location or DEFAULT_LOCATION)}")
+
 class WeatherUpdateCoordinator(DataUpdateCoordinator):
-    """Weather data update coordinator."""
+    """Weather data update coordinator.
 
-    def __init__(self, location: str, hass: HomeAssistant, ) -> None:
+    The pages of the location are refreshed by independent page refreshers (own interval, error state and
+    circuit breaker), the coordinator wakes up when the next page is due and refreshes the due pages only.
+    Sections of a failing page are served from the last good data (stale), the other sections are refreshed.
+    """
+
+    def __init__(self, location: str, hass: HomeAssistant, scheduler: IdokepFetchScheduler, hourly_horizon: int = HOURLY_FORECAST_HORIZON, ) -> None:
         """Initialize coordinator."""
         self._location = location
+        # Integration wide scheduler (refresh slots, request rate limit)
+        self._scheduler = scheduler
+        # Refreshers of the pages, refreshes of the locations are spread over the intervals (slot offset)
+        self.page_refreshers = {
+            page: PageRefresher(page, interval, scheduler.slot_offset(location, interval))
+            for page, interval in PAGE_UPDATE_INTERVALS.items()
+        }
+        # Sun times of the latest current weather page
+        self._sun_times = None
+        # Number of hourly forecast cards read from the page (None => whole page), set by the entry option
+        self.hourly_horizon = hourly_horizon or None
         self._attr_supported_features = (
             WeatherEntityFeature.FORECAST_DAILY |
             WeatherEntityFeature.FORECAST_HOURLY
@@ -327,21 +357,255 @@ class WeatherUpdateCoordinator(DataUpdateCoordinator):
         self.local_tz = None
         self.budapest_tz = None
         self.local_tz_name = "Europe/Budapest"
+        # Pooled aiohttp session of the integration (connection pool is reused by every refresh and every config entry),
+        # it doesn't decompress => bodies are decoded while streamed & wire / decoded bytes are counted per URL
+        self._session = async_get_transfer_session(hass)
+        self.transfer_stats = TransferStats()
+        # Validators and parsed results of the last downloaded pages (hits / misses are counted)
+        self.page_cache = PageCache()
+        # Sections changed by the last refresh, only their listeners are notified
+        self.changed_sections: set[str] = set(DATA_SECTIONS)
+        # Snapshot of the last good data on disk
+        self._store = snapshot_store(hass, location)
+        self.snapshot_restored = False
+        # Past hourly forecasts scored against the observed temperature (forecast accuracy)
+        self.forecast_history = ForecastHistoryTracker(hass, location)
+        # Statistics (stage timings, sizes, card counts) of the latest refreshes
+        self.refresh_history: deque[RefreshStats] = deque(maxlen=REFRESH_HISTORY_SIZE)
+        # Requested refresh shared by the concurrent refresh requests & freshness of the data not fetched again
+        self._requested_refresh: asyncio.Task | None = None
+        self.min_freshness = MIN_REFRESH_FRESHNESS
+        # Requested refreshes go ahead of the background polls in the request queue (and refresh every page)
+        self._refresh_requested = False
         if hass and hasattr(hass, "config") and hasattr(hass.config, "time_zone") and hass.config.time_zone:
             self.local_tz_name = hass.config.time_zone
         _LOGGER.debug('LOCAL TIMEZONE NAME: ' + str(self.local_tz_name))
 
+        # always_update=False => listeners are not called at all if the refreshed data is equal to the previous one
         super().__init__(
-            hass, _LOGGER, name=DOMAIN, update_interval=WEATHER_UPDATE_INTERVAL
+            hass, _LOGGER, name=DOMAIN, update_interval=min(PAGE_UPDATE_INTERVALS.values()), always_update=False
         )
 
+    @property
+    def data_timestamp(self) -> datetime | None:
+        """Return the time of the oldest page data (None if a page was never refreshed)."""
+        return self.section_timestamp(None)
+
+    def section_timestamp(self, section: str | None) -> datetime | None:
+        """Return the time of the oldest page data of the section (of every page if section is None)."""
+        timestamps = [self.page_refreshers[page].last_success for page in SECTION_PAGES.get(section, PAGE_UPDATE_INTERVALS)]
+        return None if None in timestamps else min(timestamps)
+
+    @property
+    def is_stale(self) -> bool:
+        """Return True if any page failed to refresh (last good data is served) or its data is older than the stale limit."""
+        return self.section_is_stale(None)
+
+    def section_is_stale(self, section: str | None) -> bool:
+        """Return True if a page of the section is stale (any page if the section is unknown, e.g. None)."""
+        now = dt_util.utcnow()
+        return any(self.page_refreshers[page].is_stale(now) for page in SECTION_PAGES.get(section, PAGE_UPDATE_INTERVALS))
+
+    def _stale_sections(self) -> set[str]:
+        return {section for section in DATA_SECTIONS if self.section_is_stale(section)}
+
+    async def async_load_snapshot(self) -> bool:
+        """Load the last persisted data (and forecast history), returns True if the entities can be served from it."""
+        await self.forecast_history.async_load()
+        try:
+            snapshot = await self._store.async_load()
+            if not snapshot:
+                return False
+            data = deserialize_data(snapshot["data"])
+            page_timestamps = {
+                page: dt_util.parse_datetime(timestamp)
+                for page, timestamp in snapshot["page_timestamps"].items()
+                if page in self.page_refreshers and timestamp
+            }
+        # Snapshot of an other version (the store has no migration) or undecodable data => as if there was none
+        except (NotImplementedError, AttributeError, KeyError, TypeError, ValueError) as err:
+            _LOGGER.debug('Snapshot ignored: ' + repr(err))
+            return False
+        self.data = data
+        for page, timestamp in page_timestamps.items():
+            self.page_refreshers[page].last_success = timestamp
+        self.snapshot_restored = True
+        _LOGGER.debug('Snapshot restored from ' + str(page_timestamps) + (' (stale)' if self.is_stale else ''))
+        return True
+
+    @callback
+    def _snapshot_data(self) -> dict[str, Any]:
+        """Return the data to be persisted."""
+        return {
+            "timestamp": self.data_timestamp.isoformat() if self.data_timestamp else None,
+            "page_timestamps": {
+                page: refresher.last_success.isoformat() if refresher.last_success else None
+                for page, refresher in self.page_refreshers.items()
+            },
+            "data": serialize_data(self.data),
+        }
+
+    async def async_remove_persisted_data(self) -> None:
+        """Remove the snapshot and the forecast history of the location from disk (pending saves are cancelled)."""
+        await self._store.async_remove()
+        await self.forecast_history.async_remove()
+
+    @property
+    def last_refresh_stats(self) -> RefreshStats | None:
+        """Return the statistics of the latest refresh."""
+        return self.refresh_history[-1] if self.refresh_history else None
+
+    async def async_request_refresh(self) -> None:
+        """Request a refresh, concurrent requests share the same in-flight refresh (single-flight).
+
+        Entities request refreshes one by one (e.g. homeassistant.update_entity on several entities),
+        so recent enough data is returned without fetching.
+        """
+        task = self._requested_refresh
+        if task is None:
+            data_timestamp = self.data_timestamp
+            if self.last_update_success and data_timestamp is not None and dt_util.utcnow() - data_timestamp < self.min_freshness:
+                _LOGGER.debug('Refresh request served from data of ' + data_timestamp.isoformat())
+                return
+            self._refresh_requested = True
+            # Tracked task => it is cancelled when the config entry is unloaded (or Home Assistant stops)
+            name = f"{DOMAIN} requested refresh {self._location}"
+            if self.config_entry is not None:
+                task = self.config_entry.async_create_background_task(self.hass, self.async_refresh(), name)
+            else:
+                task = self.hass.async_create_background_task(self.async_refresh(), name)
+            self._requested_refresh = task
+            task.add_done_callback(lambda _: setattr(self, "_requested_refresh", None))
+        else:
+            _LOGGER.debug('Joining in-flight refresh of location: ' + str(self._location))
+        # Shielded => a cancelled requester doesn't cancel the refresh of the others
+        await asyncio.shield(task)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners subscribed to a changed section (or to all sections)."""
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or context in self.changed_sections:
+                update_callback()
+
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh data, listeners of the refresh statistics are notified after every refresh (even if data didn't change)."""
+        was_stale = self._stale_sections()
+        await super()._async_refresh(*args, **kwargs)
+        # Stale flag is shown by the entities => the ones of the sections whose flag changed are updated (the data may be the same)
+        stale_changed = was_stale ^ self._stale_sections()
+        if stale_changed:
+            self.changed_sections = stale_changed
+            self.async_update_listeners()
+        for update_callback, context in list(self._listeners.values()):
+            if context == DIAGNOSTICS_SECTION:
+                update_callback()
+
+    async def _async_fetch_page(self, refresher: PageRefresher, fetch: Callable[[], Awaitable[dict[str, Any]]]) -> dict[str, Any] | None:
+        """Fetch a page, returns None if it failed (the failure is recorded by the page refresher)."""
+        try:
+            return await fetch()
+        except Exception as err:  # noqa: BLE001
+            refresher.record_failure(dt_util.utcnow(), err)
+            _LOGGER.debug('Refresh of page ' + refresher.page + ' failed ' + str(refresher.interval.failures) + ' times (' + repr(err) + '), next refresh at ' + str(refresher.next_refresh))
+            return None
+
     async def _async_update_data(self):
-        """Update the data."""
+        """Update the sections of the due pages."""
         # Initialize timezones asynchronously if not already done
         if self.local_tz is None:
-            self.local_tz = await self.hass.async_add_executor_job(pytz.timezone, self.local_tz_name)
+            self.local_tz = await dt_util.async_get_time_zone(self.local_tz_name)
         if self.budapest_tz is None:
-            self.budapest_tz = await self.hass.async_add_executor_job(pytz.timezone, "Europe/Budapest")
-
-        weather_data = await FetchWeatherData(self._location, self.local_tz, self.budapest_tz)
+            self.budapest_tz = await dt_util.async_get_time_zone("Europe/Budapest")
+
+        # Every listener shall be notified if the refresh fails (availability changes)
+        self.changed_sections = set(DATA_SECTIONS)
+
+        now = dt_util.utcnow()
+        # Requested refresh refreshes every page, pages of an open circuit breaker are not requested until its probe
+        due_pages = [
+            page for page, refresher in self.page_refreshers.items()
+            if (self._refresh_requested or refresher.is_due(now)) and refresher.allow_request(now)
+        ]
+
+        # Parsing of the pages is CPU bound => it runs in the executor, not on the event loop
+        stats = RefreshStats(now.isoformat())
+        self.refresh_history.append(stats)
+        # First refresh (entities wait for it) and requested refreshes are prioritized
+        priority = PRIORITY_INTERACTIVE if self.data is None or self.snapshot_restored or self._refresh_requested else PRIORITY_BACKGROUND
+        self._refresh_requested = False
+        request_limiter = self._scheduler.request_limiter.limit(priority)
+        run_parser = self.hass.async_add_executor_job
+
+        fetches = {
+            PAGE_ACTUAL: lambda: FetchCurrentWeather(self._session, self._location, self.budapest_tz, run_parser, self.page_cache, request_limiter, stats, transfer_stats=self.transfer_stats),
+            PAGE_HOURLY: lambda: FetchHourlyForecast(self._session, self._location, self.local_tz, self.budapest_tz, run_parser, self.page_cache, request_limiter, stats, hourly_horizon=self.hourly_horizon, transfer_stats=self.transfer_stats),
+        }
+        with measure(stats.timings, 'refresh'):
+            # Due pages are downloaded concurrently (the first refresh too), each page is parsed as soon as its own body arrived
+            page_results = await asyncio.gather(*(self._async_fetch_page(self.page_refreshers[page], fetches[page]) for page in due_pages))
+            results = dict(zip(due_pages, page_results))
+        if results.get(PAGE_ACTUAL) is not None:
+            self._sun_times = results[PAGE_ACTUAL][SUN_TIMES]
+        if results.get(PAGE_HOURLY) is not None:
+            if self._sun_times is None:
+                # Night conditions of the hourly forecast need the sun times => it waits for the next refresh of the current weather page
+                del results[PAGE_HOURLY]
+                self.page_refreshers[PAGE_HOURLY].next_refresh = self.page_refreshers[PAGE_ACTUAL].next_refresh
+            else:
+                # Applied after the download (the cards may come from the page cache) with the latest known sun times
+                parser = await _load_parser(run_parser)
+                hourly_forecast_list = parser.apply_night_condition(results[PAGE_HOURLY][HOURLY_CARDS], *self._sun_times)
+                results[PAGE_HOURLY] = {ATTR_API_HOURLY_FORECAST: ForecastSeries.from_forecasts(hourly_forecast_list, HOURLY_FORECAST_COLUMNS)}
+        _LOGGER.debug('Page cache hits: ' + str(self.page_cache.hits) + ' misses: ' + str(self.page_cache.misses))
+        _LOGGER.debug('Refresh statistics: ' + str(stats))
+
+        # Sections of the failed (or not due) pages keep their last good data
+        weather_data = dict(self.data) if self.data is not None else {}
+        for result in results.values():
+            if result is not None:
+                weather_data.update((section, value) for section, value in result.items() if section in DATA_SECTIONS)
+        if ATTR_API_CURRENT not in weather_data:
+            self._async_schedule_wakeup(now)
+            raise UpdateFailed('No current weather of ' + str(self._location) + ': ' + str(self.page_refreshers[PAGE_ACTUAL].last_error))
+        # Hourly forecast never fetched (e.g. its page is broken) => current weather is served with an empty (stale) hourly forecast
+        weather_data.setdefault(ATTR_API_HOURLY_FORECAST, ForecastSeries.from_forecasts([], HOURLY_FORECAST_COLUMNS))
+        weather_data = with_forecast_summary(weather_data)
+
+        # After a failed refresh every entity becomes available again => all sections count as changed
+        # The same applies to the first refresh after a snapshot restore (stale flag changes)
+        if self.data is not None and self.last_update_success and not self.snapshot_restored:
+            self.changed_sections = {section for section in DATA_SECTIONS if weather_data[section] != self.data[section]}
+            # Unchanged sections keep their previous objects => forecast dicts built from them remain cached
+            weather_data = {
+                section: self.data[section] if section in DATA_SECTIONS and section not in self.changed_sections else value
+                for section, value in weather_data.items()
+            }
+        _LOGGER.debug('Changed sections: ' + str(self.changed_sections))
+
+        # Intervals of the refreshed pages adapt to their own content changes (unknown after a restore)
+        now = dt_util.utcnow()
+        for page, result in results.items():
+            if result is None:
+                continue
+            content_changed = None
+            if self.data is not None and not self.snapshot_restored:
+                content_changed = any(result[section] != self.data[section] for section in result if section in DATA_SECTIONS)
+            self.page_refreshers[page].record_success(now, content_changed)
+        self._async_schedule_wakeup(now)
+
+        if any(result is not None for result in results.values()):
+            self.snapshot_restored = False
+            current_weather = weather_data[ATTR_API_CURRENT] if results.get(PAGE_ACTUAL) is not None else {}
+            hourly_forecast = weather_data[ATTR_API_HOURLY_FORECAST] if results.get(PAGE_HOURLY) is not None else None
+            self.forecast_history.async_record(now, hourly_forecast, current_weather.get(ATTR_API_NATIVE_TEMPERATURE))
+            # Saved even if nothing changed, the timestamps of the snapshot shall be fresh
+            self._store.async_delay_save(self._snapshot_data, SNAPSHOT_SAVE_DELAY)
         return weather_data
+
+    @callback
+    def _async_schedule_wakeup(self, now: datetime) -> None:
+        """Wake up the coordinator when the next page is due."""
+        next_refresh = min((refresher.next_refresh or now) for refresher in self.page_refreshers.values())
+        self.update_interval = max(next_refresh - now, MIN_WAKEUP_INTERVAL)
+        _LOGGER.debug('Next refresh in ' + str(self.update_interval))
@@ -0,0 +1,35 @@
+"""Diagnostics support for the Idokep Weather service."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from . import IdokepConfigEntry
+from .const import ATTR_API_LOCATION
+from .coordinator import serialize_data
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: IdokepConfigEntry) -> dict[str, Any]:
+    """Return diagnostics of a config entry."""
+    coordinator = entry.runtime_data.coordinator
+
+    return {
+        "location": entry.data.get(ATTR_API_LOCATION),
+        "last_update_success": coordinator.last_update_success,
+        "update_interval": str(coordinator.update_interval),
+        "data_timestamp": coordinator.data_timestamp.isoformat() if coordinator.data_timestamp else None,
+        "stale": coordinator.is_stale,
+        "pages": {page: refresher.as_dict() for page, refresher in coordinator.page_refreshers.items()},
+        "page_cache": {
+            "hits": coordinator.page_cache.hits,
+            "misses": coordinator.page_cache.misses,
+        },
+        "transfer": {
+            "wire_bytes": coordinator.transfer_stats.wire_bytes,
+            "decoded_bytes": coordinator.transfer_stats.decoded_bytes,
+        },
+        "refresh_history": [stats.as_dict() for stats in coordinator.refresh_history],
+        "data": serialize_data(coordinator.data) if coordinator.data is not None else None,
+    }
@@ -0,0 +1,171 @@
+"""Compact forecast storage of the Idokep Weather service."""
+
+from __future__ import annotations
+
+from array import array
+from datetime import datetime, timedelta
+from math import isnan
+from typing import Any
+
+from homeassistant.components.weather import Forecast
+from homeassistant.util import dt as dt_util
+
+# Missing numeric value (e.g. unknown wind force) in a column
+_MISSING = float("nan")
+
+# Numeric Forecast keys of the hourly / daily forecast and the type of their values
+HOURLY_FORECAST_COLUMNS: dict[str, type] = {
+    "temperature": float,
+    "wind_speed": float,
+    "wind_bearing": int,
+    "precipitation_probability": int,
+    "precipitation": float,
+}
+DAILY_FORECAST_COLUMNS: dict[str, type] = {
+    "temperature": float,
+    "templow": float,
+    "precipitation": float,
+}
+
+# Keys of the forecast summary (aggregates of the forecasts computed once per refresh)
+SUMMARY_RAIN_NEXT_3H = "rain_next_3h"
+SUMMARY_PRECIPITATION_PROBABILITY_NEXT_3H = "precipitation_probability_next_3h"
+SUMMARY_HOURS_UNTIL_PRECIPITATION = "hours_until_precipitation"
+SUMMARY_TEMPERATURE_MAX_TODAY = "temperature_max_today"
+SUMMARY_TEMPERATURE_MIN_TODAY = "temperature_min_today"
+# Window of the near term aggregates from the start of the current hour's card (the current card and the next two)
+SUMMARY_NEAR_TERM = timedelta(hours=3)
+
+
+class ForecastSeries:
+    """Columnar store of a forecast list.
+
+    Numeric values are kept in typed float arrays, datetimes and conditions in shared tuples.
+    Forecast dicts are built only on demand and cached (the series is immutable).
+    """
+
+    __slots__ = ("datetimes", "conditions", "_columns", "_values", "_forecasts")
+
+    def __init__(self, datetimes: tuple[str, ...], conditions: tuple[str, ...], columns: dict[str, type], values: dict[str, array]) -> None:
+        """Initialize the series."""
+        self.datetimes = datetimes
+        self.conditions = conditions
+        self._columns = columns
+        self._values = values
+        self._forecasts: list[Forecast] | None = None
+
+    @classmethod
+    def from_forecasts(cls, forecasts: list[Forecast], columns: dict[str, type]) -> ForecastSeries:
+        """Create the series from a Forecast list."""
+        return cls(
+            tuple(forecast["datetime"] for forecast in forecasts),
+            tuple(forecast.get("condition") for forecast in forecasts),
+            columns,
+            {
+                key: array("d", (_MISSING if forecast.get(key) is None else forecast[key] for forecast in forecasts))
+                for key in columns
+            },
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, list], columns: dict[str, type]) -> ForecastSeries:
+        """Create the series from its dict representation (see as_dict)."""
+        return cls(
+            tuple(data["datetime"]),
+            tuple(data["condition"]),
+            columns,
+            {key: array("d", (_MISSING if value is None else value for value in data[key])) for key in columns},
+        )
+
+    def __len__(self) -> int:
+        """Return the number of forecast entries."""
+        return len(self.datetimes)
+
+    def __eq__(self, other: object) -> bool:
+        """Return True if the other series holds the same forecast."""
+        if not isinstance(other, ForecastSeries):
+            return NotImplemented
+        # Bytes are compared, so missing (NaN) values are equal too
+        return (
+            self.datetimes == other.datetimes
+            and self.conditions == other.conditions
+            and self._values.keys() == other._values.keys()
+            and all(values.tobytes() == other._values[key].tobytes() for key, values in self._values.items())
+        )
+
+    __hash__ = None
+
+    def column(self, key: str) -> list[Any]:
+        """Return the typed values of a numeric column (None for missing values)."""
+        value_type = self._columns[key]
+        return [None if isnan(value) else value_type(value) for value in self._values[key]]
+
+    def as_forecasts(self) -> list[Forecast]:
+        """Return the Forecast list, it is built at the first call only."""
+        if self._forecasts is None:
+            columns = {key: self.column(key) for key in self._columns}
+            self._forecasts = [
+                Forecast(
+                    datetime=self.datetimes[index],
+                    condition=self.conditions[index],
+                    **{key: values[index] for key, values in columns.items()},
+                )
+                for index in range(len(self.datetimes))
+            ]
+        return self._forecasts
+
+    def as_dict(self) -> dict[str, list]:
+        """Return the JSON serializable, columnar representation of the series."""
+        return {
+            "datetime": list(self.datetimes),
+            "condition": list(self.conditions),
+            **{key: self.column(key) for key in self._columns},
+        }
+
+
+def summarize_forecast(hourly: ForecastSeries, daily: ForecastSeries, now: datetime) -> dict[str, Any]:
+    """Return the aggregates of the forecasts as of now (single pass over the columns, None if unknown)."""
+    temperatures = hourly.column("temperature")
+    precipitations = hourly.column("precipitation")
+    probabilities = hourly.column("precipitation_probability")
+    today = dt_util.as_local(now).date()
+
+    rain_next_3h = 0.0
+    probability_next_3h = None
+    hours_until_precipitation = None
+    near_term_end = None
+    temperatures_today = []
+    for index, forecast_datetime in enumerate(map(dt_util.parse_datetime, hourly.datetimes)):
+        # Hours already passed are skipped
+        if forecast_datetime is None or forecast_datetime + timedelta(hours=1) <= now:
+            continue
+        # Window starts at the first card not passed => it doesn't move with the minutes of the hour
+        if near_term_end is None:
+            near_term_end = forecast_datetime + SUMMARY_NEAR_TERM
+        if forecast_datetime < near_term_end:
+            rain_next_3h += precipitations[index] or 0.0
+            if probabilities[index] is not None:
+                probability_next_3h = max(probability_next_3h or 0, probabilities[index])
+        if hours_until_precipitation is None and precipitations[index]:
+            hours_until_precipitation = round(max((forecast_datetime - now).total_seconds(), 0) / 3600, 1)
+        if dt_util.as_local(forecast_datetime).date() == today and temperatures[index] is not None:
+            temperatures_today.append(temperatures[index])
+
+    # Daily forecast of today (if there is any) holds the extremes of the whole day
+    temperature_max_today = max(temperatures_today, default=None)
+    temperature_min_today = min(temperatures_today, default=None)
+    today_iso = today.isoformat()
+    for index, forecast_date in enumerate(daily.datetimes):
+        if forecast_date[:10] == today_iso:
+            daily_max, daily_min = daily.column("temperature")[index], daily.column("templow")[index]
+            temperature_max_today = temperature_max_today if daily_max is None else daily_max
+            temperature_min_today = temperature_min_today if daily_min is None else daily_min
+            break
+
+    return {
+        SUMMARY_RAIN_NEXT_3H: round(rain_next_3h, 1),
+        SUMMARY_PRECIPITATION_PROBABILITY_NEXT_3H: probability_next_3h,
+        SUMMARY_HOURS_UNTIL_PRECIPITATION: hours_until_precipitation,
+        SUMMARY_TEMPERATURE_MAX_TODAY: temperature_max_today,
+        SUMMARY_TEMPERATURE_MIN_TODAY: temperature_min_today,
+    }
@@ -0,0 +1,17 @@
+"""Helpers of the Idokep Weather config entries."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from .const import OPTION_DEFAULTS
+
+
+def build_data_and_options(combined_data: dict[str, Any],) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Split combined data and options."""
+    data = {k: v for k, v in combined_data.items() if k not in OPTION_DEFAULTS}
+    options = {
+        option: combined_data.get(option, default)
+        for option, default in OPTION_DEFAULTS.items()
+    }
+    return (data, options)
@@ -0,0 +1,165 @@
+"""Forecast accuracy tracking of the Idokep Weather service."""
+
+from __future__ import annotations
+
+from array import array
+import base64
+import binascii
+from datetime import datetime
+import logging
+from math import isnan
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import DEFAULT_LOCATION, DOMAIN
+from .forecast import ForecastSeries
+
+_LOGGER = logging.getLogger(__name__)
+
+HISTORY_STORAGE_VERSION = 1
+HISTORY_SAVE_DELAY = 60
+# Forecasts are tracked up to this lead time (hours), the ring buffer holds this many target hours
+HISTORY_MAX_LEAD = 48
+
+_MISSING = float("nan")
+_NO_HOUR = -1
+
+
+def _epoch_hour(moment: datetime) -> int:
+    """Return the number of whole hours since the epoch."""
+    return int(moment.timestamp() // 3600)
+
+
+class ForecastHistory:
+    """Memory bounded history of the hourly temperature forecasts and their errors.
+
+    - predictions are kept in a ring buffer of typed arrays: one slot per target hour, one value per lead time (hours)
+    - when the current weather of a target hour is observed, the absolute errors of its predictions are
+      added to the per lead time error sums and the slot is released
+    The arrays are allocated once, so memory stays flat regardless of the uptime.
+    """
+
+    def __init__(self, max_lead: int = HISTORY_MAX_LEAD) -> None:
+        """Initialize the history."""
+        self._max_lead = max_lead
+        self._target_hours = array("q", [_NO_HOUR] * max_lead)
+        self._predictions = array("d", [_MISSING] * (max_lead * max_lead))
+        self._error_sums = array("d", [0.0] * max_lead)
+        self._error_counts = array("q", [0] * max_lead)
+
+    def _slot(self, target_hour: int, reset: bool) -> int | None:
+        """Return the slot of the target hour (a reset slot is taken over), None if the hour has no slot."""
+        slot = target_hour % self._max_lead
+        if self._target_hours[slot] != target_hour:
+            if not reset:
+                return None
+            self._target_hours[slot] = target_hour
+            self._predictions[slot * self._max_lead:(slot + 1) * self._max_lead] = array("d", [_MISSING] * self._max_lead)
+        return slot
+
+    def record_forecast(self, now: datetime, hourly: ForecastSeries) -> None:
+        """Record the hourly temperature forecast made now (the latest forecast of a lead time wins)."""
+        now_hour = _epoch_hour(now)
+        for forecast_datetime, temperature in zip(hourly.datetimes, hourly.column("temperature")):
+            forecast_datetime = dt_util.parse_datetime(forecast_datetime)
+            if forecast_datetime is None or temperature is None:
+                continue
+            target_hour = _epoch_hour(forecast_datetime)
+            lead = target_hour - now_hour
+            if 0 < lead < self._max_lead:
+                slot = self._slot(target_hour, reset=True)
+                self._predictions[slot * self._max_lead + lead] = temperature
+
+    def record_observation(self, now: datetime, temperature: float | None) -> None:
+        """Score the predictions of the current hour against the observed temperature."""
+        if temperature is None:
+            return
+        slot = self._slot(_epoch_hour(now), reset=False)
+        if slot is None:
+            return
+        for lead in range(self._max_lead):
+            predicted = self._predictions[slot * self._max_lead + lead]
+            if not isnan(predicted):
+                self._error_sums[lead] += abs(predicted - temperature)
+                self._error_counts[lead] += 1
+        # Every target hour is scored once
+        self._target_hours[slot] = _NO_HOUR
+
+    def mean_absolute_error(self, first_lead: int, last_lead: int) -> float | None:
+        """Return the mean absolute temperature error of the forecasts made first_lead..last_lead hours ahead."""
+        leads = range(max(first_lead, 0), min(last_lead + 1, self._max_lead))
+        count = sum(self._error_counts[lead] for lead in leads)
+        if not count:
+            return None
+        return round(sum(self._error_sums[lead] for lead in leads) / count, 2)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the compact (base64 encoded arrays) representation of the history."""
+        return {
+            "max_lead": self._max_lead,
+            **{
+                name: base64.b64encode(values.tobytes()).decode("ascii")
+                for name, values in (
+                    ("target_hours", self._target_hours),
+                    ("predictions", self._predictions),
+                    ("error_sums", self._error_sums),
+                    ("error_counts", self._error_counts),
+                )
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ForecastHistory:
+        """Create the history from its dict representation (see as_dict)."""
+        history = cls(data["max_lead"])
+        arrays = {}
+        for name in ("target_hours", "predictions", "error_sums", "error_counts"):
+            values = getattr(history, "_" + name)
+            restored = array(values.typecode)
+            # Undecodable or partial items, or an array of an other size (corrupt data) => the whole history is dropped,
+            # the arrays belong together
+            try:
+                restored.frombytes(base64.b64decode(data[name], validate=True))
+            except (binascii.Error, ValueError):
+                return history
+            if len(restored) != len(values):
+                return history
+            arrays[name] = restored
+        for name, restored in arrays.items():
+            getattr(history, "_" + name)[:] = restored
+        return history
+
+
+class ForecastHistoryTracker:
+    """Forecast history of a location, persisted on disk."""
+
+    def __init__(self, hass: HomeAssistant, location: str) -> None:
+        """Initialize the tracker."""
+        self._store = history_store(hass, location)
+        self.history = ForecastHistory()
+
+    async def async_load(self) -> None:
+        """Load the history from disk."""
+        stored = await self._store.async_load()
+        if stored and stored.get("max_lead") == HISTORY_MAX_LEAD:
+            self.history = ForecastHistory.from_dict(stored)
+
+    @callback
+    def async_record(self, now: datetime, hourly: ForecastSeries | None, temperature: float | None) -> None:
+        """Score the observed temperature, then record the new forecast (if they were refreshed)."""
+        self.history.record_observation(now, temperature)
+        if hourly is not None:
+            self.history.record_forecast(now, hourly)
+        self._store.async_delay_save(self.history.as_dict, HISTORY_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Remove the persisted history (a pending save is cancelled)."""
+        await self._store.async_remove()
+
+
+def history_store(hass: HomeAssistant, location: str) -> Store:
+    """Return the store of the location's forecast history."""
+    return Store(hass, HISTORY_STORAGE_VERSION, f"{DOMAIN}.history_{slugify(location or DEFAULT_LOCATION)}")
@@ -0,0 +1,464 @@
+"""HTML parsing of the Idokep Weather pages."""
+
+from datetime import datetime, timedelta, time, timezone
+from functools import lru_cache
+from html.parser import HTMLParser
+import logging
+import re
+from time import perf_counter
+
+from bs4 import BeautifulSoup, Comment, SoupStrainer
+from bs4.builder import builder_registry
+
+from homeassistant.components.weather import Forecast
+from homeassistant.const import UnitOfTemperature
+
+from .const import (
+    ATTR_API_CONDITION,
+    ATTR_API_NATIVE_TEMPERATURE,
+    ATTR_API_NATIVE_TEMPERATURE_UNIT,
+    HTML_PARSER_BACKENDS,
+)
+from .stats import measure
+
+_LOGGER = logging.getLogger(__name__)
+
+weather_conditions = {
+ 'napos': 'sunny',
+ 'derült':  'sunny',
+ 'borult': 'cloudy',
+ 'erősen felhős': 'cloudy',
+ 'közepesen felhős': 'partlycloudy',
+ 'gyengén felhős': 'partlycloudy',
+ 'zivatar': 'lightning-rainy',
+ 'zápor': 'rainy',
+ 'szitálás': 'rainy',
+ 'gyenge eső': 'rainy',
+ 'eső': 'rainy',
+ 'eső viharos széllel': 'rainy',
+ # The following conditions shall be tested/confirmed
+ 'köd': 'fog',
+ 'párás': 'fog',
+ 'pára': 'fog',
+ 'villámlás': 'lightning',
+ 'erős eső': 'pouring',
+ 'jégeső': 'hail',
+ 'havazás': 'snowy',
+ 'intenzív havazás': 'snowy',
+ 'hószállingózás': 'snowy',
+ 'hófúvás': 'snowy',
+ 'hófúvás havazással': 'snowy',
+ 'hózápor': 'snowy',
+ 'havas eső': 'snowy-rainy',
+ 'fagyott eső': 'snowy-rainy',
+ 'ónos eső': 'snowy-rainy',
+ 'szeles': 'windy',
+ 'száraz zivatar': 'lightning',
+#Not mapped 
+#clear-night	Clear night
+#exceptional	Exceptional
+#windy-variant	Wind and clouds
+}
+
+wind_mapping = {
+    'szélcsend': 0,   # 0-1 km/h
+    'gyenge szellő': 4, #fuvallat (2-6 km/h)
+    'enyhe': 9, # (7-11 km/h)
+    'gyenge': 15, # (12-19 km/h)
+    'mersekelt': 25, # (20-29 km/h)
+    'elenk': 35, # (30-39 km/h)
+    'eros': 45, # (40-49 km/h)
+    'viharos': 55, # (50-60 km/h)
+    'élénk viharos szél': 66, #(61-72 km/h)
+    'heves vihar': 79, #(73-85 km/h)
+    'dühöngő vihar': 93, # (86-100 km/h)
+    'heves szélvész': 108, # (101-115 km/h)
+    'orkán': 118, #(115-120 km/h)
+}
+
+#============== HTML parser backend selection ================
+_parser_backend = None
+
+def get_parser_backend():
+    """Return the first available BeautifulSoup tree builder of HTML_PARSER_BACKENDS."""
+    global _parser_backend
+    if _parser_backend is None:
+        _parser_backend = next(backend for backend in HTML_PARSER_BACKENDS if builder_registry.lookup(backend) is not None)
+        _LOGGER.debug('HTML parser backend: ' + _parser_backend)
+    return _parser_backend
+
+def make_soup(html_string, backend=None, parse_only=None):
+    """Build the document tree of a page with the given (or the auto selected) parser backend.
+
+    With parse_only (SoupStrainer) nodes are built only for the matching elements and their subtrees.
+    """
+    return BeautifulSoup(html_string, backend or get_parser_backend(), parse_only=parse_only)
+
+# Every data of the hourly forecast page is inside the forecast cards => the rest of the page is not built
+HOURLY_CARDS_STRAINER = SoupStrainer('div', attrs={'class': 'wide-hourly-forecast-card'})
+# Data of the current weather page: current weather, sunrise / sunset and the daily forecast columns.
+# While parsing the class attribute is matched as a whole (e.g. 'ik sunrise') => one of the classes is searched by a pattern
+ACTUAL_WEATHER_STRAINER = SoupStrainer(
+    'div', attrs={'class': re.compile(r'(?:^|\s)(?:current-weather-lockup|sunrise|sunset|dailyForecastCol)(?:\s|$)')}
+)
+
+#============== Numeric value of a text ================
+def to_number(text):
+    """Return the numeric value of a text (e.g. '12°C' => 12.0), None if the text has no number."""
+    match = re.search(r'-?\d+(?:[.,]\d+)?', str(text))
+    return float(match.group().replace(',', '.')) if match else None
+
+#============== Generate forecast date from a day of month ================
+def generate_date(forecast_day):
+    # Get today's date
+    today = datetime.today()
+    day = today.day
+    month = today.month
+    year = today.year
+
+    # Check if the input day is less than today's day
+    if forecast_day < day:
+        # Move to the next month
+        if month == 12:  # December, next month is January of next year
+            month = 1
+            year += 1
+        else:
+            month += 1
+
+    # Create the new date
+    try:
+        generated_date = datetime(year, month, forecast_day)
+    except ValueError:
+        _LOGGER.error(f"Invalid day_of_month: {forecast_day} for the month {month}")
+        return f"Invalid day_of_month: {forecast_day} for the month {month}"
+
+    return generated_date
+
+#======================= Parse actual weather page ============================
+def extract_sun_times(soup, hungary_time):
+    """Return the sunrise and sunset times of the day (naive Budapest datetimes)."""
+    sunrise_txt = re.search(r'\d{1,2}:\d{2}', soup.find('img', attrs={'src': '/assets/icons/sunrise.svg'}).parent.text).group()
+    sunset_txt = re.search(r'\d{1,2}:\d{2}', soup.find('img', attrs={'src': '/assets/icons/sunset.svg'}).parent.text).group()
+    sunrise = datetime.strptime(hungary_time.strftime('%Y-%m-%d')+' ' + sunrise_txt, '%Y-%m-%d %H:%M')
+    sunset = datetime.strptime(hungary_time.strftime('%Y-%m-%d')+' ' + sunset_txt, '%Y-%m-%d %H:%M')
+    return sunrise, sunset
+
+def extract_current_weather(soup):
+    """Return the current weather section (raw condition, the clear-night correction is applied by apply_current_night_condition)."""
+    current_weather = soup.find('div', attrs={'class': 'current-weather'})
+    if current_weather is None:
+        raise ValueError('Current weather section not found (truncated or changed page)')
+    actual_weather = current_weather.text.lower()
+    actual_weather_icon = soup.find('div', attrs={'class': 'current-weather-lockup'}).find('img', attrs={'class': 'ik forecast-bigicon'}).get('src')
+    actual_temperature = soup.find('div', attrs={'class': 'ik current-temperature'}).text.strip()
+    #Extract numeric temperature value (handles both '°C' and '℃' unit formats)
+    actual_temperature_value = re.search(r'-?\d+', actual_temperature).group()
+    #Getting mapped weather condition from tuple... if key doesn't exists return 'None'
+    actual_weather_condition = weather_conditions.get(actual_weather, actual_weather)
+
+    _LOGGER.debug('Current Weather: ' + actual_temperature + '  ' + actual_weather + '   (' + actual_weather_icon +')    ' + actual_weather_condition)
+
+    return {
+        ATTR_API_CONDITION: actual_weather_condition,
+        ATTR_API_NATIVE_TEMPERATURE: float(actual_temperature_value),
+        ATTR_API_NATIVE_TEMPERATURE_UNIT: UnitOfTemperature.CELSIUS,
+    }
+
+def extract_daily_forecast(soup):
+    """Return the daily forecast list (soup is the whole page, or the tree strained by ACTUAL_WEATHER_STRAINER)."""
+    # The strained tree holds the columns of the daily forecast container only, the container itself is not built
+    daily_forecast_container = soup.find('div', attrs={'id': 'dailyForecastContainer'})
+    if daily_forecast_container is None:
+        daily_forecast_container = soup
+    daily_forecast_cols = daily_forecast_container.find_all('div', attrs={'class': 'dailyForecastCol'})
+
+    daily_forecast_list = []
+
+    for daily_data in daily_forecast_cols:
+        day = int(daily_data.find('span', attrs={'class':re.compile("ik dfDayNum")}).text)
+        daily_forecast_date = generate_date(day)
+        weather_desc_pattern = r"<div[^>]*>\s*<img[^>]*>\s*([^<]+)"
+        weather_desc_match = re.search(weather_desc_pattern, daily_data.find('div', attrs={'class': 'ik dfIconAlert'}).find('a').attrs['data-bs-content'])
+        if weather_desc_match:
+            daily_weather = weather_desc_match.group(1).strip()
+        daily_weather_condition = weather_conditions.get(daily_weather, daily_weather)
+        daily_temperature_obj = daily_data.find('div', attrs={'class': 'ik min-max-container'}).find('a')
+        daily_temperature_max = to_number(daily_temperature_obj.text)
+        daily_temperature_min = to_number(daily_temperature_obj.find_next('a').text)
+        daily_rain_level_obj = daily_data.find('div', attrs={'class': 'ik rainlevel-container'})
+        if daily_rain_level_obj:
+                search_number_regex_pattern = r"'[\d]+"
+                rain_level_match = re.search(search_number_regex_pattern,(daily_rain_level_obj.find('a').find('span')['class'])[1])
+                rain_level = to_number(rain_level_match.group()) if rain_level_match else 0
+        else:
+            rain_level = 0
+
+        _LOGGER.debug('Date: '+ str(daily_forecast_date) + '  ' + str(daily_weather_condition) + ' max temp: ' + str(daily_temperature_max) + ' min temp: ' + str(daily_temperature_min) + ' rain level: ' + str(rain_level))
+
+        # Add forecast element to forecast list
+        daily_forecast_list.append (Forecast(
+            datetime=daily_forecast_date.isoformat(),
+            condition=daily_weather_condition,
+            temperature=daily_temperature_max,
+            templow=daily_temperature_min,
+            precipitation=rain_level,
+        ))
+
+    return daily_forecast_list
+
+def parse_actual_weather(html_string, hungary_time, backend=None, timings=None, targeted=True):
+    """Extract current weather (raw condition), sunrise/sunset and daily forecast from the /idojaras page.
+
+    In targeted mode only the scraped containers are built into the tree.
+    """
+    with measure(timings, 'actual_soup'):
+        soup = make_soup(html_string, backend, ACTUAL_WEATHER_STRAINER if targeted else None)
+    with measure(timings, 'sun_times'):
+        sunrise, sunset = extract_sun_times(soup, hungary_time)
+    with measure(timings, 'current_weather'):
+        current_weather = extract_current_weather(soup)
+    with measure(timings, 'daily_forecast'):
+        daily_forecast_list = extract_daily_forecast(soup)
+    return current_weather, daily_forecast_list, sunrise, sunset
+
+#======================= Parse hourly forecast page ============================
+def extract_hourly_cards(soup, horizon=None):
+    """Return (hour, Forecast without datetime) pairs of the hourly forecast cards (at most horizon cards)."""
+    forecast_card_list = soup.find_all('div', attrs={'class': 'wide-hourly-forecast-card'}, limit=horizon)
+
+    hourly_forecast_cards = []
+
+    for forecast_card in forecast_card_list:
+        forecast_hour_str = forecast_card.find("div" , attrs={'class': 'ik wide-hourly-forecast-hour'}, recursive=False).text
+        forecast_hour = int(forecast_hour_str[0:-3])
+
+        forecast_weather_obj = forecast_card.find("div" , attrs={'class': 'ik forecast-icon-container'}, recursive=False).find("a", recursive=False)
+        forecast_weather = forecast_weather_obj.get('data-bs-content')
+        _LOGGER.debug('Forecast Weather Condition String: ' + str(forecast_weather))
+        #Getting mapped weather condition from tuple... if key doesn't exists return None
+        forecast_weather_condition = weather_conditions.get(forecast_weather, 'None')
+
+        # get temperature value
+        forecast_temperature_value = to_number(forecast_card.find("div", attrs={'class': 'ik tempBarGraph'}, recursive=False).find("div" , attrs={'class': 'ik tempValue'}, recursive=False).find("a", recursive=False).get_text())
+
+        #===== WIND ============
+
+        wind_div = forecast_card.find("div", attrs={'class': 'ik hourly-wind'}, recursive=False).find("a", recursive=False).find("div", recursive=False)
+        #Get wind force string (last CSS class, e.g. 'gyenge')
+        forecast_wind_force_str = wind_div['class'][-1]
+        _LOGGER.debug('Wind force string: ' + forecast_wind_force_str)
+        #Get wind direction from style attribute: style="--rotateAngle:158deg"
+        forecast_wind_direction = int(re.search(r'--rotateAngle:\s*(\d+)deg', wind_div.get('style', '--rotateAngle:0deg')).group(1))
+        #Get mapped wind speed from wind force string
+        forecast_wind_speed = wind_mapping.get(forecast_wind_force_str)
+        _LOGGER.debug('Wind direction: ' + str(forecast_wind_direction))
+
+        #===== RAIN =======
+        precipitation_obj = forecast_card.find("div" , attrs={'class': 'ik hourly-rainlevel'}, recursive=True)
+        if (precipitation_obj != None):
+            #Precipitation value in comment :)
+            precipitation_obj = precipitation_obj.find_all(string=lambda text: isinstance(text, Comment))
+            _precipitation = float(precipitation_obj[0][:-2]) or 0.0
+            _LOGGER.debug(_precipitation)
+            _precipitation_probability = int(to_number(forecast_card.find("div" , attrs={'class': 'ik hourly-rain-chance'}, recursive=False).find("a", recursive=False).get_text()) or 0)
+            _LOGGER.debug(_precipitation_probability)
+        else:
+            _precipitation = 0.0
+            _precipitation_probability = 0
+        #=================
+
+        # Add forecast element to forecast list
+        hourly_forecast_cards.append((forecast_hour, Forecast(
+            condition=forecast_weather_condition,
+            temperature=forecast_temperature_value,
+            wind_speed=forecast_wind_speed,
+            wind_bearing=forecast_wind_direction,
+            precipitation_probability=_precipitation_probability,
+            precipitation=_precipitation,
+        )))
+
+    return hourly_forecast_cards
+
+#======================= Incremental parse of the streamed hourly forecast page ============================
+class HourlyCardFeed(HTMLParser):
+    """Incremental parser of the hourly forecast page, fed with the decoded body chunks as they arrive.
+
+    The markup of the forecast cards is collected while the page is tokenized (html.parser), the cards completed
+    by a chunk are extracted right away. Once horizon cards are extracted the rest of the page is not needed.
+    """
+
+    def __init__(self, horizon=None, backend=None):
+        # Character references are kept as they are => the card markup is rebuilt unchanged
+        super().__init__(convert_charrefs=False)
+        self.horizon = horizon
+        self._backend = backend
+        # (hour, Forecast without datetime) pairs of the extracted cards
+        self.cards = []
+        # Time of the first extracted card (perf_counter) and the total time spent in feed
+        self.first_card_at = None
+        self.parse_time = 0.0
+        self._card_markup = []
+        self._completed = []
+        self._depth = 0
+
+    @property
+    def horizon_reached(self):
+        """Return True if the cards within the horizon are extracted."""
+        return self.horizon is not None and len(self.cards) >= self.horizon
+
+    def feed(self, data):
+        """Tokenize the next chunk of the page, extract the forecast cards completed by it."""
+        start = perf_counter()
+        super().feed(data)
+        if self._completed and not self.horizon_reached:
+            limit = self.horizon - len(self.cards) if self.horizon is not None else None
+            self.cards.extend(extract_hourly_cards(make_soup(''.join(self._completed), self._backend, HOURLY_CARDS_STRAINER), limit))
+            if self.first_card_at is None and self.cards:
+                self.first_card_at = perf_counter()
+        self._completed.clear()
+        self.parse_time += perf_counter() - start
+
+    def handle_starttag(self, tag, attrs):
+        if self._depth:
+            self._card_markup.append(self.get_starttag_text())
+            self._depth += tag == 'div'
+        elif tag == 'div' and 'wide-hourly-forecast-card' in (dict(attrs).get('class') or '').split():
+            self._card_markup = [self.get_starttag_text()]
+            self._depth = 1
+
+    def handle_endtag(self, tag):
+        if not self._depth:
+            return
+        self._card_markup.append('</' + tag + '>')
+        if tag == 'div':
+            self._depth -= 1
+            if not self._depth:
+                self._completed.append(''.join(self._card_markup))
+
+    def handle_data(self, data):
+        if self._depth:
+            self._card_markup.append(data)
+
+    def handle_comment(self, data):
+        if self._depth:
+            self._card_markup.append('<!--' + data + '-->')
+
+    def handle_entityref(self, name):
+        if self._depth:
+            self._card_markup.append('&' + name + ';')
+
+    def handle_charref(self, name):
+        if self._depth:
+            self._card_markup.append('&#' + name + ';')
+
+#======================= Timezone conversion of the hourly forecast ============================
+def card_datetimes(hours, hungary_time):
+    """Return the naive Budapest datetimes of the card hours, generated in a single pass."""
+    # Start hour for fetching the forecast data is the current hour in Hungary
+    forecast_date = hungary_time.date()
+    start_hour = hungary_time.hour
+    naive_datetimes = []
+    for forecast_hour in hours:
+        #It's a next day forcast if forecast hour is less than the previous one => need to increase date by 1 day
+        if forecast_hour < start_hour:
+            forecast_date += timedelta(days=1)
+        start_hour = forecast_hour
+        naive_datetimes.append(datetime.combine(forecast_date, time(forecast_hour, 0)))
+    return naive_datetimes
+
+def window_offsets(datetimes, offset_of):
+    """Return the UTC offset of each time of the forecast window.
+
+    The offset is computed for the first and the last time only, if they are equal there is no DST transition
+    in the window (transitions are months apart) and every time has the same offset.
+    """
+    first_offset = offset_of(datetimes[0])
+    if first_offset == offset_of(datetimes[-1]):
+        return [first_offset] * len(datetimes)
+    return [offset_of(window_datetime) for window_datetime in datetimes]
+
+@lru_cache(maxsize=8)
+def fixed_timezone(offset):
+    """Return the (shared) fixed offset timezone of an UTC offset."""
+    return timezone(offset)
+
+def fixed_timezones(offsets):
+    """Return the fixed offset timezones of the offsets, looked up once per distinct offset."""
+    zones = {offset: fixed_timezone(offset) for offset in set(offsets)}
+    return [zones[offset] for offset in offsets]
+
+def localize_hourly_cards(hourly_forecast_cards, hungary_time, local_tz=None, budapest_tz=None):
+    """Localize the card hours to Budapest timezone and add the datetime (in the local timezone) to the forecasts.
+
+    Offsets are taken from the offset table of the forecast window instead of converting each card separately.
+    Returns (Budapest datetime, Forecast) pairs.
+    """
+    if not hourly_forecast_cards:
+        return []
+
+    naive_datetimes = card_datetimes([forecast_hour for forecast_hour, _ in hourly_forecast_cards], hungary_time)
+
+    # Budapest offsets of the wall times
+    budapest_zones = fixed_timezones(window_offsets(naive_datetimes, budapest_tz.utcoffset))
+    budapest_datetimes = [naive_datetime.replace(tzinfo=zone) for naive_datetime, zone in zip(naive_datetimes, budapest_zones)]
+
+    # Convert forecast time information to local configured timezone if it is different from Budapest timezone
+    local_datetimes = budapest_datetimes
+    if local_tz != budapest_tz:
+        local_zones = fixed_timezones(window_offsets(budapest_datetimes, lambda budapest_datetime: budapest_datetime.astimezone(local_tz).utcoffset()))
+        local_datetimes = [budapest_datetime.astimezone(zone) for budapest_datetime, zone in zip(budapest_datetimes, local_zones)]
+    # Formatting the window costs as much as converting it => only if it is logged
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        _LOGGER.debug('Forecast window in local Time Zone: ' + str(local_datetimes[0]) + ' - ' + str(local_datetimes[-1]))
+
+    # Forecast (TypedDict) built as a dict display, calling it with keyword arguments is more than twice as slow
+    return [
+        (budapest_datetime, {'datetime': local_datetime.isoformat(), **forecast})
+        for budapest_datetime, local_datetime, (_, forecast) in zip(budapest_datetimes, local_datetimes, hourly_forecast_cards)
+    ]
+
+def parse_hourly_forecast(html_string, hungary_time, local_tz=None, budapest_tz=None, backend=None, timings=None, targeted=True, horizon=None):
+    """Extract hourly forecast cards from the /elorejelzes page.
+
+    Returns (Budapest datetime, Forecast) pairs, the clear-night correction is applied later by apply_night_condition
+    as it requires the sunrise / sunset times of the other page.
+    In targeted mode only the forecast cards are built into the tree, with a horizon only the first horizon cards are extracted.
+    """
+    with measure(timings, 'hourly_soup'):
+        soup = make_soup(html_string, backend, HOURLY_CARDS_STRAINER if targeted else None)
+    with measure(timings, 'hourly_cards'):
+        hourly_forecast_cards = extract_hourly_cards(soup, horizon)
+    with measure(timings, 'timezone'):
+        return localize_hourly_cards(hourly_forecast_cards, hungary_time, local_tz, budapest_tz)
+
+def parse_fed_hourly_forecast(feed, html_string, hungary_time, local_tz=None, budapest_tz=None, timings=None):
+    """Return the hourly forecast of the cards extracted by the incremental parser (HourlyCardFeed) while the page was read.
+
+    html_string (the page read) was parsed by the feed already, like parse_hourly_forecast (Budapest datetime, Forecast) pairs are returned.
+    """
+    if timings is not None:
+        timings['hourly_cards'] = round(feed.parse_time * 1000, 3)
+    with measure(timings, 'timezone'):
+        return localize_hourly_cards(feed.cards, hungary_time, local_tz, budapest_tz)
+
+#======================= Night corrections ============================
+def apply_current_night_condition(current_weather, hungary_time, sunrise, sunset):
+    """Return the current weather section, a sunny condition between sunset and sunrise is changed to clear night."""
+    # IF current time is later than sunset time or earlier than sunrise time and weather condition is sunny => change condition to clear night
+    if (hungary_time.time() > sunset.time()) or (hungary_time.time() < sunrise.time()):
+        if current_weather[ATTR_API_CONDITION] == 'sunny':
+            # Copy, the parsed section may be reused from the page cache
+            return {**current_weather, ATTR_API_CONDITION: 'clear-night'}
+    return current_weather
+
+def apply_night_condition(hourly_forecast_cards, sunrise, sunset):
+    """Return hourly Forecast list, sunny conditions between sunset and sunrise are changed to clear night."""
+    hourly_forecast_list = []
+    for budapest_datetime, forecast in hourly_forecast_cards:
+        # IF forecast time is later than sunset time or earlier than sunrise time and weather condition is sunny => change condition to clear night
+        if (budapest_datetime.time() > sunset.time()) or (budapest_datetime.time() < sunrise.time()):
+            if forecast['condition'] == 'sunny':
+                # Copy, the parsed cards may be reused from the page cache
+                forecast = {**forecast, 'condition': 'clear-night'}
+        hourly_forecast_list.append(forecast)
+    return hourly_forecast_list
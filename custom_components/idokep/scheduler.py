@@ -0,0 +1,359 @@
+"""Integration wide fetch scheduler of the Idokep Weather service."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+import heapq
+from itertools import count
+import logging
+import random
+from time import monotonic
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DATA_SCHEDULER, DOMAIN, MAX_CONCURRENT_REQUESTS, REQUEST_BURST, REQUEST_RATE
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fractional part of the golden ratio => any number of slots are spread evenly over the interval
+_SLOT_STEP = 0.6180339887498949
+
+# Priorities of the upstream requests (lower goes first): first / user requested refreshes, then background polls
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Limits of the adaptive refresh interval
+ADAPTIVE_MIN_INTERVAL = timedelta(minutes=5)
+ADAPTIVE_MAX_INTERVAL = timedelta(hours=2)
+# Poll this long after the expected content change of the upstream page
+ADAPTIVE_CHANGE_DELAY = timedelta(minutes=2)
+# Number of observed content changes the change cadence is learnt from
+ADAPTIVE_HISTORY_SIZE = 24
+# Local hours of the night, the interval is multiplied by the night factor
+ADAPTIVE_NIGHT_HOURS = range(0, 5)
+ADAPTIVE_NIGHT_FACTOR = 3
+# +/- ratio of random jitter applied to the error backoff
+ADAPTIVE_BACKOFF_JITTER = 0.2
+
+# Circuit breaker: consecutive failures opening it, open period (doubled at each failed probe) and its upper limit
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_OPEN_PERIOD = timedelta(minutes=10)
+BREAKER_MAX_OPEN_PERIOD = timedelta(hours=2)
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# Pages due within this time are refreshed together
+PAGE_DUE_TOLERANCE = timedelta(seconds=30)
+# Data of a page is stale if it is older than its longest regular (night) refresh interval plus this many
+# base intervals (margin of the slot offset, due tolerance and queueing) => regular refreshes never flip the stale flag
+PAGE_STALE_MARGIN = 1
+
+
+class TokenBucketLimiter:
+    """Rate limiter of the upstream requests of the whole integration.
+
+    - requests take a token from a bucket refilled at the given rate, up to the burst size
+    - waiting requests get the tokens in priority order (FIFO within a priority)
+    - the number of concurrent requests is capped as well
+    The limiter is an async context manager (background priority), limit() returns one of a given priority.
+    Entering returns the time (ms) the request waited in the queue.
+    """
+
+    def __init__(self, rate: float, burst: int, max_concurrent_requests: int) -> None:
+        """Initialize the limiter."""
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = count()
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._concurrency = asyncio.Semaphore(max_concurrent_requests)
+
+    @property
+    def queue_length(self) -> int:
+        """Return the number of requests waiting for a token."""
+        return sum(not waiter.done() for _, _, waiter in self._waiters)
+
+    def _dispatch(self) -> None:
+        """Hand the available tokens over to the waiters, schedule the next dispatch if there are more waiters."""
+        self._wakeup = None
+        now = monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        while self._waiters and self._tokens >= 1:
+            _, _, waiter = heapq.heappop(self._waiters)
+            # Cancelled waiters don't take a token
+            if not waiter.done():
+                self._tokens -= 1
+                waiter.set_result(None)
+        if self._waiters:
+            self._wakeup = asyncio.get_running_loop().call_later((1 - self._tokens) / self._rate, self._dispatch)
+
+    async def acquire(self, priority: int = PRIORITY_BACKGROUND) -> float:
+        """Wait for a token and a free request slot, returns the waiting time in ms."""
+        start = monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        # Pending dispatch serves the waiters in priority order
+        if self._wakeup is None:
+            self._dispatch()
+        await waiter
+        await self._concurrency.acquire()
+        return round((monotonic() - start) * 1000, 3)
+
+    def release(self) -> None:
+        """Release the request slot."""
+        self._concurrency.release()
+
+    def limit(self, priority: int) -> _LimitedRequest:
+        """Return the async context manager of a request with the given priority."""
+        return _LimitedRequest(self, priority)
+
+    async def __aenter__(self) -> float:
+        return await self.acquire()
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.release()
+
+
+class _LimitedRequest:
+    """Request of a given priority passing the limiter."""
+
+    def __init__(self, limiter: TokenBucketLimiter, priority: int) -> None:
+        self._limiter = limiter
+        self._priority = priority
+
+    async def __aenter__(self) -> float:
+        return await self._limiter.acquire(self._priority)
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self._limiter.release()
+
+
+class IdokepFetchScheduler:
+    """Scheduler shared by every config entry.
+
+    - refresh times of the locations are spread over the update interval
+    - upstream requests are rate limited (token bucket, priority queue) and their concurrency is capped
+    """
+
+    def __init__(self, max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS, rate: float = REQUEST_RATE, burst: int = REQUEST_BURST) -> None:
+        """Initialize the scheduler."""
+        self.request_limiter = TokenBucketLimiter(rate, burst, max_concurrent_requests)
+        self._locations: dict[str, int] = {}
+        self._slots: dict[str, float] = {}
+        self._next_slot = 0.0
+
+    @callback
+    def async_register(self, location: str) -> CALLBACK_TYPE:
+        """Register a location, returns the callback unregistering it."""
+        self._locations[location] = self._locations.get(location, 0) + 1
+        if location not in self._slots:
+            self._slots[location] = self._next_slot
+            self._next_slot = (self._next_slot + _SLOT_STEP) % 1.0
+        _LOGGER.debug('Location registered: ' + location + ' slot: ' + str(self._slots[location]))
+
+        @callback
+        def _async_unregister() -> None:
+            self._locations[location] -= 1
+            if not self._locations[location]:
+                del self._locations[location]
+                del self._slots[location]
+
+        return _async_unregister
+
+    def slot_offset(self, location: str, interval: timedelta) -> timedelta:
+        """Return the offset of the location's refresh slot within the interval."""
+        return interval * self._slots.get(location, 0.0)
+
+
+class AdaptiveRefreshInterval:
+    """Refresh interval of a location adapted to the content change cadence of idokep.hu.
+
+    - the change period is learnt from the refreshes which returned changed content (page hash / conditional GET)
+    - the next refresh is brought forward to just after the next expected change
+    - refreshes are less frequent during the night
+    - after failures the base interval is backed off exponentially with jitter
+    """
+
+    def __init__(self, base_interval: timedelta) -> None:
+        """Initialize the interval."""
+        self._base_interval = base_interval
+        self._changes: deque[datetime] = deque(maxlen=ADAPTIVE_HISTORY_SIZE)
+        self.failures = 0
+
+    @property
+    def longest_interval(self) -> timedelta:
+        """Return the longest interval after a successful refresh (the night interval)."""
+        return self._clamp(self._base_interval * ADAPTIVE_NIGHT_FACTOR)
+
+    @property
+    def change_period(self) -> timedelta | None:
+        """Return the median time between the observed content changes."""
+        if len(self._changes) < 3:
+            return None
+        changes = list(self._changes)
+        gaps = sorted(later - earlier for earlier, later in zip(changes, changes[1:]))
+        return max(gaps[len(gaps) // 2], ADAPTIVE_MIN_INTERVAL)
+
+    def next_after_success(self, now: datetime, content_changed: bool | None) -> timedelta:
+        """Return the interval after a successful refresh (content_changed is None if it is unknown)."""
+        self.failures = 0
+        if content_changed:
+            self._changes.append(now)
+
+        if dt_util.as_local(now).hour in ADAPTIVE_NIGHT_HOURS:
+            return self.longest_interval
+
+        interval = self._base_interval
+        period = self.change_period
+        if period is not None:
+            expected_change = self._changes[-1] + period
+            while expected_change <= now:
+                expected_change += period
+            # Expected change is closer than the base interval => poll just after it
+            interval = min(interval, expected_change - now + ADAPTIVE_CHANGE_DELAY)
+        return self._clamp(interval)
+
+    def next_after_failure(self) -> timedelta:
+        """Return the backed off interval after a failed refresh."""
+        self.failures += 1
+        backoff = self._base_interval * 2 ** (self.failures - 1)
+        backoff *= random.uniform(1 - ADAPTIVE_BACKOFF_JITTER, 1 + ADAPTIVE_BACKOFF_JITTER)
+        return self._clamp(backoff)
+
+    @staticmethod
+    def _clamp(interval: timedelta) -> timedelta:
+        return min(max(interval, ADAPTIVE_MIN_INTERVAL), ADAPTIVE_MAX_INTERVAL)
+
+
+class CircuitBreaker:
+    """Circuit breaker of the upstream requests of a location.
+
+    - closed: requests are sent, it opens after the threshold of consecutive failures
+    - open: no requests are sent until the open period expires
+    - half-open: a single probe request is sent, success closes the breaker, failure opens it again
+      for a doubled period
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD) -> None:
+        """Initialize the breaker."""
+        self._failure_threshold = failure_threshold
+        self._open_period = BREAKER_OPEN_PERIOD
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_until: datetime | None = None
+
+    def allow_request(self, now: datetime) -> bool:
+        """Return True if the upstream may be requested now (an expired open breaker turns half-open)."""
+        if self.state == BREAKER_OPEN:
+            if now < self.opened_until:
+                return False
+            self.state = BREAKER_HALF_OPEN
+            _LOGGER.debug('Circuit breaker half-open, probing upstream')
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker."""
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self._open_period = BREAKER_OPEN_PERIOD
+        self.opened_until = None
+
+    def record_failure(self, now: datetime) -> None:
+        """Count a failure, open the breaker if the probe failed or the threshold is reached."""
+        self.failures += 1
+        if self.state == BREAKER_HALF_OPEN:
+            self._open_period = min(self._open_period * 2, BREAKER_MAX_OPEN_PERIOD)
+        elif self.failures < self._failure_threshold:
+            return
+        self.state = BREAKER_OPEN
+        self.opened_until = now + self._open_period
+        _LOGGER.debug('Circuit breaker open until ' + self.opened_until.isoformat())
+
+
+class PageRefresher:
+    """Refresh state of an upstream page of a location.
+
+    Every page has its own refresh interval (adapted to its content changes, backed off after its failures),
+    its own circuit breaker and error state, so a failing page doesn't affect the other pages.
+    """
+
+    def __init__(self, page: str, base_interval: timedelta, slot_offset: timedelta = timedelta()) -> None:
+        """Initialize the refresher (the refresh after the first one is delayed by the slot offset)."""
+        self.page = page
+        self.base_interval = base_interval
+        self.interval = AdaptiveRefreshInterval(base_interval)
+        # Strictly longer than any regular refresh interval
+        self.stale_after = self.interval.longest_interval + base_interval * PAGE_STALE_MARGIN
+        self.circuit_breaker = CircuitBreaker()
+        self._slot_offset = slot_offset
+        # None => refresh is due
+        self.next_refresh: datetime | None = None
+        self.last_success: datetime | None = None
+        self.last_error: str | None = None
+
+    def is_due(self, now: datetime) -> bool:
+        """Return True if the page shall be refreshed now (refreshes due soon are brought forward)."""
+        return self.next_refresh is None or self.next_refresh - PAGE_DUE_TOLERANCE <= now
+
+    def is_stale(self, now: datetime) -> bool:
+        """Return True if the last refresh failed or the data of the page is too old."""
+        return (
+            self.last_error is not None
+            or self.last_success is None
+            or now - self.last_success > self.stale_after
+        )
+
+    def record_success(self, now: datetime, content_changed: bool | None) -> None:
+        """Schedule the next refresh after a successful one."""
+        self.circuit_breaker.record_success()
+        self.last_success = now
+        self.last_error = None
+        self.next_refresh = now + self.interval.next_after_success(now, content_changed) + self._slot_offset
+        self._slot_offset = timedelta()
+
+    def record_failure(self, now: datetime, error: Exception) -> None:
+        """Schedule the next refresh after a failed one (backoff, not before the probe of an opened breaker)."""
+        self.circuit_breaker.record_failure(now)
+        self.last_error = repr(error)
+        self.next_refresh = now + self.interval.next_after_failure()
+        # Open period may be shorter than the backoff => the later one wins, retry gaps never shrink
+        if self.circuit_breaker.state == BREAKER_OPEN:
+            self.next_refresh = max(self.next_refresh, self.circuit_breaker.opened_until)
+
+    def allow_request(self, now: datetime) -> bool:
+        """Return True if the page may be requested now, otherwise the refresh waits for the breaker probe."""
+        if self.circuit_breaker.allow_request(now):
+            return True
+        # Backed off refresh later than the probe is kept
+        opened_until = self.circuit_breaker.opened_until
+        self.next_refresh = opened_until if self.next_refresh is None else max(self.next_refresh, opened_until)
+        return False
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the refresh state (e.g. for diagnostics)."""
+        return {
+            "base_interval": str(self.base_interval),
+            "next_refresh": self.next_refresh.isoformat() if self.next_refresh else None,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "last_error": self.last_error,
+            "refresh_failures": self.interval.failures,
+            "circuit_breaker": self.circuit_breaker.state,
+            "breaker_failures": self.circuit_breaker.failures,
+        }
+
+
+@callback
+def async_get_fetch_scheduler(hass: HomeAssistant) -> IdokepFetchScheduler:
+    """Return the fetch scheduler of the integration."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SCHEDULER not in domain_data:
+        domain_data[DATA_SCHEDULER] = IdokepFetchScheduler()
+    return domain_data[DATA_SCHEDULER]
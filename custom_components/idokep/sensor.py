@@ -2,7 +2,12 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
 from homeassistant.components.sensor import (
+    DOMAIN as SENSOR_DOMAIN,
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
@@ -12,10 +17,14 @@ from homeassistant.const import (
     DEGREE,
     PERCENTAGE,
     UV_INDEX,
+    EntityCategory,
+    UnitOfInformation,
     UnitOfLength,
+    UnitOfPrecipitationDepth,
     UnitOfPressure,
     UnitOfSpeed,
     UnitOfTemperature,
+    UnitOfTime,
 )
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import entity_registry as er
@@ -28,16 +37,28 @@ from . import IdokepConfigEntry
 from .const import (
     ATTR_API_CONDITION,
     ATTR_API_CURRENT,
+    ATTR_API_FORECAST_SUMMARY,
     ATTR_API_NATIVE_TEMPERATURE,
     ATTR_API_NATIVE_TEMPERATURE_UNIT,
     ATTR_API_WEATHER,
     ATTR_API_LOCATION,
     ATTRIBUTION,
+    ATTR_STALE,
+    ATTR_DATA_TIMESTAMP,
     DEFAULT_NAME,
     DOMAIN,
     MANUFACTURER,
 )
-from .coordinator import WeatherUpdateCoordinator
+from .coordinator import DIAGNOSTICS_SECTION, WeatherUpdateCoordinator
+from .forecast import (
+    SUMMARY_HOURS_UNTIL_PRECIPITATION,
+    SUMMARY_PRECIPITATION_PROBABILITY_NEXT_3H,
+    SUMMARY_RAIN_NEXT_3H,
+    SUMMARY_TEMPERATURE_MAX_TODAY,
+    SUMMARY_TEMPERATURE_MIN_TODAY,
+)
+from .stats import RefreshStats
+from .transfer import TransferStats
 
 WEATHER_SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
     #  SensorEntityDescription(
@@ -57,6 +78,142 @@ WEATHER_SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
     ),
 )
 
+# Aggregates of the forecasts, computed once per refresh by the coordinator
+FORECAST_SUMMARY_SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
+    SensorEntityDescription(
+        key=SUMMARY_RAIN_NEXT_3H,
+        name="Rain in next 3h",
+        native_unit_of_measurement=UnitOfPrecipitationDepth.MILLIMETERS,
+        device_class=SensorDeviceClass.PRECIPITATION,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SensorEntityDescription(
+        key=SUMMARY_PRECIPITATION_PROBABILITY_NEXT_3H,
+        name="Precipitation probability in next 3h",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SensorEntityDescription(
+        key=SUMMARY_HOURS_UNTIL_PRECIPITATION,
+        name="Hours until precipitation",
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        device_class=SensorDeviceClass.DURATION,
+    ),
+    SensorEntityDescription(
+        key=SUMMARY_TEMPERATURE_MAX_TODAY,
+        name="Max temperature today",
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        device_class=SensorDeviceClass.TEMPERATURE,
+    ),
+    SensorEntityDescription(
+        key=SUMMARY_TEMPERATURE_MIN_TODAY,
+        name="Min temperature today",
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        device_class=SensorDeviceClass.TEMPERATURE,
+    ),
+)
+
+@dataclass(frozen=True, kw_only=True)
+class IdokepAccuracySensorEntityDescription(SensorEntityDescription):
+    """Describes an Idokep forecast accuracy sensor (lead time range of the scored forecasts in hours)."""
+
+    first_lead: int
+    last_lead: int
+
+
+ACCURACY_SENSOR_TYPES: tuple[IdokepAccuracySensorEntityDescription, ...] = tuple(
+    IdokepAccuracySensorEntityDescription(
+        key=f"temperature_mae_{first_lead}_{last_lead}h",
+        name=f"Temperature forecast error {first_lead}-{last_lead}h",
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        first_lead=first_lead,
+        last_lead=last_lead,
+    )
+    for first_lead, last_lead in ((1, 3), (4, 12), (13, 24), (25, 47))
+)
+
+@dataclass(frozen=True, kw_only=True)
+class IdokepDiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Describes an Idokep refresh statistics sensor."""
+
+    value_fn: Callable[[RefreshStats], StateType]
+
+
+DIAGNOSTIC_SENSOR_TYPES: tuple[IdokepDiagnosticSensorEntityDescription, ...] = (
+    IdokepDiagnosticSensorEntityDescription(
+        key="last_fetch_ms",
+        name="Last fetch time",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda stats: stats.fetch_ms,
+    ),
+    IdokepDiagnosticSensorEntityDescription(
+        key="last_parse_ms",
+        name="Last parse time",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda stats: stats.parse_ms,
+    ),
+    IdokepDiagnosticSensorEntityDescription(
+        key="last_queue_ms",
+        name="Last queue wait",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda stats: stats.queue_ms,
+    ),
+    IdokepDiagnosticSensorEntityDescription(
+        key="last_bytes",
+        name="Last download size",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda stats: stats.total_bytes,
+    ),
+)
+
+@dataclass(frozen=True, kw_only=True)
+class IdokepTransferSensorEntityDescription(SensorEntityDescription):
+    """Describes an Idokep cumulative transfer sensor."""
+
+    value_fn: Callable[[TransferStats], StateType]
+
+
+TRANSFER_SENSOR_TYPES: tuple[IdokepTransferSensorEntityDescription, ...] = (
+    IdokepTransferSensorEntityDescription(
+        key="total_wire_bytes",
+        name="Total downloaded",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda transfer_stats: transfer_stats.total_wire_bytes,
+    ),
+    IdokepTransferSensorEntityDescription(
+        key="total_decoded_bytes",
+        name="Total decoded",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda transfer_stats: transfer_stats.total_decoded_bytes,
+    ),
+)
+
 async def async_setup_entry(hass: HomeAssistant, config_entry: IdokepConfigEntry, async_add_entities: AddEntitiesCallback,) -> None:
     """Set up IdokepWeather sensor entities based on a config entry."""
     domain_data = config_entry.runtime_data
@@ -65,11 +222,17 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: IdokepConfigEntry
     assert unique_id is not None
     weather_coordinator = domain_data.coordinator
 
+    # Only the registered sensors not provided anymore are removed, the others are kept (no registry / recorder churn)
+    desired_unique_ids = {
+        f"{unique_id}_{description.key}"
+        for description in (
+            *WEATHER_SENSOR_TYPES, *FORECAST_SUMMARY_SENSOR_TYPES, *ACCURACY_SENSOR_TYPES, *DIAGNOSTIC_SENSOR_TYPES, *TRANSFER_SENSOR_TYPES
+        )
+    }
     entity_registry = er.async_get(hass)
-    entries = er.async_entries_for_config_entry(entity_registry, config_entry.entry_id)
-    for entry in entries:
-        entity_registry.async_remove(entry.entity_id)
-
+    for entry in er.async_entries_for_config_entry(entity_registry, config_entry.entry_id):
+        if entry.domain == SENSOR_DOMAIN and entry.unique_id not in desired_unique_ids:
+            entity_registry.async_remove(entry.entity_id)
 
     name_part_location = location = config_entry.data.get(ATTR_API_LOCATION)
     async_add_entities(
@@ -81,6 +244,42 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: IdokepConfigEntry
         )
         for description in WEATHER_SENSOR_TYPES
     )
+    async_add_entities(
+        IdokepForecastSummarySensor(
+            name_part_location,
+            unique_id,
+            description,
+            weather_coordinator,
+        )
+        for description in FORECAST_SUMMARY_SENSOR_TYPES
+    )
+    async_add_entities(
+        IdokepAccuracySensor(
+            name_part_location,
+            unique_id,
+            description,
+            weather_coordinator,
+        )
+        for description in ACCURACY_SENSOR_TYPES
+    )
+    async_add_entities(
+        IdokepDiagnosticSensor(
+            name_part_location,
+            unique_id,
+            description,
+            weather_coordinator,
+        )
+        for description in DIAGNOSTIC_SENSOR_TYPES
+    )
+    async_add_entities(
+        IdokepTransferSensor(
+            name_part_location,
+            unique_id,
+            description,
+            weather_coordinator,
+        )
+        for description in TRANSFER_SENSOR_TYPES
+    )
     
 
 class AbstractIdokepSensor(SensorEntity):
@@ -88,6 +287,8 @@ class AbstractIdokepSensor(SensorEntity):
 
     _attr_should_poll = False
     _attr_attribution = ATTRIBUTION
+    # Section of the coordinator data the sensor depends on
+    _listener_context = ATTR_API_CURRENT
 
     def __init__(self, name: str, unique_id: str, description: SensorEntityDescription, coordinator: DataUpdateCoordinator, ) -> None:
         """Initialize the sensor."""
@@ -108,10 +309,19 @@ class AbstractIdokepSensor(SensorEntity):
         """Return True if entity is available."""
         return self._coordinator.last_update_success
 
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the stale flag and the time of the data (e.g. served from an old snapshot or after failed refreshes)."""
+        data_timestamp = self._coordinator.section_timestamp(self._listener_context)
+        return {
+            ATTR_STALE: self._coordinator.section_is_stale(self._listener_context),
+            ATTR_DATA_TIMESTAMP: data_timestamp.isoformat() if data_timestamp else None,
+        }
+
     async def async_added_to_hass(self) -> None:
         """Connect to dispatcher listening for entity data notifications."""
         self.async_on_remove(
-            self._coordinator.async_add_listener(self.async_write_ha_state)
+            self._coordinator.async_add_listener(self.async_write_ha_state, self._listener_context)
         )
 
     async def async_update(self) -> None:
@@ -133,4 +343,74 @@ class IdokepSensor(AbstractIdokepSensor):
         return self._weather_coordinator.data[ATTR_API_CURRENT].get(
             self.entity_description.key
         )
-    
+
+
+class IdokepForecastSummarySensor(AbstractIdokepSensor):
+    """Implementation of an Idokep forecast aggregate sensor."""
+
+    _listener_context = ATTR_API_FORECAST_SUMMARY
+
+    def __init__( self, name: str, unique_id: str, description: SensorEntityDescription, weather_coordinator: WeatherUpdateCoordinator, ) -> None:
+        """Initialize the sensor."""
+        super().__init__(name, unique_id, description, weather_coordinator)
+        self._weather_coordinator = weather_coordinator
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the precomputed aggregate (the forecasts are not scanned)."""
+        return self._weather_coordinator.data[ATTR_API_FORECAST_SUMMARY].get(self.entity_description.key)
+
+
+class IdokepAccuracySensor(AbstractIdokepSensor):
+    """Implementation of an Idokep forecast accuracy sensor (mean absolute temperature error)."""
+
+    entity_description: IdokepAccuracySensorEntityDescription
+    # Forecasts are scored at refreshes, even if the data didn't change
+    _listener_context = DIAGNOSTICS_SECTION
+
+    def __init__( self, name: str, unique_id: str, description: IdokepAccuracySensorEntityDescription, weather_coordinator: WeatherUpdateCoordinator, ) -> None:
+        """Initialize the sensor."""
+        super().__init__(name, unique_id, description, weather_coordinator)
+        self._weather_coordinator = weather_coordinator
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the mean absolute error of the forecasts within the lead time range."""
+        return self._weather_coordinator.forecast_history.history.mean_absolute_error(
+            self.entity_description.first_lead, self.entity_description.last_lead
+        )
+
+
+class IdokepDiagnosticSensor(AbstractIdokepSensor):
+    """Implementation of an Idokep refresh statistics sensor."""
+
+    entity_description: IdokepDiagnosticSensorEntityDescription
+    _listener_context = DIAGNOSTICS_SECTION
+
+    def __init__( self, name: str, unique_id: str, description: IdokepDiagnosticSensorEntityDescription, weather_coordinator: WeatherUpdateCoordinator, ) -> None:
+        """Initialize the sensor."""
+        super().__init__(name, unique_id, description, weather_coordinator)
+        self._weather_coordinator = weather_coordinator
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the statistics value of the latest refresh."""
+        stats = self._weather_coordinator.last_refresh_stats
+        return self.entity_description.value_fn(stats) if stats is not None else None
+
+
+class IdokepTransferSensor(AbstractIdokepSensor):
+    """Implementation of an Idokep cumulative transfer sensor."""
+
+    entity_description: IdokepTransferSensorEntityDescription
+    _listener_context = DIAGNOSTICS_SECTION
+
+    def __init__( self, name: str, unique_id: str, description: IdokepTransferSensorEntityDescription, weather_coordinator: WeatherUpdateCoordinator, ) -> None:
+        """Initialize the sensor."""
+        super().__init__(name, unique_id, description, weather_coordinator)
+        self._weather_coordinator = weather_coordinator
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the bytes transferred since the start."""
+        return self.entity_description.value_fn(self._weather_coordinator.transfer_stats)
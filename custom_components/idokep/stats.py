@@ -0,0 +1,55 @@
+"""Refresh statistics of the Idokep Weather service."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from time import perf_counter
+from typing import Any
+
+
+#============== Stage timing ================
+@contextmanager
+def measure(timings, stage):
+    """Store the duration of the block in ms under the stage name (if timings dict is given)."""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = round((perf_counter() - start) * 1000, 3)
+
+#======================= Refresh statistics ============================
+@dataclass
+class RefreshStats:
+    """Stage timings (ms), response sizes (bytes) and card counts of a refresh."""
+
+    timestamp: str
+    timings: dict[str, float] = field(default_factory=dict)
+    response_bytes: dict[str, int] = field(default_factory=dict)
+    hourly_cards: int = 0
+    daily_cards: int = 0
+
+    @property
+    def fetch_ms(self) -> float | None:
+        """Return the duration of the whole refresh."""
+        return self.timings.get('refresh')
+
+    @property
+    def parse_ms(self) -> float:
+        """Return the total parse time of the pages."""
+        return round(sum(self.timings.get(stage, 0.0) for stage in ('actual_parse', 'hourly_parse')), 3)
+
+    @property
+    def queue_ms(self) -> float:
+        """Return the total time the requests waited for the rate limiter."""
+        return round(sum(value for stage, value in self.timings.items() if stage.endswith('_queue')), 3)
+
+    @property
+    def total_bytes(self) -> int:
+        """Return the total size of the downloaded pages."""
+        return sum(self.response_bytes.values())
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as a dict (e.g. for diagnostics)."""
+        return {**asdict(self), 'fetch_ms': self.fetch_ms, 'parse_ms': self.parse_ms, 'queue_ms': self.queue_ms, 'total_bytes': self.total_bytes}
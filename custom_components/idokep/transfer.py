@@ -0,0 +1,134 @@
+"""Compressed transfers and byte accounting of the Idokep Weather service."""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+import zlib
+
+from aiohttp import ClientResponse, ClientSession, hdrs
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+
+from .const import DATA_SESSION, DOMAIN
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, the pages are requested with gzip / deflate only without it
+    brotli = None
+
+# Content codings the pages are requested with, in order of preference
+ACCEPT_ENCODING = "br, gzip, deflate" if brotli is not None else "gzip, deflate"
+
+# Chunk size of the streamed (and decoded) response bodies
+STREAM_CHUNK_SIZE = 16384
+
+
+class StreamDecoder:
+    """Incremental decoder of a content coded (gzip, deflate, br or identity) response body."""
+
+    def __init__(self, content_encoding: str | None) -> None:
+        """Initialize the decoder of the content coding."""
+        coding = (content_encoding or "identity").strip().lower()
+        self._flush = None
+        if coding == "gzip":
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._decode, self._flush = decompressor.decompress, decompressor.flush
+        elif coding == "deflate":
+            # "deflate" is zlib wrapped by the standard, but some servers send raw deflate => decided by the first bytes
+            self._head = b""
+            self._decode, self._flush = self._decode_deflate_head, self._flush_deflate_head
+        elif coding == "br" and brotli is not None:
+            decompressor = brotli.Decompressor()
+            self._decode = getattr(decompressor, "process", None) or decompressor.decompress
+        elif coding == "identity":
+            self._decode = bytes
+        else:
+            raise ValueError("Unsupported content encoding: " + coding)
+
+    def _decode_deflate_head(self, chunk: bytes) -> bytes:
+        """Detect the deflate variant from the first two bytes, then decode with the matching decompressor."""
+        self._head += chunk
+        if len(self._head) < 2:
+            return b""
+        head, self._head = self._head, b""
+        if head[:2] == b"\x1f\x8b" or (head[0] & 0x0F == 8 and (head[0] << 8 | head[1]) % 31 == 0):
+            # zlib (or gzip) header
+            decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        else:
+            # Header check failed => raw deflate stream
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        self._decode, self._flush = decompressor.decompress, decompressor.flush
+        return self._decode(head)
+
+    def _flush_deflate_head(self) -> bytes:
+        """Decode a body shorter than the header check (raw deflate)."""
+        return zlib.decompressobj(-zlib.MAX_WBITS).decompress(self._head) if self._head else b""
+
+    def decode(self, chunk: bytes) -> bytes:
+        """Return the decoded data of a chunk."""
+        return self._decode(chunk)
+
+    def flush(self) -> bytes:
+        """Return the decoded data still buffered by the decoder."""
+        return self._flush() if self._flush is not None else b""
+
+
+@dataclass
+class TransferStats:
+    """Cumulative wire (as transferred) and decoded (content) bytes per URL."""
+
+    wire_bytes: dict[str, int] = field(default_factory=dict)
+    decoded_bytes: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total_wire_bytes(self) -> int:
+        """Return the total bytes transferred."""
+        return sum(self.wire_bytes.values())
+
+    @property
+    def total_decoded_bytes(self) -> int:
+        """Return the total bytes of the decoded content."""
+        return sum(self.decoded_bytes.values())
+
+    def add(self, url: str, wire_bytes: int, decoded_bytes: int) -> None:
+        """Account the bytes of a chunk of the url."""
+        self.wire_bytes[url] = self.wire_bytes.get(url, 0) + wire_bytes
+        self.decoded_bytes[url] = self.decoded_bytes.get(url, 0) + decoded_bytes
+
+
+async def iter_decoded(response: ClientResponse, transfer_stats: TransferStats | None = None) -> AsyncIterator[bytes]:
+    """Yield the decoded chunks of the response body as they arrive (the session shall not decompress)."""
+    decoder = StreamDecoder(response.headers.get(hdrs.CONTENT_ENCODING))
+    url = str(response.url)
+    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+        decoded = decoder.decode(chunk)
+        if transfer_stats is not None:
+            transfer_stats.add(url, len(chunk), len(decoded))
+        if decoded:
+            yield decoded
+    decoded = decoder.flush()
+    if transfer_stats is not None:
+        transfer_stats.add(url, 0, len(decoded))
+    if decoded:
+        yield decoded
+
+
+@callback
+def async_get_transfer_session(hass: HomeAssistant) -> ClientSession:
+    """Return the pooled client session of the integration, its responses are decoded by iter_decoded."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SESSION not in domain_data:
+        # Raw bodies => wire bytes can be counted and the decoding is streamed
+        domain_data[DATA_SESSION] = async_create_clientsession(hass, auto_decompress=False)
+    return domain_data[DATA_SESSION]
+
+
+@callback
+def async_release_transfer_session(hass: HomeAssistant) -> None:
+    """Drop the client session of the integration (when its last config entry is unloaded)."""
+    session = hass.data.get(DOMAIN, {}).pop(DATA_SESSION, None)
+    if session is not None:
+        # Connector (connection pool) of the session is shared by Home Assistant => the session is detached, not closed
+        session.detach()
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 from homeassistant.components.weather import (
     Forecast,
     SingleCoordinatorWeatherEntity,
@@ -41,6 +43,8 @@ from .const import (
     ATTR_API_WIND_SPEED,
     ATTRIBUTION,
     ATTR_FORECAST_NAME,
+    ATTR_STALE,
+    ATTR_DATA_TIMESTAMP,
     DEFAULT_NAME,
     DOMAIN,
     MANUFACTURER,
@@ -91,6 +95,30 @@ class IdokepWeather(SingleCoordinatorWeatherEntity[WeatherUpdateCoordinator]):
 
         self._attr_supported_features = ( WeatherEntityFeature.FORECAST_DAILY | WeatherEntityFeature.FORECAST_HOURLY )
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state / update forecast subscribers only for the changed sections."""
+        changed_sections = self.coordinator.changed_sections
+        if ATTR_API_CURRENT in changed_sections:
+            self.async_write_ha_state()
+
+        forecast_types = []
+        if ATTR_API_DAILY_FORECAST in changed_sections:
+            forecast_types.append("daily")
+        if ATTR_API_HOURLY_FORECAST in changed_sections:
+            forecast_types.append("hourly")
+        if forecast_types:
+            self.hass.async_create_task(self.async_update_listeners(forecast_types))
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the stale flag and the time of the data (e.g. served from an old snapshot or after failed refreshes)."""
+        data_timestamp = self.coordinator.section_timestamp(ATTR_API_CURRENT)
+        return {
+            ATTR_STALE: self.coordinator.section_is_stale(ATTR_API_CURRENT),
+            ATTR_DATA_TIMESTAMP: data_timestamp.isoformat() if data_timestamp else None,
+        }
+
     @property
     def condition(self) -> str | None:
         """Return the current condition."""
@@ -109,9 +137,10 @@ class IdokepWeather(SingleCoordinatorWeatherEntity[WeatherUpdateCoordinator]):
     @callback
     def _async_forecast_daily(self) -> list[Forecast] | None:
         """Return the daily forecast in native units."""
-        return self.coordinator.data[ATTR_API_DAILY_FORECAST]
+        # Forecast dicts are built from the compact store at the first request after a change only
+        return self.coordinator.data[ATTR_API_DAILY_FORECAST].as_forecasts()
 
     @callback
     def _async_forecast_hourly(self) -> list[Forecast] | None:
         """Return the hourly forecast in native units."""
-        return self.coordinator.data[ATTR_API_HOURLY_FORECAST]
\ No newline at end of file
+        return self.coordinator.data[ATTR_API_HOURLY_FORECAST].as_forecasts()
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""Tests of the Idokep Weather component."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.const import CONF_NAME
+
+from custom_components.idokep.const import ATTR_API_LOCATION, DEFAULT_LOCATION, DEFAULT_NAME, DOMAIN
+
+
+def make_config_entry(location: str = DEFAULT_LOCATION, **kwargs: Any) -> MockConfigEntry:
+    """Return the config entry of a location."""
+    return MockConfigEntry(
+        domain=DOMAIN,
+        title=location,
+        unique_id=location,
+        data={CONF_NAME: DEFAULT_NAME, ATTR_API_LOCATION: location},
+        **kwargs,
+    )
@@ -0,0 +1,58 @@
+"""Fixtures of the Idokep Weather tests."""
+
+from __future__ import annotations
+
+from collections.abc import AsyncGenerator
+
+from aiohttp import ClientSession
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.idokep.const import DEFAULT_LOCATION
+from custom_components.idokep.coordinator import WeatherUpdateCoordinator
+from custom_components.idokep.scheduler import async_get_fetch_scheduler
+
+from . import make_config_entry
+from .stand_in import IdokepStandIn
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> None:
+    """Enable the custom integration in every test."""
+
+
+@pytest.fixture
+async def stand_in(monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[IdokepStandIn]:
+    """Return the started stand-in server, the integration requests it instead of idokep.hu."""
+    server = IdokepStandIn()
+    await server.start()
+    monkeypatch.setattr("custom_components.idokep.coordinator.BASE_IDOKEP_URL", server.url)
+    monkeypatch.setattr("custom_components.idokep.catalog.BASE_IDOKEP_URL", server.url)
+    yield server
+    await server.close()
+
+
+@pytest.fixture
+async def raw_session() -> AsyncGenerator[ClientSession]:
+    """Return a client session not decompressing the responses (like the session of the integration)."""
+    async with ClientSession(auto_decompress=False) as session:
+        yield session
+
+
+@pytest.fixture
+def config_entry() -> MockConfigEntry:
+    """Return the config entry of the default location."""
+    return make_config_entry()
+
+
+@pytest.fixture
+async def coordinator(hass: HomeAssistant, stand_in: IdokepStandIn) -> AsyncGenerator[WeatherUpdateCoordinator]:
+    """Return the coordinator of the default location, its pages are served by the stand-in."""
+    scheduler = async_get_fetch_scheduler(hass)
+    unregister = scheduler.async_register(DEFAULT_LOCATION)
+    coordinator = WeatherUpdateCoordinator(DEFAULT_LOCATION, hass, scheduler)
+    yield coordinator
+    await coordinator.async_shutdown()
+    unregister()
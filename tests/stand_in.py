@@ -0,0 +1,158 @@
+"""Local stand-in of the idokep.hu pages for the Idokep Weather tests."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+import gzip
+import hashlib
+from pathlib import Path
+import zlib
+
+from aiohttp import hdrs, web
+from aiohttp.test_utils import TestServer
+from multidict import CIMultiDictProxy
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FIXTURES = Path(__file__).parent / "fixtures"
+# Fixture file of each page (first segment of the URL path)
+PAGE_FIXTURES = {
+    "idojaras": "idojaras.html",
+    "elorejelzes": "elorejelzes.html",
+}
+
+
+def load_fixture(name: str) -> bytes:
+    """Return the content of a fixture file."""
+    return (FIXTURES / name).read_bytes()
+
+
+def encode_body(body: bytes, content_encoding: str | None) -> bytes:
+    """Return the body content coded with gzip, deflate (zlib or raw), br or identity."""
+    if content_encoding == "gzip":
+        return gzip.compress(body)
+    if content_encoding == "deflate":
+        return zlib.compress(body)
+    if content_encoding == "raw-deflate":
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        return compressor.compress(body) + compressor.flush()
+    if content_encoding == "br":
+        return brotli.compress(body)
+    return body
+
+
+class IdokepStandIn:
+    """aiohttp server serving the fixture pages as /<page>/<location>.
+
+    Behaviour of the pages can be changed by the tests:
+    - status: HTTP status served instead of the page
+    - delay: seconds waited before the response (e.g. latency, or a hung server)
+    - truncate: the body is cut after this many bytes
+    - chunk_size / chunk_delay: the body is streamed in chunks, waiting between them (throttled link)
+    - content_encoding: gzip, deflate, raw-deflate (served as deflate) or br
+    - etag: ETag validators are sent and If-None-Match is answered with 304
+    - last_modified: Last-Modified value sent, If-Modified-Since (without If-None-Match) of the same value is answered with 304
+    Requests (per page and per page / location, and their arrival order), 304 responses, client connections, the concurrently served requests and
+    the sent (wire) bytes are counted, the last request headers are kept per page.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the stand-in with the fixture pages."""
+        self.pages = {page: load_fixture(name) for page, name in PAGE_FIXTURES.items()}
+        self.status: dict[str, int] = {}
+        self.delay: dict[str, float] = {}
+        self.truncate: dict[str, int] = {}
+        self.chunk_size = 16384
+        self.chunk_delay = 0.0
+        self.content_encoding: str | None = None
+        self.etag = False
+        self.last_modified: str | None = None
+        self.request_headers: dict[str, CIMultiDictProxy[str]] = {}
+        self.requests: Counter[str] = Counter()
+        self.location_requests: Counter[str] = Counter()
+        self.request_log: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.not_modified: Counter[str] = Counter()
+        self.sent_bytes: Counter[str] = Counter()
+        self.connections: set[tuple] = set()
+        self._server = TestServer(web.Application())
+        self._server.app.router.add_get("/{page}/{location}", self._handle)
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the stand-in (replaces https://www.idokep.hu)."""
+        return str(self._server.make_url("")).rstrip("/")
+
+    async def start(self) -> None:
+        """Start serving on a local port."""
+        await self._server.start_server()
+
+    async def close(self) -> None:
+        """Stop serving."""
+        await self._server.close()
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await self._serve(request)
+        finally:
+            self.in_flight -= 1
+
+    async def _serve(self, request: web.Request) -> web.StreamResponse:
+        page = request.match_info["page"]
+        self.requests[page] += 1
+        self.location_requests[page + "/" + request.match_info["location"]] += 1
+        self.request_log.append(page + "/" + request.match_info["location"])
+        self.request_headers[page] = request.headers
+        # Client port identifies the connection => new connections are counted
+        self.connections.add(request.transport.get_extra_info("peername"))
+
+        if page in self.delay:
+            await asyncio.sleep(self.delay[page])
+        if page not in self.pages:
+            raise web.HTTPNotFound
+        if page in self.status:
+            return web.Response(status=self.status[page], text="Internal Server Error")
+
+        body = self.pages[page]
+        if page in self.truncate:
+            body = body[: self.truncate[page]]
+        headers = {hdrs.CONTENT_TYPE: "text/html; charset=utf-8"}
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"' if self.etag else None
+        if etag:
+            headers[hdrs.ETAG] = etag
+        if self.last_modified:
+            headers[hdrs.LAST_MODIFIED] = self.last_modified
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        if hdrs.IF_NONE_MATCH in request.headers:
+            not_modified = etag is not None and request.headers[hdrs.IF_NONE_MATCH] == etag
+        else:
+            not_modified = self.last_modified is not None and request.headers.get(hdrs.IF_MODIFIED_SINCE) == self.last_modified
+        if not_modified:
+            self.not_modified[page] += 1
+            return web.Response(status=304, headers=headers)
+        if self.content_encoding:
+            body = encode_body(body, self.content_encoding)
+            headers[hdrs.CONTENT_ENCODING] = "deflate" if self.content_encoding == "raw-deflate" else self.content_encoding
+
+        response = web.StreamResponse(headers=headers)
+        response.content_length = len(body)
+        await response.prepare(request)
+        try:
+            for start in range(0, len(body), self.chunk_size):
+                chunk = body[start : start + self.chunk_size]
+                await response.write(chunk)
+                self.sent_bytes[page] += len(chunk)
+                if self.chunk_delay:
+                    await asyncio.sleep(self.chunk_delay)
+            await response.write_eof()
+        except ConnectionResetError:
+            # Client stopped reading (e.g. forecast horizon reached)
+            pass
+        return response
@@ -0,0 +1,148 @@
+"""Offline benchmark of the refresh stages on the synthetic idokep.hu fixture pages.
+
+Every stage (download from the local stand-in, soup construction, sunrise / sunset, daily forecast,
+hourly cards, timezone conversion) is timed separately: latency percentiles over BENCHMARK_ROUNDS runs,
+then the memory allocated by a single run (tracemalloc, peak and retained).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from statistics import quantiles
+from time import perf_counter
+import tracemalloc
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from aiohttp import ClientSession
+import pytest
+
+from custom_components.idokep import parser
+from custom_components.idokep.const import HTML_PARSER_BACKENDS
+from custom_components.idokep.transfer import iter_decoded
+
+from .stand_in import IdokepStandIn, load_fixture
+
+BENCHMARK_ROUNDS = 25
+BUDAPEST_TZ = ZoneInfo("Europe/Budapest")
+# Local timezone other than Budapest => the timezone stage converts every card
+LOCAL_TZ = ZoneInfo("Europe/London")
+HUNGARY_TIME = datetime(2026, 10, 18, 14, 5, tzinfo=BUDAPEST_TZ)
+
+
+async def _profile(stage: Callable[[], Awaitable[Any]]) -> dict[str, float]:
+    """Return the latency percentiles (ms) and the allocations (KiB) of a stage."""
+    durations = []
+    for _ in range(BENCHMARK_ROUNDS):
+        start = perf_counter()
+        await stage()
+        durations.append((perf_counter() - start) * 1000)
+    percentiles = quantiles(durations, n=100, method="inclusive")
+
+    tracemalloc.start()
+    try:
+        result = await stage()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # The result is kept alive until the memory was measured
+    del result
+    return {
+        "p50_ms": percentiles[49],
+        "p90_ms": percentiles[89],
+        "p99_ms": percentiles[98],
+        "peak_kib": peak / 1024,
+        "retained_kib": retained / 1024,
+    }
+
+
+def _sync_stage(func: Callable[..., Any], *args: Any) -> Callable[[], Awaitable[Any]]:
+    """Return a synchronous stage as a coroutine function."""
+
+    async def stage() -> Any:
+        return func(*args)
+
+    return stage
+
+
+def _report(results: dict[str, dict[str, float]]) -> str:
+    """Return the benchmark table."""
+    columns = ("p50_ms", "p90_ms", "p99_ms", "peak_kib", "retained_kib")
+    lines = [f"{'stage':<20}" + "".join(f"{column:>14}" for column in columns)]
+    lines.extend(
+        f"{stage:<20}" + "".join(f"{values[column]:>14.3f}" for column in columns)
+        for stage, values in results.items()
+    )
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("backend", HTML_PARSER_BACKENDS)
+async def test_parser_backend_benchmark(backend: str, capsys: pytest.CaptureFixture[str]) -> None:
+    """Benchmark the whole parse of both fixture pages with each tree builder of HTML_PARSER_BACKENDS."""
+    actual_html = load_fixture("idojaras.html").decode()
+    hourly_html = load_fixture("elorejelzes.html").decode()
+    results = {
+        f"{backend} actual": await _profile(_sync_stage(parser.parse_actual_weather, actual_html, HUNGARY_TIME, backend)),
+        f"{backend} hourly": await _profile(
+            _sync_stage(parser.parse_hourly_forecast, hourly_html, HUNGARY_TIME, LOCAL_TZ, BUDAPEST_TZ, backend)
+        ),
+    }
+
+    with capsys.disabled():
+        print("\n" + _report(results))
+
+    assert len(parser.parse_hourly_forecast(hourly_html, HUNGARY_TIME, LOCAL_TZ, BUDAPEST_TZ, backend)) == 48
+    for values in results.values():
+        assert values["p50_ms"] <= values["p90_ms"] <= values["p99_ms"]
+
+
+async def test_stage_benchmark(stand_in: IdokepStandIn, raw_session: ClientSession, capsys: pytest.CaptureFixture[str]) -> None:
+    """Benchmark the stages of a refresh, each stage is fed with the output of the previous one."""
+    results = {}
+
+    async def download(page: str) -> bytes:
+        async with raw_session.get(stand_in.url + "/" + page + "/Budapest") as response:
+            return b"".join([chunk async for chunk in iter_decoded(response)])
+
+    results["download"] = await _profile(lambda: download("idojaras"))
+    actual_html = (await download("idojaras")).decode()
+    hourly_html = (await download("elorejelzes")).decode()
+
+    # Whole page trees (before) vs the trees strained to the scraped containers (after)
+    results["actual_soup_full"] = await _profile(_sync_stage(parser.make_soup, actual_html))
+    results["actual_soup"] = await _profile(_sync_stage(parser.make_soup, actual_html, None, parser.ACTUAL_WEATHER_STRAINER))
+    actual_soup = parser.make_soup(actual_html, None, parser.ACTUAL_WEATHER_STRAINER)
+    results["sun_times"] = await _profile(_sync_stage(parser.extract_sun_times, actual_soup, HUNGARY_TIME))
+    results["daily_forecast"] = await _profile(_sync_stage(parser.extract_daily_forecast, actual_soup))
+
+    results["hourly_soup_full"] = await _profile(_sync_stage(parser.make_soup, hourly_html))
+    results["hourly_soup"] = await _profile(_sync_stage(parser.make_soup, hourly_html, None, parser.HOURLY_CARDS_STRAINER))
+    hourly_soup = parser.make_soup(hourly_html, None, parser.HOURLY_CARDS_STRAINER)
+    results["hourly_cards"] = await _profile(_sync_stage(parser.extract_hourly_cards, hourly_soup))
+    hourly_cards = parser.extract_hourly_cards(hourly_soup)
+    results["timezone"] = await _profile(_sync_stage(parser.localize_hourly_cards, hourly_cards, HUNGARY_TIME, LOCAL_TZ, BUDAPEST_TZ))
+
+    with capsys.disabled():
+        print("\n" + _report(results))
+
+    # The benchmarked stages did the real work
+    sunrise, sunset = parser.extract_sun_times(actual_soup, HUNGARY_TIME)
+    assert (sunrise.strftime("%H:%M"), sunset.strftime("%H:%M")) == ("06:58", "17:24")
+    assert len(parser.extract_daily_forecast(actual_soup)) == 7
+    assert len(hourly_cards) == 48
+    assert len(parser.localize_hourly_cards(hourly_cards, HUNGARY_TIME, LOCAL_TZ, BUDAPEST_TZ)) == 48
+    assert stand_in.requests["idojaras"] == BENCHMARK_ROUNDS + 2
+    for values in results.values():
+        assert values["p50_ms"] <= values["p90_ms"] <= values["p99_ms"]
+
+
+async def test_parse_timings_cover_the_stages() -> None:
+    """The instrumented parsers time the same stages as the benchmark."""
+    timings = {}
+    parser.parse_actual_weather(load_fixture("idojaras.html").decode(), HUNGARY_TIME, timings=timings)
+    parser.parse_hourly_forecast(load_fixture("elorejelzes.html").decode(), HUNGARY_TIME, LOCAL_TZ, BUDAPEST_TZ, timings=timings)
+
+    assert {"actual_soup", "sun_times", "current_weather", "daily_forecast", "hourly_soup", "hourly_cards", "timezone"} <= timings.keys()
+    assert all(duration >= 0 for duration in timings.values())
+
@@ -0,0 +1,66 @@
+"""Tests of the Idokep Weather location catalog."""
+
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.idokep.catalog import SEED_LOCATIONS, LocationCatalog, normalize_location
+
+from .stand_in import IdokepStandIn
+
+KNOWN_LOCATIONS = ("Budapest", "Szeged", "Székesfehérvár", "Szentendre", "Szolnok", "Győr")
+
+
+def _catalog(hass: HomeAssistant) -> LocationCatalog:
+    """Return a catalog of the known locations (without the seed locations)."""
+    catalog = LocationCatalog(hass, seed_locations=())
+    for location in KNOWN_LOCATIONS:
+        catalog.async_add(location)
+    return catalog
+
+
+async def test_normalize_location() -> None:
+    """Keys of the locations are accent and case insensitive."""
+    assert normalize_location(" Székesfehérvár ") == "szekesfehervar"
+    assert normalize_location("GYŐR") == normalize_location("gyor")
+
+
+async def test_lookup_and_suggest(hass: HomeAssistant) -> None:
+    """Known locations are found without accents, suggestions are the locations starting with the text."""
+    catalog = _catalog(hass)
+
+    assert catalog.lookup("szekesfehervar") == "Székesfehérvár"
+    assert catalog.lookup("gyor") == "Győr"
+    assert catalog.lookup("Debrecen") is None
+    assert catalog.suggest("sze") == ["Szeged", "Székesfehérvár", "Szentendre"]
+    assert catalog.suggest("SZ", limit=2) == ["Szeged", "Székesfehérvár"]
+    assert catalog.suggest("Debr") == []
+
+
+async def test_fresh_catalog_knows_the_seed_locations(hass: HomeAssistant, stand_in: IdokepStandIn) -> None:
+    """Seed locations are suggested and resolved offline before any location was validated."""
+    catalog = LocationCatalog(hass)
+
+    assert catalog.locations == sorted(SEED_LOCATIONS)
+    assert catalog.suggest("Szekesfehervar") == ["Székesfehérvár"]
+    assert await catalog.async_resolve("Szekesfehervar") == "Székesfehérvár"
+    assert stand_in.requests["idojaras"] == 0
+    # Seed locations are not validated again by the catalog refresh
+    assert not catalog.needs_refresh
+
+
+async def test_resolve_validates_unknown_locations_once(hass: HomeAssistant, stand_in: IdokepStandIn) -> None:
+    """Known locations are resolved offline, an unknown one is validated online and then it is known."""
+    catalog = _catalog(hass)
+
+    assert await catalog.async_resolve("székesfehérvár") == "Székesfehérvár"
+    assert stand_in.requests["idojaras"] == 0
+
+    assert await catalog.async_resolve("Debrecen ") == "Debrecen"
+    assert await catalog.async_resolve("debrecen") == "Debrecen"
+    assert stand_in.requests["idojaras"] == 1
+    assert "Debrecen" in catalog.locations
+
+    stand_in.status = {"idojaras": 404}
+    assert await catalog.async_resolve("Nowhere") is None
+    assert "Nowhere" not in catalog.locations
@@ -0,0 +1,139 @@
+"""Tests of the Idokep Weather config flow."""
+
+from __future__ import annotations
+
+from collections.abc import Generator
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.config_entries import SOURCE_RECONFIGURE, SOURCE_USER
+from homeassistant.const import CONF_LANGUAGE, CONF_NAME
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from custom_components.idokep.const import (
+    ATTR_API_LOCATION,
+    ATTR_UID,
+    CONF_HOURLY_HORIZON,
+    DEFAULT_NAME,
+    DOMAIN,
+    HOURLY_FORECAST_HORIZON,
+)
+from custom_components.idokep.coordinator import snapshot_store
+from custom_components.idokep.history import history_store
+
+from . import make_config_entry
+from .stand_in import IdokepStandIn
+
+HORIZON = 12
+
+
+@pytest.fixture
+def mock_setup_entry() -> Generator[AsyncMock]:
+    """Skip the setup of the created and reloaded entries."""
+    with patch("custom_components.idokep.async_setup_entry", return_value=True) as mock_setup_entry:
+        yield mock_setup_entry
+
+
+async def _async_reconfigure(hass: HomeAssistant, entry: MockConfigEntry, location: str) -> dict:
+    """Run the reconfigure flow of the entry with the location, returns its result."""
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": SOURCE_RECONFIGURE, "entry_id": entry.entry_id})
+    assert result["type"] is FlowResultType.FORM
+    assert result["step_id"] == "reconfigure"
+    return await hass.config_entries.flow.async_configure(result["flow_id"], {ATTR_API_LOCATION: location})
+
+
+async def test_reconfigure_keeps_its_own_location(hass: HomeAssistant, mock_setup_entry: AsyncMock) -> None:
+    """The reconfigured entry may keep its location (typed without accents)."""
+    entry = make_config_entry("Győr")
+    entry.add_to_hass(hass)
+
+    result = await _async_reconfigure(hass, entry, "gyor")
+
+    assert result["type"] is FlowResultType.ABORT
+    assert result["reason"] == "reconfigure_successful"
+    assert entry.unique_id == "Győr"
+    assert entry.data[ATTR_API_LOCATION] == "Győr"
+
+
+@pytest.mark.parametrize(
+    "other_entry",
+    [
+        make_config_entry("Szeged"),
+        # Entry created before multi-location support (fixed unique id)
+        MockConfigEntry(domain=DOMAIN, unique_id=ATTR_UID, data={CONF_NAME: DEFAULT_NAME, ATTR_API_LOCATION: "Szeged"}),
+    ],
+)
+async def test_reconfigure_to_the_location_of_an_other_entry(hass: HomeAssistant, mock_setup_entry: AsyncMock, other_entry: MockConfigEntry) -> None:
+    """Location of an other entry is refused."""
+    entry = make_config_entry()
+    entry.add_to_hass(hass)
+    other_entry.add_to_hass(hass)
+
+    result = await _async_reconfigure(hass, entry, "Szeged")
+
+    assert result["type"] is FlowResultType.ABORT
+    assert result["reason"] == "already_configured"
+    assert entry.unique_id == entry.data[ATTR_API_LOCATION] == "Budapest"
+
+
+async def test_reconfigure_moves_the_entities(hass: HomeAssistant, mock_setup_entry: AsyncMock, stand_in: IdokepStandIn) -> None:
+    """Unique ids of the entry, its entities and device follow the new location, the old location can be added again."""
+    entry = make_config_entry()
+    entry.add_to_hass(hass)
+    entity_registry = er.async_get(hass)
+    weather = entity_registry.async_get_or_create("weather", DOMAIN, "Budapest", config_entry=entry)
+    sensor = entity_registry.async_get_or_create("sensor", DOMAIN, "Budapest_temperature", config_entry=entry)
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_or_create(config_entry_id=entry.entry_id, identifiers={(DOMAIN, "Budapest")})
+    for store in (snapshot_store(hass, "Budapest"), history_store(hass, "Budapest")):
+        await store.async_save({})
+
+    # Unknown location is validated online (by the stand-in)
+    result = await _async_reconfigure(hass, entry, "Zebegény")
+
+    assert result["type"] is FlowResultType.ABORT
+    assert result["reason"] == "reconfigure_successful"
+    assert entry.unique_id == entry.data[ATTR_API_LOCATION] == "Zebegény"
+    assert entity_registry.async_get_entity_id("weather", DOMAIN, "Zebegény") == weather.entity_id
+    assert entity_registry.async_get_entity_id("sensor", DOMAIN, "Zebegény_temperature") == sensor.entity_id
+    assert device_registry.async_get(device.id).identifiers == {(DOMAIN, "Zebegény")}
+    assert stand_in.requests["idojaras"] == 1
+    # Snapshot and forecast history of the old location are removed
+    assert await snapshot_store(hass, "Budapest").async_load() is None
+    assert await history_store(hass, "Budapest").async_load() is None
+
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": SOURCE_USER})
+    result = await hass.config_entries.flow.async_configure(result["flow_id"], {CONF_NAME: DEFAULT_NAME, ATTR_API_LOCATION: "Budapest"})
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert result["result"].unique_id == "Budapest"
+
+
+async def test_unknown_location_gets_suggestions(hass: HomeAssistant, mock_setup_entry: AsyncMock, stand_in: IdokepStandIn) -> None:
+    """Location refused by idokep is an error of the location field, the similar known locations are suggested."""
+    stand_in.status = {"idojaras": 404}
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": SOURCE_USER})
+
+    result = await hass.config_entries.flow.async_configure(result["flow_id"], {CONF_NAME: DEFAULT_NAME, ATTR_API_LOCATION: "Szekesfeher"})
+
+    assert result["type"] is FlowResultType.FORM
+    assert result["errors"] == {ATTR_API_LOCATION: "invalid_location"}
+    assert result["description_placeholders"] == {"suggestions": "Székesfehérvár"}
+
+
+async def test_options_flow_sets_the_hourly_horizon(hass: HomeAssistant, config_entry: MockConfigEntry) -> None:
+    """The hourly forecast horizon is an entry option, the other options are kept."""
+    config_entry.add_to_hass(hass)
+    hass.config_entries.async_update_entry(config_entry, options={CONF_LANGUAGE: "hu"})
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    assert result["type"] is FlowResultType.FORM
+    assert result["step_id"] == "init"
+    assert result["data_schema"]({}) == {CONF_HOURLY_HORIZON: HOURLY_FORECAST_HORIZON}
+
+    result = await hass.config_entries.options.async_configure(result["flow_id"], {CONF_HOURLY_HORIZON: HORIZON})
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert config_entry.options == {CONF_LANGUAGE: "hu", CONF_HOURLY_HORIZON: HORIZON}
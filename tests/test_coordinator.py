@@ -0,0 +1,345 @@
+"""Tests of the Idokep Weather data update coordinator."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from time import monotonic
+import tracemalloc
+from typing import Any
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from custom_components.idokep import parser
+from custom_components.idokep.const import (
+    ATTR_API_CURRENT,
+    ATTR_API_DAILY_FORECAST,
+    ATTR_API_HOURLY_FORECAST,
+    DEFAULT_LOCATION,
+    MAX_CONCURRENT_REQUESTS,
+)
+from custom_components.idokep.coordinator import (
+    DATA_SECTIONS,
+    DIAGNOSTICS_SECTION,
+    PAGE_ACTUAL,
+    PAGE_HOURLY,
+    SNAPSHOT_STORAGE_VERSION,
+    WeatherUpdateCoordinator,
+    snapshot_store,
+)
+from custom_components.idokep.forecast import HOURLY_FORECAST_COLUMNS, ForecastSeries
+from custom_components.idokep.scheduler import (
+    BREAKER_CLOSED,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_OPEN,
+    TokenBucketLimiter,
+    async_get_fetch_scheduler,
+)
+from custom_components.idokep.transfer import async_get_transfer_session
+
+from .stand_in import IdokepStandIn
+
+# Number of requested refreshes after the first one
+REFRESH_CYCLES = 2
+# Response latency (seconds) of the pages served by the stand-in
+PAGE_LATENCY = 0.3
+# Request timeout (seconds) of the failure tests, the delayed page responds later
+TEST_REQUEST_TIMEOUT = 0.2
+# Refresh requests sent at the same time
+CONCURRENT_REQUESTS = 50
+# Age of the data of a stale snapshot
+STALE_SNAPSHOT_AGE = timedelta(hours=3)
+# Hourly forecast horizon (cards) & throttled link of the stand-in (bytes per chunk, seconds between chunks)
+HORIZON = 12
+THROTTLED_CHUNK_SIZE = 2048
+THROTTLED_CHUNK_DELAY = 0.02
+# Markup appended to the current weather page, so its parse takes a while
+FILLER_BLOCKS = 20000
+
+
+async def test_refreshes_reuse_pooled_connections(hass: HomeAssistant, coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """Refreshes send their requests over the kept-alive connections of the shared session."""
+    await coordinator.async_refresh()
+    coordinator.min_freshness = timedelta()
+    for _ in range(REFRESH_CYCLES):
+        await coordinator.async_request_refresh()
+
+    assert coordinator.last_update_success
+    assert coordinator.data[ATTR_API_CURRENT]
+    assert len(coordinator.data[ATTR_API_HOURLY_FORECAST]) == 48
+    assert sum(stand_in.requests.values()) == 2 * (REFRESH_CYCLES + 1)
+    # Pages are downloaded concurrently from the first refresh on (2 connections at most)
+    assert len(stand_in.connections) <= 2
+    assert async_get_transfer_session(hass) is async_get_transfer_session(hass)
+
+
+async def test_pages_are_downloaded_concurrently(coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """The two pages are downloaded at the same time, the first refresh (without sun times) included."""
+    stand_in.delay = {"idojaras": PAGE_LATENCY, "elorejelzes": PAGE_LATENCY}
+    coordinator.min_freshness = timedelta()
+
+    for refresh in (coordinator.async_refresh, coordinator.async_request_refresh):
+        start = monotonic()
+        await refresh()
+        elapsed = monotonic() - start
+
+        assert coordinator.last_update_success
+        assert PAGE_LATENCY <= elapsed < 2 * PAGE_LATENCY
+    assert stand_in.requests == {"idojaras": 2, "elorejelzes": 2}
+
+
+async def test_hourly_forecast_waits_for_the_sun_times(coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """Without any sun times (current weather page never refreshed) the hourly forecast is refreshed with the current weather page."""
+    stand_in.status["idojaras"] = 500
+    await coordinator.async_refresh()
+
+    assert not coordinator.last_update_success
+    hourly_refresher = coordinator.page_refreshers[PAGE_HOURLY]
+    assert hourly_refresher.last_success is None
+    assert hourly_refresher.next_refresh == coordinator.page_refreshers[PAGE_ACTUAL].next_refresh
+
+    del stand_in.status["idojaras"]
+    coordinator.min_freshness = timedelta()
+    await coordinator.async_request_refresh()
+    assert coordinator.last_update_success
+    assert len(coordinator.data[ATTR_API_HOURLY_FORECAST]) == 48
+    assert stand_in.requests == {"idojaras": 2, "elorejelzes": 2}
+
+
+async def test_parsing_does_not_block_the_event_loop(coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """The event loop keeps running while a large page is parsed (the parse runs in the executor)."""
+    filler = b"<div class='hirdetes'><span>x</span></div>" * FILLER_BLOCKS
+    stand_in.pages["idojaras"] = stand_in.pages["idojaras"].replace(b"</body>", filler + b"</body>")
+    start = monotonic()
+    parser.parse_actual_weather(stand_in.pages["idojaras"].decode(), datetime.now())
+    parse_duration = monotonic() - start
+
+    lags = []
+
+    async def heartbeat() -> None:
+        while True:
+            beat = monotonic()
+            await asyncio.sleep(0.001)
+            lags.append(monotonic() - beat)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        await coordinator.async_refresh()
+    finally:
+        heartbeat_task.cancel()
+
+    assert coordinator.last_update_success
+    assert len(lags) > 10
+    assert max(lags) < parse_duration / 2
+
+
+async def test_startup_is_served_from_the_snapshot(
+    hass: HomeAssistant, coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """A restarted coordinator serves the persisted data without waiting for the (slow) upstream."""
+    stand_in.delay = {"idojaras": PAGE_LATENCY, "elorejelzes": PAGE_LATENCY}
+    # Setup without a snapshot waits for the first refresh
+    start = monotonic()
+    await coordinator.async_refresh()
+    setup_without_snapshot = monotonic() - start
+    store = snapshot_store(hass, DEFAULT_LOCATION)
+    snapshot = coordinator._snapshot_data()
+    await store.async_save(snapshot)
+
+    restarted = WeatherUpdateCoordinator(DEFAULT_LOCATION, hass, async_get_fetch_scheduler(hass))
+    start = monotonic()
+    assert await restarted.async_load_snapshot()
+    setup_with_snapshot = monotonic() - start
+    with capsys.disabled():
+        print(f"\nsetup time with snapshot {setup_with_snapshot * 1000:.1f} ms, without snapshot {setup_without_snapshot * 1000:.1f} ms")
+    assert setup_without_snapshot >= PAGE_LATENCY
+    assert setup_with_snapshot < PAGE_LATENCY
+
+    assert stand_in.requests == {"idojaras": 1, "elorejelzes": 1}
+    for section in (ATTR_API_CURRENT, ATTR_API_HOURLY_FORECAST, ATTR_API_DAILY_FORECAST):
+        assert restarted.data[section] == coordinator.data[section]
+    assert restarted.snapshot_restored
+    assert not restarted.is_stale
+
+    # Live data replaces the snapshot
+    await restarted.async_refresh()
+    assert restarted.last_update_success
+    assert not restarted.snapshot_restored
+    assert stand_in.requests == {"idojaras": 2, "elorejelzes": 2}
+
+    # Data of an old snapshot is served as stale
+    old = (coordinator.data_timestamp - STALE_SNAPSHOT_AGE).isoformat()
+    await store.async_save({**snapshot, "timestamp": old, "page_timestamps": dict.fromkeys(snapshot["page_timestamps"], old)})
+    restarted = WeatherUpdateCoordinator(DEFAULT_LOCATION, hass, async_get_fetch_scheduler(hass))
+    assert await restarted.async_load_snapshot()
+    assert restarted.is_stale
+
+
+@pytest.mark.parametrize(
+    ("version_offset", "corruption"),
+    [
+        pytest.param(-1, {}, id="old_version"),
+        pytest.param(0, {"page_timestamps": None}, id="missing_page_timestamps"),
+        pytest.param(0, {"data": {ATTR_API_CURRENT: {}, ATTR_API_HOURLY_FORECAST: [], ATTR_API_DAILY_FORECAST: []}}, id="forecast_lists"),
+        pytest.param(0, {"data": None}, id="missing_data"),
+    ],
+)
+async def test_unusable_snapshot_is_ignored(
+    hass: HomeAssistant, coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn, version_offset: int, corruption: dict[str, Any]
+) -> None:
+    """A snapshot of an other version or with undecodable data is handled as missing: the pages are fetched."""
+    await coordinator.async_refresh()
+    snapshot = {key: value for key, value in {**coordinator._snapshot_data(), **corruption}.items() if value is not None}
+    store = Store(hass, SNAPSHOT_STORAGE_VERSION + version_offset, snapshot_store(hass, DEFAULT_LOCATION).key)
+    await store.async_save(snapshot)
+
+    restarted = WeatherUpdateCoordinator(DEFAULT_LOCATION, hass, async_get_fetch_scheduler(hass))
+    assert not await restarted.async_load_snapshot()
+    assert restarted.data is None
+    assert not restarted.snapshot_restored
+
+    await restarted.async_refresh()
+    assert restarted.last_update_success
+    assert stand_in.requests == {"idojaras": 2, "elorejelzes": 2}
+
+
+async def test_forecast_horizon_stops_the_download(
+    hass: HomeAssistant, coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """With a horizon the cards are parsed while the page streams and only the ones within it are downloaded: fewer bytes and earlier forecast on a slow link."""
+    stand_in.chunk_size = THROTTLED_CHUNK_SIZE
+    stand_in.chunk_delay = THROTTLED_CHUNK_DELAY
+    horizon_coordinator = WeatherUpdateCoordinator(DEFAULT_LOCATION, hass, async_get_fetch_scheduler(hass), HORIZON)
+    peak_memory = {}
+    for refreshed in (coordinator, horizon_coordinator):
+        tracemalloc.start()
+        try:
+            await refreshed.async_refresh()
+            _, peak_memory[refreshed] = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    assert len(coordinator.data[ATTR_API_HOURLY_FORECAST]) == 48
+    assert len(horizon_coordinator.data[ATTR_API_HOURLY_FORECAST]) == HORIZON
+    assert horizon_coordinator.data[ATTR_API_HOURLY_FORECAST] == ForecastSeries.from_forecasts(
+        coordinator.data[ATTR_API_HOURLY_FORECAST].as_forecasts()[:HORIZON], HOURLY_FORECAST_COLUMNS
+    )
+    full_stats = coordinator.last_refresh_stats
+    horizon_stats = horizon_coordinator.last_refresh_stats
+    with capsys.disabled():
+        for label, refreshed, stats in (("whole page", coordinator, full_stats), (f"horizon {HORIZON}", horizon_coordinator, horizon_stats)):
+            print(
+                f"\n{label}: first forecast after {stats.timings['hourly_first_forecast']:.1f} ms, "
+                f"hourly page read in {stats.timings['hourly_download']:.1f} ms, {stats.response_bytes['hourly']} bytes, "
+                f"peak memory of the refresh {peak_memory[refreshed] / 1024:.0f} KiB"
+            )
+    assert horizon_stats.response_bytes["hourly"] < full_stats.response_bytes["hourly"] / 2
+    assert horizon_coordinator.transfer_stats.total_wire_bytes < coordinator.transfer_stats.total_wire_bytes
+    assert horizon_stats.timings["hourly_download"] < full_stats.timings["hourly_download"] / 2
+    assert horizon_stats.timings["hourly_first_forecast"] < full_stats.timings["hourly_first_forecast"] / 2
+    assert peak_memory[horizon_coordinator] < peak_memory[coordinator]
+
+
+async def test_concurrent_refresh_requests_share_one_fetch(coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """Concurrent refresh requests (e.g. update_entity of many entities) are served by a single upstream fetch."""
+    await coordinator.async_refresh()
+    stand_in.delay = {"idojaras": PAGE_LATENCY, "elorejelzes": PAGE_LATENCY}
+
+    # Data fresher than the minimum freshness is served without fetching
+    await asyncio.gather(*(coordinator.async_request_refresh() for _ in range(CONCURRENT_REQUESTS)))
+    assert stand_in.requests == {"idojaras": 1, "elorejelzes": 1}
+
+    coordinator.min_freshness = timedelta()
+    requesters = [asyncio.create_task(coordinator.async_request_refresh()) for _ in range(CONCURRENT_REQUESTS)]
+    await asyncio.sleep(0)
+    # A cancelled requester doesn't cancel the refresh of the others
+    requesters[0].cancel()
+    results = await asyncio.gather(*requesters, return_exceptions=True)
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == [None] * (CONCURRENT_REQUESTS - 1)
+    assert coordinator.last_update_success
+    assert stand_in.requests == {"idojaras": 2, "elorejelzes": 2}
+
+
+@pytest.mark.parametrize(
+    "failure",
+    [
+        pytest.param({"status": 500}, id="server_error"),
+        pytest.param({"delay": 1.0}, id="timeout"),
+        pytest.param({"truncate": 1000}, id="truncated_html"),
+    ],
+)
+async def test_failing_page_is_served_stale(
+    monkeypatch: pytest.MonkeyPatch, coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn, failure: dict[str, int | float]
+) -> None:
+    """Last good data of a failing page is served (flagged stale), the other page is refreshed."""
+    monkeypatch.setattr("custom_components.idokep.coordinator.REQUEST_TIMEOUT", TEST_REQUEST_TIMEOUT)
+    await coordinator.async_refresh()
+    current_weather = coordinator.data[ATTR_API_CURRENT]
+    for setting, value in failure.items():
+        getattr(stand_in, setting)["idojaras"] = value
+    coordinator.min_freshness = timedelta()
+
+    start = monotonic()
+    await coordinator.async_request_refresh()
+
+    assert monotonic() - start < 1.0
+    assert coordinator.last_update_success
+    assert coordinator.data[ATTR_API_CURRENT] == current_weather
+    assert coordinator.section_is_stale(ATTR_API_CURRENT)
+    assert not coordinator.section_is_stale(ATTR_API_HOURLY_FORECAST)
+    assert coordinator.page_refreshers[PAGE_ACTUAL].last_error is not None
+    assert stand_in.requests == {"idojaras": 2, "elorejelzes": 2}
+
+
+async def test_circuit_breaker(hass: HomeAssistant, coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """Breaker opens after consecutive failures, no requests are sent while it is open, then a probe closes it."""
+    # Requests of the repeated refreshes are not delayed by the rate limit
+    async_get_fetch_scheduler(hass).request_limiter = TokenBucketLimiter(rate=1000, burst=100, max_concurrent_requests=MAX_CONCURRENT_REQUESTS)
+    await coordinator.async_refresh()
+    stand_in.status["idojaras"] = 500
+    coordinator.min_freshness = timedelta()
+    breaker = coordinator.page_refreshers[PAGE_ACTUAL].circuit_breaker
+
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        assert breaker.state == BREAKER_CLOSED
+        await coordinator.async_request_refresh()
+    assert breaker.state == BREAKER_OPEN
+    assert stand_in.requests["idojaras"] == 1 + BREAKER_FAILURE_THRESHOLD
+
+    await coordinator.async_request_refresh()
+    assert stand_in.requests["idojaras"] == 1 + BREAKER_FAILURE_THRESHOLD
+    assert stand_in.requests["elorejelzes"] == 2 + BREAKER_FAILURE_THRESHOLD
+    assert coordinator.is_stale
+
+    # Open period is over => a single probe is sent, its success closes the breaker
+    breaker.opened_until = dt_util.utcnow()
+    del stand_in.status["idojaras"]
+    await coordinator.async_request_refresh()
+    assert stand_in.requests["idojaras"] == 2 + BREAKER_FAILURE_THRESHOLD
+    assert breaker.state == BREAKER_CLOSED
+    assert not coordinator.is_stale
+
+
+async def test_only_listeners_of_changed_sections_are_notified(coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """An unchanged refresh notifies the refresh statistics listeners only, a changed page the listeners of its changed sections."""
+    await coordinator.async_refresh()
+    notified: Counter[str] = Counter()
+    for context in (*DATA_SECTIONS, DIAGNOSTICS_SECTION):
+        coordinator.async_add_listener(lambda context=context: notified.update([context]), context)
+    coordinator.min_freshness = timedelta()
+
+    await coordinator.async_request_refresh()
+    assert notified == {DIAGNOSTICS_SECTION: 1}
+
+    # Temperature of the last hourly card (beyond today and the near-term summary) changes
+    stand_in.pages["elorejelzes"] = stand_in.pages["elorejelzes"].replace("#47\">9˚C".encode(), "#47\">8˚C".encode())
+    await coordinator.async_request_refresh()
+    assert coordinator.changed_sections == {ATTR_API_HOURLY_FORECAST}
+    assert notified == {DIAGNOSTICS_SECTION: 2, ATTR_API_HOURLY_FORECAST: 1}
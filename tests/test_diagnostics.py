@@ -0,0 +1,58 @@
+"""Tests of the Idokep Weather diagnostics."""
+
+from __future__ import annotations
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.components.diagnostics import get_diagnostics_for_config_entry
+from pytest_homeassistant_custom_component.typing import ClientSessionGenerator
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.idokep.const import ATTR_API_CURRENT, ATTR_API_DAILY_FORECAST, ATTR_API_HOURLY_FORECAST, DEFAULT_LOCATION
+from custom_components.idokep.coordinator import PAGE_UPDATE_INTERVALS, deserialize_data
+from custom_components.idokep.scheduler import BREAKER_CLOSED
+
+from .stand_in import IdokepStandIn
+
+
+async def test_config_entry_diagnostics(
+    hass: HomeAssistant, hass_client: ClientSessionGenerator, config_entry: MockConfigEntry, stand_in: IdokepStandIn
+) -> None:
+    """Diagnostics hold the refresh state of the pages, the cache & transfer counters, the refresh statistics and the data."""
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = config_entry.runtime_data.coordinator
+
+    diagnostics = await get_diagnostics_for_config_entry(hass, hass_client, config_entry)
+
+    assert diagnostics.keys() == {
+        "location", "last_update_success", "update_interval", "data_timestamp", "stale",
+        "pages", "page_cache", "transfer", "refresh_history", "data",
+    }
+    assert diagnostics["location"] == DEFAULT_LOCATION
+    assert diagnostics["last_update_success"] is True
+    assert diagnostics["stale"] is False
+    assert diagnostics["data_timestamp"] == coordinator.data_timestamp.isoformat()
+    assert diagnostics["pages"].keys() == PAGE_UPDATE_INTERVALS.keys()
+    for page, state in diagnostics["pages"].items():
+        refresher = coordinator.page_refreshers[page]
+        assert state["last_success"] == refresher.last_success.isoformat()
+        assert state["next_refresh"] == refresher.next_refresh.isoformat()
+        assert state["last_error"] is None
+        assert state["circuit_breaker"] == BREAKER_CLOSED
+    assert diagnostics["page_cache"] == {"hits": 0, "misses": 2}
+    assert diagnostics["transfer"]["wire_bytes"] == {
+        f"{stand_in.url}/{page}/{DEFAULT_LOCATION}": stand_in.sent_bytes[page] for page in ("idojaras", "elorejelzes")
+    }
+    assert len(diagnostics["refresh_history"]) == 1
+    refresh = diagnostics["refresh_history"][0]
+    assert refresh["hourly_cards"] == 48
+    assert refresh["total_bytes"] == sum(refresh["response_bytes"].values())
+    assert {"refresh", "actual_download", "actual_parse", "hourly_download", "hourly_parse"} <= refresh["timings"].keys()
+    # Data is the persisted (snapshot) representation
+    restored = deserialize_data(diagnostics["data"])
+    for section in (ATTR_API_CURRENT, ATTR_API_HOURLY_FORECAST, ATTR_API_DAILY_FORECAST):
+        assert restored[section] == coordinator.data[section]
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
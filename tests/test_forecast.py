@@ -0,0 +1,141 @@
+"""Tests of the Idokep Weather compact forecast store."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+import json
+import tracemalloc
+from typing import Any
+
+import pytest
+
+from homeassistant.components.weather import Forecast
+
+from custom_components.idokep.forecast import (
+    DAILY_FORECAST_COLUMNS,
+    HOURLY_FORECAST_COLUMNS,
+    SUMMARY_HOURS_UNTIL_PRECIPITATION,
+    SUMMARY_PRECIPITATION_PROBABILITY_NEXT_3H,
+    SUMMARY_RAIN_NEXT_3H,
+    SUMMARY_TEMPERATURE_MAX_TODAY,
+    SUMMARY_TEMPERATURE_MIN_TODAY,
+    ForecastSeries,
+    summarize_forecast,
+)
+
+# Simulated locations and hourly forecast cards of a location
+LOCATIONS = 30
+CARDS = 48
+# First card of the synthetic hourly forecast
+START = datetime(2026, 10, 18, 14, tzinfo=UTC)
+
+
+def _hourly_forecasts(location: int) -> list[Forecast]:
+    """Return a synthetic hourly forecast of a location (wind bearing is unknown in every third hour)."""
+    return [
+        Forecast(
+            datetime=(START + timedelta(hours=hour)).isoformat(),
+            condition="rainy" if hour % 5 == 0 else "cloudy",
+            temperature=float(location + hour % 12),
+            wind_speed=float(hour % 30),
+            wind_bearing=None if hour % 3 == 0 else (hour * 45) % 360,
+            precipitation_probability=hour % 100,
+            precipitation=0.2 if hour % 5 == 0 else 0.0,
+        )
+        for hour in range(CARDS)
+    ]
+
+
+def _retained_bytes(build: Any) -> tuple[Any, int]:
+    """Return the result of build and the memory it retains."""
+    tracemalloc.start()
+    try:
+        result = build()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, retained
+
+
+async def test_columns_are_typed() -> None:
+    """Numeric values are returned with their own type, missing values as None."""
+    series = ForecastSeries.from_forecasts(_hourly_forecasts(0), HOURLY_FORECAST_COLUMNS)
+
+    assert len(series) == CARDS
+    assert series.column("wind_bearing")[:3] == [None, 45, 90]
+    assert all(type(value) is int for value in series.column("precipitation_probability"))
+    assert all(type(value) is float for value in series.column("temperature"))
+
+
+async def test_forecasts_are_built_lazily_once() -> None:
+    """Forecast dicts are the same as the stored ones, built at the first request only."""
+    forecasts = _hourly_forecasts(0)
+    series = ForecastSeries.from_forecasts(forecasts, HOURLY_FORECAST_COLUMNS)
+    assert series._forecasts is None
+
+    materialized = series.as_forecasts()
+    assert materialized == forecasts
+    assert series.as_forecasts() is materialized
+
+
+async def test_dict_round_trip() -> None:
+    """The JSON representation (snapshot) gives an equal series."""
+    series = ForecastSeries.from_forecasts(_hourly_forecasts(0), HOURLY_FORECAST_COLUMNS)
+    restored = ForecastSeries.from_dict(json.loads(json.dumps(series.as_dict())), HOURLY_FORECAST_COLUMNS)
+
+    assert restored == series
+    assert restored.as_forecasts() == series.as_forecasts()
+    assert restored != ForecastSeries.from_forecasts(_hourly_forecasts(1), HOURLY_FORECAST_COLUMNS)
+
+
+async def test_memory_of_the_locations(capsys: pytest.CaptureFixture[str]) -> None:
+    """Series of many locations take much less memory than their Forecast dicts."""
+    forecast_lists, dict_bytes = _retained_bytes(lambda: [_hourly_forecasts(location) for location in range(LOCATIONS)])
+    series, series_bytes = _retained_bytes(
+        lambda: [ForecastSeries.from_forecasts(_hourly_forecasts(location), HOURLY_FORECAST_COLUMNS) for location in range(LOCATIONS)]
+    )
+    with capsys.disabled():
+        print(f"\nhourly forecasts of {LOCATIONS} locations: Forecast dicts {dict_bytes / 1024:.1f} KiB, series {series_bytes / 1024:.1f} KiB")
+
+    assert [item.as_forecasts() for item in series] == forecast_lists
+    assert series_bytes < dict_bytes / 2
+
+
+@pytest.mark.parametrize(
+    ("elapsed", "rain", "probability", "hours_until_precipitation"),
+    [
+        # Near term is the card of the current hour and the next two, whatever the minute is
+        (timedelta(), 0.2, 2, 0.0),
+        (timedelta(minutes=59), 0.2, 2, 0.0),
+        (timedelta(hours=1), 0.0, 3, 4.0),
+        (timedelta(hours=1, minutes=30), 0.0, 3, 3.5),
+        # Before the first card the window starts at the first card
+        (-timedelta(minutes=30), 0.2, 2, 0.5),
+    ],
+)
+async def test_summary_near_term_window(elapsed: timedelta, rain: float, probability: int, hours_until_precipitation: float) -> None:
+    """Near term aggregates cover three cards from the current hour's card, the window moves by whole hours only."""
+    hourly = ForecastSeries.from_forecasts(_hourly_forecasts(0), HOURLY_FORECAST_COLUMNS)
+    daily = ForecastSeries.from_forecasts([], DAILY_FORECAST_COLUMNS)
+
+    summary = summarize_forecast(hourly, daily, START + elapsed)
+
+    assert summary[SUMMARY_RAIN_NEXT_3H] == rain
+    assert summary[SUMMARY_PRECIPITATION_PROBABILITY_NEXT_3H] == probability
+    assert summary[SUMMARY_HOURS_UNTIL_PRECIPITATION] == hours_until_precipitation
+
+
+@pytest.mark.parametrize("elapsed", [timedelta(), timedelta(hours=CARDS)])
+async def test_summary_of_no_forecast(elapsed: timedelta) -> None:
+    """Without forecasts (empty series or every card passed) the aggregates are unknown, no rain is expected."""
+    forecasts = [] if elapsed == timedelta() else _hourly_forecasts(0)
+    hourly = ForecastSeries.from_forecasts(forecasts, HOURLY_FORECAST_COLUMNS)
+    daily = ForecastSeries.from_forecasts([], DAILY_FORECAST_COLUMNS)
+
+    assert summarize_forecast(hourly, daily, START + elapsed) == {
+        SUMMARY_RAIN_NEXT_3H: 0.0,
+        SUMMARY_PRECIPITATION_PROBABILITY_NEXT_3H: None,
+        SUMMARY_HOURS_UNTIL_PRECIPITATION: None,
+        SUMMARY_TEMPERATURE_MAX_TODAY: None,
+        SUMMARY_TEMPERATURE_MIN_TODAY: None,
+    }
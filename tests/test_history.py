@@ -0,0 +1,110 @@
+"""Tests of the Idokep Weather forecast accuracy history."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+import json
+import tracemalloc
+
+import pytest
+
+from custom_components.idokep.forecast import HOURLY_FORECAST_COLUMNS, ForecastSeries
+from custom_components.idokep.history import HISTORY_MAX_LEAD, ForecastHistory
+
+START = datetime(2026, 10, 1, tzinfo=UTC)
+# Error (degrees) of the simulated forecast per hour of lead time
+ERROR_PER_LEAD_HOUR = 0.1
+SIMULATED_DAYS = 10
+
+
+def _temperature(moment: datetime) -> float:
+    """Return the simulated observed temperature."""
+    return 10 + moment.hour / 2
+
+
+def _forecast(now: datetime) -> ForecastSeries:
+    """Return the simulated hourly forecast made now, its error grows with the lead time."""
+    targets = [now + timedelta(hours=lead) for lead in range(HISTORY_MAX_LEAD)]
+    return ForecastSeries.from_forecasts(
+        [
+            {"datetime": target.isoformat(), "condition": "cloudy", "temperature": _temperature(target) + lead * ERROR_PER_LEAD_HOUR}
+            for lead, target in enumerate(targets)
+        ],
+        HOURLY_FORECAST_COLUMNS,
+    )
+
+
+def _simulate(history: ForecastHistory, first_hour: int, hours: int) -> None:
+    """Observe the temperature, then record the new forecast every hour (as the coordinator does)."""
+    for hour in range(first_hour, first_hour + hours):
+        now = START + timedelta(hours=hour, minutes=5)
+        history.record_observation(now, _temperature(now))
+        history.record_forecast(now, _forecast(now))
+
+
+async def test_mean_absolute_error_per_lead_time() -> None:
+    """Errors are scored per lead time."""
+    history = ForecastHistory()
+    assert history.mean_absolute_error(1, 6) is None
+
+    _simulate(history, 0, SIMULATED_DAYS * 24)
+
+    assert history.mean_absolute_error(1, 1) == ERROR_PER_LEAD_HOUR
+    assert history.mean_absolute_error(24, 24) == round(24 * ERROR_PER_LEAD_HOUR, 2)
+    assert history.mean_absolute_error(1, 6) == 0.35
+    # Leads beyond the tracked ones are ignored
+    assert history.mean_absolute_error(HISTORY_MAX_LEAD, HISTORY_MAX_LEAD * 2) is None
+
+
+async def test_memory_stays_flat() -> None:
+    """The ring buffer doesn't grow with the uptime."""
+    history = ForecastHistory()
+    _simulate(history, 0, 2 * 24)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        _simulate(history, 2 * 24, (SIMULATED_DAYS - 2) * 24)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert after - before < 1024
+
+
+async def test_dict_round_trip() -> None:
+    """The persisted representation restores the same history."""
+    history = ForecastHistory()
+    _simulate(history, 0, 3 * 24)
+
+    restored = ForecastHistory.from_dict(json.loads(json.dumps(history.as_dict())))
+    assert restored.as_dict() == history.as_dict()
+    assert restored.mean_absolute_error(1, 24) == history.mean_absolute_error(1, 24)
+
+    # Scoring continues with the restored predictions
+    _simulate(history, 3 * 24, 24)
+    _simulate(restored, 3 * 24, 24)
+    assert restored.as_dict() == history.as_dict()
+
+
+@pytest.mark.parametrize(
+    "error_sums",
+    [
+        # Array of an other size
+        "",
+        # Bad padding, not base64 characters
+        "QUJ",
+        "not base64!",
+        # Partial array item (3 bytes)
+        "QUJD",
+    ],
+)
+async def test_corrupt_dict_gives_an_empty_history(error_sums: str) -> None:
+    """Corrupt persisted data is dropped, the history starts empty."""
+    history = ForecastHistory()
+    _simulate(history, 0, 3 * 24)
+
+    restored = ForecastHistory.from_dict({**history.as_dict(), "error_sums": error_sums})
+
+    assert restored.mean_absolute_error(1, 24) is None
+    assert restored.as_dict() == ForecastHistory().as_dict()
@@ -0,0 +1,74 @@
+"""Import time test of the Idokep Weather integration."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+import re
+import sys
+
+from custom_components.idokep.coordinator import PARSER_MODULE
+
+# Modules Home Assistant imports when the integration is set up
+INTEGRATION_MODULES = (
+    "custom_components.idokep.config_flow",
+    "custom_components.idokep.sensor",
+    "custom_components.idokep.weather",
+    "custom_components.idokep.diagnostics",
+)
+# Home Assistant modules used by the integration, they are loaded by Home Assistant anyway => imported before the measurement
+PRELOADED_MODULES = (
+    "aiohttp",
+    "voluptuous",
+    "homeassistant.components.sensor",
+    "homeassistant.components.weather",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.device_registry",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.entity_registry",
+    "homeassistant.helpers.selector",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+)
+# Scraping stack, it is imported in the executor at the first refresh
+LAZY_MODULES = (PARSER_MODULE, "bs4", "lxml", "html5lib")
+# Cumulative import time (us) of the integration modules
+IMPORT_TIME_BUDGET = 150_000
+MEASUREMENT_MARKER = "-- integration imports --"
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+async def test_import_time_budget() -> None:
+    """Integration modules are imported within the budget, without the scraping stack."""
+    script = "\n".join(
+        [
+            "import json, sys",
+            *(f"import {module}" for module in PRELOADED_MODULES),
+            f"sys.stderr.write({MEASUREMENT_MARKER!r} + '\\n')",
+            *(f"import {module}" for module in INTEGRATION_MODULES),
+            f"print(json.dumps([module for module in {LAZY_MODULES!r} if module in sys.modules]))",
+        ]
+    )
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-X", "importtime", "-c", script,
+        cwd=Path(__file__).parent.parent,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    assert process.returncode == 0, stderr.decode()
+
+    lines = stderr.decode().splitlines()
+    measured = lines[lines.index(MEASUREMENT_MARKER) + 1 :]
+    # Top level imports (no indentation) of the measurement, their cumulative time includes the nested imports
+    cumulative = {
+        match[4]: int(match[2])
+        for match in map(IMPORT_TIME_LINE.match, measured)
+        if match is not None and not match[3]
+    }
+    assert INTEGRATION_MODULES[0] in cumulative
+    assert json.loads(stdout) == []
+    assert sum(cumulative.values()) < IMPORT_TIME_BUDGET, cumulative
@@ -0,0 +1,109 @@
+"""Tests of the Idokep Weather conditional requests and page cache."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, tzinfo
+
+from aiohttp import hdrs
+import pytest
+
+from custom_components.idokep.const import ATTR_API_CONDITION, ATTR_API_CURRENT, ATTR_API_HOURLY_FORECAST
+from custom_components.idokep.coordinator import WeatherUpdateCoordinator
+
+from .stand_in import IdokepStandIn
+
+LAST_MODIFIED = "Sun, 18 Oct 2026 12:00:00 GMT"
+# Times of the night correction test: after and before the sunset of the fixture page (17:24)
+NIGHT = datetime(2026, 10, 18, 21, 0)
+DAY = datetime(2026, 10, 18, 12, 0)
+
+
+def _url(stand_in: IdokepStandIn, page: str) -> str:
+    return f"{stand_in.url}/{page}/Budapest"
+
+
+async def _refresh_again(coordinator: WeatherUpdateCoordinator) -> None:
+    """Request a refresh of every page, even if the data is fresh."""
+    coordinator.min_freshness = timedelta()
+    await coordinator.async_request_refresh()
+
+
+async def test_not_modified_page_is_reused(coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """ETag of the last download is sent as If-None-Match, the parse of a 304 page is reused."""
+    stand_in.etag = True
+    await coordinator.async_refresh()
+    data = coordinator.data
+    assert hdrs.IF_NONE_MATCH not in stand_in.request_headers["idojaras"]
+    assert (coordinator.page_cache.hits, coordinator.page_cache.misses) == (0, 2)
+
+    await _refresh_again(coordinator)
+
+    for page in ("idojaras", "elorejelzes"):
+        assert stand_in.request_headers[page][hdrs.IF_NONE_MATCH] == coordinator.page_cache.get(_url(stand_in, page)).etag
+    assert stand_in.not_modified == {"idojaras": 1, "elorejelzes": 1}
+    assert (coordinator.page_cache.hits, coordinator.page_cache.misses) == (2, 2)
+    assert "actual_parse" not in coordinator.last_refresh_stats.timings
+    assert coordinator.last_update_success
+    assert coordinator.data[ATTR_API_CURRENT] == data[ATTR_API_CURRENT]
+    assert coordinator.data[ATTR_API_HOURLY_FORECAST] == data[ATTR_API_HOURLY_FORECAST]
+
+    # Changed page => new ETag, it is downloaded and parsed again
+    stand_in.pages["idojaras"] = stand_in.pages["idojaras"].replace(b"Gyeng\xc3\xa9n felh\xc5\x91s", b"Borult")
+    await _refresh_again(coordinator)
+    assert stand_in.not_modified == {"idojaras": 1, "elorejelzes": 2}
+    assert (coordinator.page_cache.hits, coordinator.page_cache.misses) == (3, 3)
+    assert coordinator.data[ATTR_API_CURRENT][ATTR_API_CONDITION] == "cloudy"
+
+
+async def test_if_modified_since(coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """Without an ETag the Last-Modified value is sent as If-Modified-Since."""
+    stand_in.last_modified = LAST_MODIFIED
+    await coordinator.async_refresh()
+    await _refresh_again(coordinator)
+
+    assert stand_in.request_headers["idojaras"][hdrs.IF_MODIFIED_SINCE] == LAST_MODIFIED
+    assert hdrs.IF_NONE_MATCH not in stand_in.request_headers["idojaras"]
+    assert stand_in.not_modified == {"idojaras": 1, "elorejelzes": 1}
+    assert (coordinator.page_cache.hits, coordinator.page_cache.misses) == (2, 2)
+
+
+async def test_unchanged_body_is_not_parsed(coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn) -> None:
+    """Without validators the whole page is downloaded, but the parse of an unchanged body (same hash) is skipped."""
+    await coordinator.async_refresh()
+    await _refresh_again(coordinator)
+
+    assert not stand_in.not_modified
+    assert stand_in.requests == {"idojaras": 2, "elorejelzes": 2}
+    assert (coordinator.page_cache.hits, coordinator.page_cache.misses) == (2, 2)
+    timings = coordinator.last_refresh_stats.timings
+    assert "actual_download" in timings
+    assert "actual_parse" not in timings
+    assert "hourly_parse" not in timings
+
+
+async def test_night_condition_of_a_cached_page(
+    monkeypatch: pytest.MonkeyPatch, coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn
+) -> None:
+    """The clear-night correction follows the time of the refresh, not the time the cached page was parsed."""
+
+    class FrozenDatetime(datetime):
+        frozen = NIGHT
+
+        @classmethod
+        def now(cls, tz: tzinfo | None = None) -> datetime:
+            return cls.frozen.replace(tzinfo=tz)
+
+    monkeypatch.setattr("custom_components.idokep.coordinator.datetime", FrozenDatetime)
+    stand_in.etag = True
+    stand_in.pages["idojaras"] = stand_in.pages["idojaras"].replace(b"Gyeng\xc3\xa9n felh\xc5\x91s", b"Napos")
+    await coordinator.async_refresh()
+    assert coordinator.data[ATTR_API_CURRENT][ATTR_API_CONDITION] == "clear-night"
+
+    FrozenDatetime.frozen = DAY
+    await _refresh_again(coordinator)
+
+    assert stand_in.not_modified["idojaras"] == 1
+    assert coordinator.data[ATTR_API_CURRENT][ATTR_API_CONDITION] == "sunny"
+    # The cached parse keeps the raw condition
+    current_weather = coordinator.page_cache.get(_url(stand_in, "idojaras")).parsed[0]
+    assert current_weather[ATTR_API_CONDITION] == "sunny"
@@ -0,0 +1,184 @@
+"""Tests of the Idokep Weather page parser."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from timeit import timeit
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from custom_components.idokep import parser
+from custom_components.idokep.const import HTML_PARSER_BACKENDS
+
+from .stand_in import load_fixture
+
+BUDAPEST_TZ = ZoneInfo("Europe/Budapest")
+# Number of cards of a forecast window
+WINDOW_CARDS = 48
+# Forecast windows start every hour from this long before a DST transition until this long after it
+WINDOW_STARTS_BEFORE = timedelta(hours=48)
+WINDOW_STARTS_AFTER = timedelta(hours=30)
+# 2026 DST transitions (UTC) of Budapest and of an other timezone
+DST_TRANSITIONS = {
+    "Europe/Budapest": (datetime(2026, 3, 29, 1, tzinfo=UTC), datetime(2026, 10, 25, 1, tzinfo=UTC)),
+    "America/New_York": (datetime(2026, 3, 8, 7, tzinfo=UTC), datetime(2026, 11, 1, 6, tzinfo=UTC)),
+}
+MICRO_BENCHMARK_ROUNDS = 50
+MICRO_BENCHMARK_REPEATS = 10
+
+
+def _forecast_windows(transition: datetime) -> list[tuple[datetime, list[tuple[int, dict]]]]:
+    """Return (Budapest time of the refresh, cards) of the forecast windows around the transition.
+
+    The cards show the Budapest wall clock hours of consecutive hours, as the hourly forecast page does
+    (an hour is skipped in spring, an hour is shown twice in autumn).
+    """
+    windows = []
+    start = transition - WINDOW_STARTS_BEFORE
+    while start <= transition + WINDOW_STARTS_AFTER:
+        hours = [(start + timedelta(hours=index)).astimezone(BUDAPEST_TZ).hour for index in range(WINDOW_CARDS)]
+        cards = [(hour, {"condition": "cloudy", "temperature": float(index)}) for index, hour in enumerate(hours)]
+        windows.append((start.astimezone(BUDAPEST_TZ), cards))
+        start += timedelta(hours=1)
+    return windows
+
+
+def _localize_per_card(cards: list[tuple[int, dict]], hungary_time: datetime, local_tz: ZoneInfo) -> list[tuple[datetime, dict]]:
+    """Return the same (Budapest datetime, Forecast) pairs as localize_hourly_cards, every card converted with zoneinfo."""
+    localized = []
+    naive_datetimes = parser.card_datetimes([hour for hour, _ in cards], hungary_time)
+    for naive_datetime, (_, forecast) in zip(naive_datetimes, cards):
+        budapest_datetime = naive_datetime.replace(tzinfo=BUDAPEST_TZ)
+        localized.append((budapest_datetime, {"datetime": budapest_datetime.astimezone(local_tz).isoformat(), **forecast}))
+    return localized
+
+
+@pytest.mark.parametrize(
+    ("local_tz_name", "transitions"),
+    [
+        ("Europe/Budapest", DST_TRANSITIONS["Europe/Budapest"]),
+        # Same transition instants as Budapest
+        ("Europe/London", DST_TRANSITIONS["Europe/Budapest"]),
+        ("America/New_York", DST_TRANSITIONS["America/New_York"]),
+    ],
+)
+async def test_localize_hourly_cards_across_dst(local_tz_name: str, transitions: tuple[datetime, datetime]) -> None:
+    """The offset tables of the window give the same times as converting every card with zoneinfo."""
+    local_tz = ZoneInfo(local_tz_name)
+    checked_cards = 0
+    for transition in transitions:
+        for hungary_time, cards in _forecast_windows(transition):
+            localized = parser.localize_hourly_cards(cards, hungary_time, local_tz, BUDAPEST_TZ)
+            expected = _localize_per_card(cards, hungary_time, local_tz)
+
+            # ISO strings are compared (aware datetimes of an ambiguous hour never compare equal across timezones)
+            assert [budapest_datetime.isoformat() for budapest_datetime, _ in localized] == [
+                budapest_datetime.isoformat() for budapest_datetime, _ in expected
+            ]
+            assert [forecast for _, forecast in localized] == [forecast for _, forecast in expected]
+            checked_cards += len(cards)
+
+    assert checked_cards == 2 * 79 * WINDOW_CARDS
+
+
+async def test_window_offsets() -> None:
+    """Offsets are looked up for every time only if the window contains a transition."""
+    lookups = []
+
+    def offset_of(moment: datetime) -> timedelta:
+        lookups.append(moment)
+        return BUDAPEST_TZ.utcoffset(moment)
+
+    summer = [datetime(2026, 7, 1, hour) for hour in range(24)]
+    assert parser.window_offsets(summer, offset_of) == [timedelta(hours=2)] * 24
+    assert len(lookups) == 2
+
+    lookups.clear()
+    autumn = [datetime(2026, 10, 24, 12) + timedelta(hours=index) for index in range(24)]
+    assert parser.window_offsets(autumn, offset_of) == [BUDAPEST_TZ.utcoffset(moment) for moment in autumn]
+    assert len(lookups) == 2 + 24
+
+
+async def test_hourly_loop_micro_benchmark(capsys: pytest.CaptureFixture[str]) -> None:
+    """Benchmark the localization of a forecast window: offset tables against converting every card with zoneinfo."""
+    local_tz = ZoneInfo("Europe/London")
+    hungary_time, cards = _forecast_windows(DST_TRANSITIONS["Europe/Budapest"][1])[0]
+
+    # Best of the repeats (the least disturbed run), the two variants are interleaved
+    best = {"offset tables": float("inf"), "per card zoneinfo": float("inf")}
+    for _ in range(MICRO_BENCHMARK_REPEATS):
+        for variant, localize in (
+            ("offset tables", lambda: parser.localize_hourly_cards(cards, hungary_time, local_tz, BUDAPEST_TZ)),
+            ("per card zoneinfo", lambda: _localize_per_card(cards, hungary_time, local_tz)),
+        ):
+            best[variant] = min(best[variant], timeit(localize, number=MICRO_BENCHMARK_ROUNDS) / MICRO_BENCHMARK_ROUNDS * 1e6)
+
+    with capsys.disabled():
+        print(f"\nhourly loop ({len(cards)} cards): " + ", ".join(f"{variant} {duration:.1f} us" for variant, duration in best.items()))
+    assert all(duration > 0 for duration in best.values())
+
+
+@pytest.mark.parametrize("targeted", [True, False])
+async def test_parser_backends_equivalent(targeted: bool) -> None:
+    """The preferred tree builder (HTML_PARSER_BACKENDS) gives the same forecasts as the html.parser fallback."""
+    backend = "lxml"
+    hungary_time = datetime(2026, 10, 18, 14, 5, tzinfo=BUDAPEST_TZ)
+    actual_html = load_fixture("idojaras.html").decode()
+    hourly_html = load_fixture("elorejelzes.html").decode()
+
+    assert parser.parse_actual_weather(actual_html, hungary_time, backend, targeted=targeted) == parser.parse_actual_weather(
+        actual_html, hungary_time, "html.parser", targeted=targeted
+    )
+    localized = [
+        [(budapest_datetime.isoformat(), forecast) for budapest_datetime, forecast in parser.parse_hourly_forecast(
+            hourly_html, hungary_time, ZoneInfo("Europe/London"), BUDAPEST_TZ, tree_builder, targeted=targeted
+        )]
+        for tree_builder in (backend, "html.parser")
+    ]
+    assert localized[0] == localized[1]
+    assert len(localized[0]) == 48
+
+
+@pytest.mark.parametrize("backend", HTML_PARSER_BACKENDS)
+async def test_targeted_parse_equals_full_parse(backend: str) -> None:
+    """Trees strained to the scraped containers give the same data as the whole pages."""
+    hungary_time = datetime(2026, 10, 18, 14, 5, tzinfo=BUDAPEST_TZ)
+    actual_html = load_fixture("idojaras.html").decode()
+    hourly_html = load_fixture("elorejelzes.html").decode()
+
+    targeted = parser.parse_actual_weather(actual_html, hungary_time, backend, targeted=True)
+    assert targeted == parser.parse_actual_weather(actual_html, hungary_time, backend, targeted=False)
+    assert len(targeted[1]) == 7
+    hourly = [
+        parser.parse_hourly_forecast(hourly_html, hungary_time, ZoneInfo("Europe/London"), BUDAPEST_TZ, backend, targeted=targeted)
+        for targeted in (True, False)
+    ]
+    assert hourly[0] == hourly[1]
+    assert len(hourly[0]) == 48
+
+
+@pytest.mark.parametrize("horizon", [None, 12])
+@pytest.mark.parametrize("chunk_size", [1, 7, 2048])
+async def test_incremental_card_parse(chunk_size: int, horizon: int | None) -> None:
+    """Cards extracted while the page is fed chunk by chunk are the ones of the whole page parse, feeding can stop at the horizon."""
+    hungary_time = datetime(2026, 10, 18, 14, 5, tzinfo=BUDAPEST_TZ)
+    hourly_html = load_fixture("elorejelzes.html").decode()
+    feed = parser.HourlyCardFeed(horizon)
+
+    fed = 0
+    while fed < len(hourly_html) and not feed.horizon_reached:
+        feed.feed(hourly_html[fed : fed + chunk_size])
+        fed += chunk_size
+
+    cards = parser.parse_fed_hourly_forecast(feed, hourly_html[:fed], hungary_time, ZoneInfo("Europe/London"), BUDAPEST_TZ)
+    whole_page = parser.parse_hourly_forecast(hourly_html, hungary_time, ZoneInfo("Europe/London"), BUDAPEST_TZ)
+    assert cards == whole_page[: horizon or len(whole_page)]
+    assert feed.first_card_at is not None
+    if horizon:
+        assert fed < len(hourly_html) / 2
+
+
+async def test_default_parser_backend() -> None:
+    """lxml is the default tree builder."""
+    assert parser.get_parser_backend() == "lxml"
@@ -0,0 +1,269 @@
+"""Tests of the Idokep Weather fetch scheduler."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+from time import monotonic
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.idokep.catalog import LocationCatalog
+from custom_components.idokep.const import ATTR_API_HOURLY_FORECAST, MAX_CONCURRENT_REQUESTS
+from custom_components.idokep.coordinator import WeatherUpdateCoordinator
+from custom_components.idokep.scheduler import (
+    ADAPTIVE_BACKOFF_JITTER,
+    ADAPTIVE_MAX_INTERVAL,
+    BREAKER_MAX_OPEN_PERIOD,
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    AdaptiveRefreshInterval,
+    IdokepFetchScheduler,
+    PageRefresher,
+    TokenBucketLimiter,
+    async_get_fetch_scheduler,
+)
+
+from .stand_in import IdokepStandIn
+
+# Number of simulated locations (config entries)
+LOCATIONS = 100
+# Config entries (locations) of the load test & latency (seconds) of their pages
+LOAD_LOCATIONS = 20
+LOAD_PAGE_LATENCY = 0.05
+INTERVAL = timedelta(minutes=10)
+# Synthetic upstream: the page content changes at this offset past every change period
+CHANGE_OFFSET = timedelta(minutes=5)
+CHANGE_PERIOD = timedelta(minutes=30)
+SIMULATED_DAY = timedelta(days=1)
+# Token bucket of the limiter tests (requests / second, burst size)
+LIMITER_RATE = 200
+LIMITER_BURST = 5
+# Simulated failures of a page and repetitions of the simulation (the backoff has random jitter)
+RETRY_FAILURES = 10
+RETRY_SIMULATIONS = 50
+# Token rate of the end-to-end priority test: fast enough for a short test, slow enough to keep the requests queued
+QUEUED_LIMITER_RATE = 100
+
+
+async def test_slots_are_spread_over_the_interval() -> None:
+    """Refresh slots of the locations are spread evenly, the same location always gets its own slot."""
+    scheduler = IdokepFetchScheduler()
+    locations = [f"location-{index}" for index in range(LOCATIONS)]
+    unregisters = [scheduler.async_register(location) for location in locations]
+    offsets = sorted(scheduler.slot_offset(location, INTERVAL) for location in locations)
+
+    gaps = [later - earlier for earlier, later in zip(offsets, offsets[1:])] + [INTERVAL - offsets[-1] + offsets[0]]
+    assert len(set(offsets)) == LOCATIONS
+    assert max(gaps) < INTERVAL * 2 / LOCATIONS
+
+    # An other entry of a registered location shares its slot, the slot is kept until its last entry is unregistered
+    offset = scheduler.slot_offset(locations[0], INTERVAL)
+    unregister_other = scheduler.async_register(locations[0])
+    assert scheduler.slot_offset(locations[0], INTERVAL) == offset
+    unregisters[0]()
+    assert scheduler.slot_offset(locations[0], INTERVAL) == offset
+    unregister_other()
+    assert scheduler.slot_offset(locations[0], INTERVAL) == timedelta()
+
+
+async def test_many_locations_are_refreshed_within_the_limits(
+    hass: HomeAssistant, stand_in: IdokepStandIn, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Coordinators of many config entries refresh through the shared session and limiter, concurrent requests are capped."""
+    scheduler = async_get_fetch_scheduler(hass)
+    # Token bucket doesn't delay the requests => only the concurrency cap is measured
+    scheduler.request_limiter = TokenBucketLimiter(rate=1000, burst=2 * LOAD_LOCATIONS, max_concurrent_requests=MAX_CONCURRENT_REQUESTS)
+    stand_in.delay = {"idojaras": LOAD_PAGE_LATENCY, "elorejelzes": LOAD_PAGE_LATENCY}
+    locations = [f"location-{index}" for index in range(LOAD_LOCATIONS)]
+    unregisters = [scheduler.async_register(location) for location in locations]
+    coordinators = [WeatherUpdateCoordinator(location, hass, scheduler) for location in locations]
+
+    start = monotonic()
+    try:
+        await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+        elapsed = monotonic() - start
+    finally:
+        for coordinator in coordinators:
+            await coordinator.async_shutdown()
+        for unregister in unregisters:
+            unregister()
+    queue_waits = [coordinator.last_refresh_stats.queue_ms for coordinator in coordinators]
+    with capsys.disabled():
+        print(
+            f"\n{LOAD_LOCATIONS} locations refreshed in {elapsed:.2f} s, "
+            f"{stand_in.max_in_flight} concurrent requests at most, max queue wait {max(queue_waits):.0f} ms"
+        )
+
+    assert all(coordinator.last_update_success for coordinator in coordinators)
+    assert all(len(coordinator.data[ATTR_API_HOURLY_FORECAST]) == 48 for coordinator in coordinators)
+    assert stand_in.location_requests == {f"{page}/{location}": 1 for page in ("idojaras", "elorejelzes") for location in locations}
+    assert stand_in.max_in_flight == MAX_CONCURRENT_REQUESTS
+    # Requests are served in waves of the concurrency cap
+    assert elapsed >= 2 * LOAD_LOCATIONS / MAX_CONCURRENT_REQUESTS * LOAD_PAGE_LATENCY
+
+
+def _detection_delays(changes: list[datetime], refreshes: list[datetime]) -> list[timedelta]:
+    """Return the time between every content change and the first refresh after it."""
+    delays = []
+    for change in changes:
+        detection = next((refresh for refresh in refreshes if refresh >= change), None)
+        if detection is not None:
+            delays.append(detection - change)
+    return delays
+
+
+async def test_adaptive_interval_day_simulation(capsys: pytest.CaptureFixture[str]) -> None:
+    """Replay a day of synthetic content changes: requests saved and freshness lost against fixed interval polling."""
+    start = dt_util.as_local(datetime(2026, 10, 18, 12, tzinfo=UTC)).replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + SIMULATED_DAY
+    changes = []
+    change = start + CHANGE_OFFSET
+    while change < end:
+        changes.append(change)
+        change += CHANGE_PERIOD
+
+    refresher = PageRefresher("actual", INTERVAL)
+    adaptive = []
+    now = start
+    while now < end:
+        content_changed = any(adaptive[-1] < change <= now for change in changes) if adaptive else None
+        adaptive.append(now)
+        refresher.record_success(now, content_changed)
+        now = refresher.next_refresh
+    fixed = [start + INTERVAL * index for index in range(SIMULATED_DAY // INTERVAL)]
+
+    adaptive_delays = _detection_delays(changes, adaptive)
+    fixed_delays = _detection_delays(changes, fixed)
+    fixed_mean = sum(fixed_delays, timedelta()) / len(fixed_delays)
+    with capsys.disabled():
+        print(
+            f"\nadaptive interval: {len(adaptive)} requests (fixed: {len(fixed)}, saved: {len(fixed) - len(adaptive)}), "
+            f"mean change detection delay {sum(adaptive_delays, timedelta()) / len(adaptive_delays)} (fixed: {fixed_mean}), "
+            f"max {max(adaptive_delays)} (fixed: {max(fixed_delays)})"
+        )
+
+    assert len(adaptive) < len(fixed)
+    # Slower night refreshes are the only freshness lost
+    assert max(adaptive_delays) <= refresher.interval.longest_interval
+    day_delays = [delay for change, delay in zip(changes, adaptive_delays) if dt_util.as_local(change).hour >= 6]
+    assert max(day_delays) < INTERVAL
+    assert sum(day_delays, timedelta()) / len(day_delays) <= fixed_mean
+
+
+async def test_backoff_starts_from_the_base_interval() -> None:
+    """Failures back off the base interval exponentially (with jitter) up to the upper limit."""
+    interval = AdaptiveRefreshInterval(INTERVAL)
+    for failures in range(1, 8):
+        backoff = interval.next_after_failure()
+        expected = INTERVAL * 2 ** (failures - 1)
+        assert min(expected * (1 - ADAPTIVE_BACKOFF_JITTER), ADAPTIVE_MAX_INTERVAL) <= backoff
+        assert backoff <= min(expected * (1 + ADAPTIVE_BACKOFF_JITTER), ADAPTIVE_MAX_INTERVAL)
+    assert interval.failures == 7
+
+    # Success resets the backoff
+    interval.next_after_success(datetime(2026, 10, 18, 12, tzinfo=UTC), None)
+    assert interval.failures == 0
+    assert interval.next_after_failure() <= INTERVAL * (1 + ADAPTIVE_BACKOFF_JITTER)
+
+
+@pytest.mark.parametrize("base_interval", [timedelta(minutes=10), timedelta(minutes=30)], ids=["actual", "hourly"])
+async def test_retry_gaps_never_shrink(base_interval: timedelta) -> None:
+    """Gaps between the requests of a failing page grow (backoff or breaker probe, the later one) up to the limits."""
+    for _ in range(RETRY_SIMULATIONS):
+        refresher = PageRefresher("page", base_interval)
+        now = datetime(2026, 10, 18, 12, tzinfo=UTC)
+        requests = []
+        for _ in range(RETRY_FAILURES):
+            # Coordinator wakes up when the page is due, the request waits for the probe of an open breaker
+            while not refresher.allow_request(now):
+                now = refresher.next_refresh
+            requests.append(now)
+            refresher.record_failure(now, TimeoutError())
+            now = refresher.next_refresh
+
+        gaps = [later - earlier for earlier, later in zip(requests, requests[1:])]
+        assert gaps[0] >= base_interval * (1 - ADAPTIVE_BACKOFF_JITTER)
+        assert all(later >= earlier for earlier, later in zip(gaps, gaps[1:])), gaps
+        assert max(gaps) <= max(ADAPTIVE_MAX_INTERVAL, BREAKER_MAX_OPEN_PERIOD)
+
+
+async def test_token_bucket_serves_by_priority() -> None:
+    """Interactive requests go ahead of the queued background ones, FIFO within a priority."""
+    limiter = TokenBucketLimiter(rate=LIMITER_RATE, burst=1, max_concurrent_requests=MAX_CONCURRENT_REQUESTS)
+    order = []
+
+    async def request(name: str, priority: int) -> None:
+        async with limiter.limit(priority):
+            order.append(name)
+
+    tasks = [asyncio.create_task(request(f"background-{index}", PRIORITY_BACKGROUND)) for index in range(3)]
+    await asyncio.sleep(0)
+    assert limiter.queue_length == 2
+    tasks += [asyncio.create_task(request(f"interactive-{index}", PRIORITY_INTERACTIVE)) for index in range(2)]
+    await asyncio.gather(*tasks)
+
+    # First background request took the only token of the burst
+    assert order == ["background-0", "interactive-0", "interactive-1", "background-1", "background-2"]
+    assert limiter.queue_length == 0
+
+
+async def test_token_bucket_queue_wait(capsys: pytest.CaptureFixture[str]) -> None:
+    """Refreshes of many locations are spread at the token rate, the interactive ones wait the least."""
+    limiter = TokenBucketLimiter(rate=LIMITER_RATE, burst=LIMITER_BURST, max_concurrent_requests=MAX_CONCURRENT_REQUESTS)
+
+    async def request(priority: int) -> float:
+        async with limiter.limit(priority) as queue_wait:
+            return queue_wait
+
+    # Every location refreshes its 2 pages in the background, one user requested refresh arrives meanwhile
+    background = [asyncio.create_task(request(PRIORITY_BACKGROUND)) for _ in range(2 * LOCATIONS)]
+    await asyncio.sleep(0)
+    interactive = await request(PRIORITY_INTERACTIVE)
+    waits = await asyncio.gather(*background)
+    with capsys.disabled():
+        print(f"\nqueue wait of {len(waits)} background requests: max {max(waits):.0f} ms, interactive request {interactive:.0f} ms")
+
+    # Tokens are handed out at the rate after the burst
+    expected_ms = (2 * LOCATIONS + 1 - LIMITER_BURST) / LIMITER_RATE * 1000
+    assert expected_ms * 0.9 <= max(waits) <= expected_ms * 1.5
+    assert interactive <= 2 / LIMITER_RATE * 1000
+
+
+async def test_location_validation_overtakes_background_refreshes(hass: HomeAssistant, stand_in: IdokepStandIn) -> None:
+    """Validation of a location typed in the config flow is requested before the queued background page refreshes."""
+    scheduler = async_get_fetch_scheduler(hass)
+    scheduler.request_limiter = TokenBucketLimiter(rate=1000, burst=2 * LOAD_LOCATIONS, max_concurrent_requests=MAX_CONCURRENT_REQUESTS)
+    locations = [f"location-{index}" for index in range(LOAD_LOCATIONS)]
+    unregisters = [scheduler.async_register(location) for location in locations]
+    coordinators = [WeatherUpdateCoordinator(location, hass, scheduler) for location in locations]
+    try:
+        # First refreshes are interactive (entities wait for them) => the background refreshes are the next ones
+        await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+        limiter = scheduler.request_limiter = TokenBucketLimiter(
+            rate=QUEUED_LIMITER_RATE, burst=1, max_concurrent_requests=MAX_CONCURRENT_REQUESTS
+        )
+        for coordinator in coordinators:
+            for refresher in coordinator.page_refreshers.values():
+                refresher.next_refresh = None
+        stand_in.request_log.clear()
+
+        refreshes = [asyncio.create_task(coordinator.async_refresh()) for coordinator in coordinators]
+        # The first request took the only token, the others wait for the next ones
+        while limiter.queue_length < 2 * LOAD_LOCATIONS - 1:
+            await asyncio.sleep(0)
+        # Unknown location (not a seed) => validated online with interactive priority
+        assert await LocationCatalog(hass).async_resolve("Zebegény") == "Zebegény"
+        await asyncio.gather(*refreshes)
+    finally:
+        for coordinator in coordinators:
+            await coordinator.async_shutdown()
+        for unregister in unregisters:
+            unregister()
+
+    assert stand_in.request_log[1] == "idojaras/Zebegény"
+    assert len(stand_in.request_log) == 2 * LOAD_LOCATIONS + 1
+    assert all(coordinator.last_update_success for coordinator in coordinators)
@@ -0,0 +1,63 @@
+"""Tests of the Idokep Weather sensors."""
+
+from __future__ import annotations
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry, async_capture_events
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.idokep.const import DOMAIN
+from custom_components.idokep.sensor import ACCURACY_SENSOR_TYPES, DIAGNOSTIC_SENSOR_TYPES, TRANSFER_SENSOR_TYPES
+
+from . import make_config_entry
+from .stand_in import IdokepStandIn
+
+# Other configured locations whose sensors are in the registry
+OTHER_LOCATIONS = 30
+
+
+async def test_reload_reconciles_only_the_changed_sensors(hass: HomeAssistant, config_entry: MockConfigEntry, stand_in: IdokepStandIn) -> None:
+    """Registered sensors are kept (no remove and re-add), only the ones not provided anymore are removed."""
+    entity_registry = er.async_get(hass)
+    for index in range(OTHER_LOCATIONS):
+        other_entry = make_config_entry(f"location-{index}")
+        other_entry.add_to_hass(hass)
+        entity_registry.async_get_or_create("sensor", DOMAIN, f"location-{index}_temperature", config_entry=other_entry)
+    other_sensors = {entry.entity_id: entry.id for entry in entity_registry.entities.values() if entry.config_entry_id != config_entry.entry_id}
+    config_entry.add_to_hass(hass)
+    obsolete = entity_registry.async_get_or_create("sensor", DOMAIN, "Budapest_obsolete", config_entry=config_entry)
+
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert entity_registry.async_get(obsolete.entity_id) is None
+    sensors = {entry.entity_id: entry.id for entry in er.async_entries_for_config_entry(entity_registry, config_entry.entry_id)}
+    assert len(sensors) > 1
+
+    events = async_capture_events(hass, er.EVENT_ENTITY_REGISTRY_UPDATED)
+    assert await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert [event.data for event in events if event.data["action"] != "update"] == []
+    assert {entry.entity_id: entry.id for entry in er.async_entries_for_config_entry(entity_registry, config_entry.entry_id)} == sensors
+    assert {entry.entity_id: entry.id for entry in entity_registry.entities.values() if entry.config_entry_id != config_entry.entry_id} == other_sensors
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_statistics_sensors_are_disabled_by_default(hass: HomeAssistant, config_entry: MockConfigEntry, stand_in: IdokepStandIn) -> None:
+    """Refresh timing and byte sensors are registered disabled, the forecast accuracy sensors are enabled."""
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    entity_registry = er.async_get(hass)
+
+    for description in (*DIAGNOSTIC_SENSOR_TYPES, *TRANSFER_SENSOR_TYPES):
+        entity_id = entity_registry.async_get_entity_id("sensor", DOMAIN, f"{config_entry.unique_id}_{description.key}")
+        assert entity_id is not None
+        assert entity_registry.async_get(entity_id).disabled_by is er.RegistryEntryDisabler.INTEGRATION
+        assert hass.states.get(entity_id) is None
+    for description in ACCURACY_SENSOR_TYPES:
+        entity_id = entity_registry.async_get_entity_id("sensor", DOMAIN, f"{config_entry.unique_id}_{description.key}")
+        assert entity_registry.async_get(entity_id).disabled_by is None
+        assert hass.states.get(entity_id) is not None
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
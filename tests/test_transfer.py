@@ -0,0 +1,61 @@
+"""Tests of the Idokep Weather compressed transfers and byte accounting."""
+
+from __future__ import annotations
+
+from importlib.util import find_spec
+
+import pytest
+
+from custom_components.idokep.const import ATTR_API_CURRENT, ATTR_API_HOURLY_FORECAST
+from custom_components.idokep.coordinator import WeatherUpdateCoordinator
+from custom_components.idokep.transfer import StreamDecoder
+
+from .stand_in import IdokepStandIn, encode_body, load_fixture
+
+CONTENT_ENCODINGS = [
+    None,
+    "gzip",
+    "deflate",
+    # Some servers send raw deflate streams as deflate
+    "raw-deflate",
+    pytest.param("br", marks=pytest.mark.skipif(find_spec("brotli") is None, reason="Brotli is not installed")),
+]
+
+
+@pytest.mark.parametrize("content_encoding", CONTENT_ENCODINGS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 16384])
+async def test_stream_decoder(content_encoding: str | None, chunk_size: int) -> None:
+    """Bodies are decoded whatever chunks they arrive in."""
+    body = load_fixture("idojaras.html")
+    encoded = encode_body(body, content_encoding)
+    decoder = StreamDecoder("deflate" if content_encoding == "raw-deflate" else content_encoding)
+
+    decoded = b"".join(decoder.decode(encoded[start : start + chunk_size]) for start in range(0, len(encoded), chunk_size))
+
+    assert decoded + decoder.flush() == body
+
+
+async def test_unsupported_content_encoding() -> None:
+    """Unknown content coding is an error (the page can't be decoded)."""
+    with pytest.raises(ValueError):
+        StreamDecoder("compress")
+
+
+@pytest.mark.parametrize("content_encoding", CONTENT_ENCODINGS)
+async def test_wire_and_decoded_bytes(coordinator: WeatherUpdateCoordinator, stand_in: IdokepStandIn, content_encoding: str | None) -> None:
+    """Compressed pages give the same data, wire bytes are the transferred ones, decoded bytes are the page size."""
+    stand_in.content_encoding = content_encoding
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert coordinator.data[ATTR_API_CURRENT]
+    assert len(coordinator.data[ATTR_API_HOURLY_FORECAST]) == 48
+    transfer_stats = coordinator.transfer_stats
+    for page, fixture in (("idojaras", "idojaras.html"), ("elorejelzes", "elorejelzes.html")):
+        url = f"{stand_in.url}/{page}/Budapest"
+        assert transfer_stats.wire_bytes[url] == stand_in.sent_bytes[page]
+        assert transfer_stats.decoded_bytes[url] == len(load_fixture(fixture))
+    if content_encoding is None:
+        assert transfer_stats.total_wire_bytes == transfer_stats.total_decoded_bytes
+    else:
+        assert transfer_stats.total_wire_bytes < transfer_stats.total_decoded_bytes / 3
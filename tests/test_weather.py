@@ -0,0 +1,59 @@
+"""Tests of the Idokep Weather entity updates."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import Entity
+
+from custom_components.idokep.weather import IdokepWeather
+
+from .stand_in import IdokepStandIn
+
+
+async def test_only_entities_of_changed_sections_write_state(hass: HomeAssistant, config_entry: MockConfigEntry, stand_in: IdokepStandIn) -> None:
+    """An unchanged refresh writes no state, a changed hourly forecast updates the hourly forecast subscribers only."""
+    config_entry.add_to_hass(hass)
+    with (
+        patch.object(Entity, "async_write_ha_state", autospec=True, side_effect=Entity.async_write_ha_state) as write_state,
+        patch.object(IdokepWeather, "async_update_listeners", autospec=True) as update_forecast_listeners,
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = config_entry.runtime_data.coordinator
+        coordinator.min_freshness = timedelta()
+        # Forecast accuracy sensors (diagnostic entities) are written after every refresh
+        data_entities = {
+            entry.entity_id
+            for entry in er.async_entries_for_config_entry(er.async_get(hass), config_entry.entry_id)
+            if entry.entity_category is None
+        }
+        assert len(data_entities) > 1
+
+        def written() -> set[str]:
+            entity_ids = {entity.entity_id for (entity,), _ in write_state.call_args_list} & data_entities
+            write_state.reset_mock()
+            update_forecast_listeners.reset_mock()
+            return entity_ids
+
+        assert written()
+
+        await coordinator.async_request_refresh()
+        await hass.async_block_till_done()
+        assert written() == set()
+        update_forecast_listeners.assert_not_called()
+
+        # Temperature of the last hourly card (beyond today and the near-term summary) changes
+        stand_in.pages["elorejelzes"] = stand_in.pages["elorejelzes"].replace('#47">9˚C'.encode(), '#47">8˚C'.encode())
+        await coordinator.async_request_refresh()
+        await hass.async_block_till_done()
+        forecast_updates = list(update_forecast_listeners.call_args_list)
+        assert written() == set()
+        assert [args[1:] for args, _ in forecast_updates] == [(["hourly"],)]
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)